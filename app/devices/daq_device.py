@@ -1,5 +1,29 @@
 # app/devices/daq_device.py
-from app.imports import *
+import threading
+import numpy as np
+from app.utils.lazy_import import lazy_import, lazy_attr
+from app.utils.ring_buffer import RingBuffer
+from app.utils.device_trace import DeviceTrace
+
+# Vendor SDK, imported on first use so the driver module loads without it
+nidaqmx = lazy_import("nidaqmx")
+System = lazy_attr("nidaqmx.system", "System")
+AnalogMultiChannelReader = lazy_attr("nidaqmx.stream_readers", "AnalogMultiChannelReader")
+
+# Volts -> watts per photodiode, keyed by channel terminal name. Overridden by
+# config["photodiode_calibration"] (same format).
+DEFAULT_PHOTODIODE_CALIBRATION = {
+    "ai0": {"slope": 3.8934e-04, "offset": 0.0},  # PD1 (fitted offset -1.3769e-6)
+    "ai1": {"slope": 3.8853e-04, "offset": 0.0},  # PD2 (fitted offset -7.2653e-6)
+    "ai2": {"slope": 3.7686e-04, "offset": 0.0},  # PD3 (fitted offset -4.1698e-5)
+    "ai3": {"slope": 4.0387e-04, "offset": 0.0},  # PD4 (fitted offset +3.57e-7)
+    "ai4": {"slope": 3.6247e-04, "offset": 0.0},  # PD5 (fitted offset -2.37e-5)
+    "ai5": {"slope": 3.6618e-04, "offset": 0.0},  # PD6 (fitted offset -3.57e-5)
+    "ai6": {"slope": 3.7097e-04, "offset": 0.0},  # PD7 (fitted offset -2.139e-5)
+    "ai7": {"slope": 4.0287e-04, "offset": 0.0},  # PD8 (fitted offset -2.216e-6)
+}
+
+POWER_UNITS = {"W": 1.0, "mW": 1e3, "uW": 1e6}
 
 class DAQ:
     """
@@ -57,10 +81,20 @@ class DAQ:
         Initialize a DAQ instance with optional config.
         """
         self.config = config if config is not None else {}
-        self.system = System.local()
+        self.system = DeviceTrace.open("daq.system", System.local)
         self.device_name = None
         self._is_connected = False
 
+        # Continuous acquisition (see start_stream)
+        self._stream_task = None
+        self._stream_thread = None
+        self._stream_stop = threading.Event()
+        self.stream_channels = []
+        self.stream_rate = None
+        self.stream_buffer = None
+
+        self._pd_vectors = {}  # channels tuple -> (slope, offset) columns
+
     def find_device(self, device_name=None):
         """
         Find a specific device by name (e.g., 'Dev1'). If device_name is None,
@@ -97,6 +131,10 @@ class DAQ:
             print("[INFO][DAQ] Failed to connect.")
             return False
 
+    def _new_task(self):
+        """Create an NI-DAQmx task (recorded or replayed when a device trace is active)."""
+        return DeviceTrace.open("daq.task", nidaqmx.Task)
+
     def list_ai_channels(self):
         """
         List analog input channels for the connected device.
@@ -110,6 +148,143 @@ class DAQ:
                 return [chan.name for chan in dev.ai_physical_chans]
         return []
 
+    # ------------------------------------------------------------------
+    # Continuous acquisition
+    # ------------------------------------------------------------------
+    @property
+    def is_streaming(self):
+        return self._stream_thread is not None and self._stream_thread.is_alive()
+
+    def start_stream(self, channels=None, sample_rate=1000, buffer_seconds=10.0, chunk_size=None,
+                     min_val=-10.0, max_val=10.0):
+        """
+        Start a hardware-timed continuous acquisition into a ring buffer.
+
+        A background thread reads `chunk_size` samples at a time from one
+        long-lived task into `stream_buffer`; read_voltage/read_power then
+        average windows of the buffer instead of creating a task per call.
+        Calling it again with the same channels and rate is a no-op.
+
+        :param channels: channel names to stream; all AI channels if None
+        :param sample_rate: sampling rate in Hz
+        :param buffer_seconds: history kept in the ring buffer
+        :param chunk_size: samples per read (default: 1/20 s worth)
+        :return: True if the stream is running
+        """
+        if not self._is_connected:
+            print("[INFO][DAQ] Device not connected.")
+            return False
+        if channels is None:
+            channels = self.list_ai_channels()
+        if not channels:
+            print("[INFO][DAQ] No channels to stream.")
+            return False
+        channels = list(channels)
+        if self.is_streaming and channels == self.stream_channels and sample_rate == self.stream_rate:
+            return True
+        self.stop_stream()
+
+        chunk_size = int(chunk_size or max(1, sample_rate // 20))
+        capacity = max(int(sample_rate * buffer_seconds), chunk_size)
+        task = None
+        try:
+            task = self._new_task()
+            for ch in channels:
+                task.ai_channels.add_ai_voltage_chan(physical_channel=ch, min_val=min_val, max_val=max_val)
+            task.timing.cfg_samp_clk_timing(
+                rate=sample_rate,
+                sample_mode=nidaqmx.constants.AcquisitionType.CONTINUOUS,
+                samps_per_chan=capacity
+            )
+            task.start()
+        except Exception as e:
+            print(f"[ERROR][DAQ] Could not start stream: {e}")
+            if task is not None:
+                task.close()
+            return False
+
+        self._stream_task = task
+        self.stream_channels = channels
+        self.stream_rate = sample_rate
+        self.stream_buffer = RingBuffer(len(channels), capacity)
+        self._stream_stop.clear()
+        self._stream_thread = threading.Thread(
+            target=self._stream_loop, args=(task, self.stream_buffer, chunk_size, sample_rate), daemon=True
+        )
+        self._stream_thread.start()
+        print(f"[INFO][DAQ] Streaming {len(channels)} channels at {sample_rate} Hz")
+        return True
+
+    def _stream_loop(self, task, buffer, chunk_size, sample_rate):
+        reader = DeviceTrace.open(
+            "daq.reader", lambda: AnalogMultiChannelReader(getattr(task, "__wrapped__", task).in_stream)
+        )
+        block = np.zeros((buffer.n_channels, chunk_size))
+        timeout = max(1.0, 10 * chunk_size / sample_rate)
+        while not self._stream_stop.is_set():
+            try:
+                reader.read_many_sample(block, number_of_samples_per_channel=chunk_size, timeout=timeout)
+            except Exception as e:
+                if not self._stream_stop.is_set():
+                    print(f"[ERROR][DAQ] Stream stopped: {e}")
+                    # Release the hardware so one-shot reads can take over
+                    if self._stream_task is task:
+                        self._stream_task = None
+                        try:
+                            task.close()
+                        except Exception:
+                            pass
+                break
+            buffer.write(block)
+
+    def stop_stream(self):
+        """Stop the continuous acquisition and release its task."""
+        self._stream_stop.set()
+        if self._stream_thread is not None:
+            self._stream_thread.join(timeout=2.0)  # reader exits after its current chunk
+        if self._stream_task is not None:
+            try:
+                self._stream_task.stop()
+                self._stream_task.close()
+            except Exception as e:
+                print(f"[WARNING][DAQ] Error closing stream task: {e}")
+        self._stream_task = None
+        self._stream_thread = None
+        self.stream_channels = []
+        self.stream_rate = None
+
+    def _stream_indices(self, channels):
+        """Rows of `channels` in the stream buffer, or None if not all are streamed."""
+        if not self.is_streaming:
+            return None
+        try:
+            return [self.stream_channels.index(ch) for ch in channels]
+        except ValueError:
+            return None
+
+    def read_stream(self, channels, samples_per_channel=10, fresh=True, timeout=None):
+        """
+        Window of samples from the running stream.
+
+        :param channels: channel names (must be part of the stream)
+        :param samples_per_channel: window length
+        :param fresh: wait for samples acquired after this call (e.g. after a
+                      phase change); otherwise return the latest window
+        :return: (channels, samples) array
+        """
+        rows = self._stream_indices(channels)
+        if rows is None:
+            raise RuntimeError("Requested channels are not being streamed")
+        buffer = self.stream_buffer
+        if not fresh:
+            return buffer.latest(samples_per_channel)[rows]
+        start = buffer.total
+        if timeout is None:
+            timeout = 1.0 + 2 * samples_per_channel / self.stream_rate
+        if not buffer.wait_for(start + samples_per_channel, timeout=timeout):
+            raise TimeoutError("[DAQ] Stream did not deliver samples in time")
+        return buffer.since(start, samples_per_channel)[rows]
+
     def read_voltage(self, channels=None, samples_per_channel=10, min_val=-10.0, max_val=10.0):
         """
         Read multiple samples (software-timed) from specified channels.
@@ -133,8 +308,12 @@ class DAQ:
             print("[INFO][DAQ] No channels to read from.")
             return None
 
+        if self._stream_indices(channels) is not None:
+            means = self.read_stream(channels, samples_per_channel).mean(axis=1)
+            return float(means[0]) if len(channels) == 1 else means.tolist()
+
         data = None
-        with nidaqmx.Task() as task:
+        with self._new_task() as task:
             # Add channels to the task
             for ch in channels:
                 task.ai_channels.add_ai_voltage_chan(
@@ -167,85 +346,102 @@ class DAQ:
 
         return data
             
-    def read_power(self, channels=None, samples_per_channel=10, sample_rate=1000, min_val=-10.0, max_val=10.0, unit="uW"):
+    def read_power(self, channels=None, samples_per_channel=10, sample_rate=1000, min_val=-10.0, max_val=10.0, unit="uW",
+                   fresh=True, return_std=False):
         """
         Read voltage from specified channels and convert to power in the specified unit.
+
+        The whole (channels, samples) voltage block is converted at once with
+        the per-channel photodiode calibration (see photodiode_vectors).
         
         Args:
-            channels (list): List of channel names to read from
+            channels (list): List of channel names to read from (all AI channels if None)
             samples_per_channel (int): Number of samples to take per channel
             sample_rate (float): Sampling rate in Hz
             min_val (float): Minimum voltage value
             max_val (float): Maximum voltage value
             unit (str): Power unit ('mW', 'uW', or 'W')
+            fresh (bool): when streaming, wait for samples acquired after the
+                call; False averages the latest buffered window instead
+            return_std (bool): also return the per-channel standard deviation
         
         Returns:
-            list: Power readings in specified unit
+            np.ndarray: mean power per channel in the specified unit, or
+            (mean, std) arrays if return_std is True
         """
-        with nidaqmx.Task() as task:
-            # Add channels to the task
-            for ch in channels:
-                task.ai_channels.add_ai_voltage_chan(
-                    physical_channel=ch,
-                    min_val=min_val,
-                    max_val=max_val
-                )
-            
-            # Configure timing
-            task.timing.cfg_samp_clk_timing(
-                rate=sample_rate,
-                sample_mode=nidaqmx.constants.AcquisitionType.FINITE,
-                samps_per_chan=samples_per_channel
-            )
-            
-            # Read voltage data
-            voltages = task.read(number_of_samples_per_channel=samples_per_channel)
-            
-            # Convert to numpy array for easier processing
-            voltages = np.array(voltages)
-            
-            # Average the samples for each channel
-            if voltages.ndim == 2:
-                voltages = np.mean(voltages, axis=1)
-            else:
-                voltages = [np.mean(voltages)]
-
-        # Convert voltage to power using photodiode-specific calibration
-        power_in_watts = []
-        for i, ch in enumerate(channels):
-            V = voltages[i]
-            if "ai0" in ch.lower():  
-                power = 3.8934e-04 * V #- 1.3769e-6  # PD1
-            elif "ai1" in ch.lower():  
-                power = 3.8853e-04 * V  #- 7.2653e-6 # PD2
-            elif "ai2" in ch.lower(): 
-                power = 3.7686e-04 * V  #- 4.1698e-5 # PD3
-            elif "ai3" in ch.lower():  
-                power = 4.0387e-04 * V  #+ 3.57e-7# PD4
-            elif "ai4" in ch.lower():  
-                power = 3.6247e-04 * V  #-2.37e-5# PD5
-            elif "ai5" in ch.lower(): 
-                power = 3.6618e-04 * V  #-3.57e-5# PD6
-            elif "ai6" in ch.lower():  
-                power = 3.7097e-04 * V  #-2.139e-5# PD7
-            elif "ai7" in ch.lower():  
-                power = 4.0287e-04 * V  #-2.216e-6# PD8
-
-            else:
-                # Fallback to default conversion
-                power = V / (self.config.get('load_resistor', 4700) * 
-                            self.config.get('responsivity', 1.07))
-            power_in_watts.append(power)
-
-        # Convert to the desired unit
-        if unit == "mW":
-            return [p * 1e3 for p in power_in_watts]
-        elif unit == "uW":
-            return [p * 1e6 for p in power_in_watts]
-        elif unit == "W":
-            return power_in_watts
-        else:
+        if unit not in POWER_UNITS:
             raise ValueError(f"[ERROR][DAQ] Unsupported unit: {unit}. Use 'mW', 'uW', or 'W'.")
+        if channels is None:
+            channels = self.list_ai_channels()
+
+        if self._stream_indices(channels) is not None:
+            # Shared continuous stream: average a fresh window, no task setup
+            voltages = self.read_stream(channels, samples_per_channel, fresh=fresh)
+        else:
+            with self._new_task() as task:
+                # Add channels to the task
+                for ch in channels:
+                    task.ai_channels.add_ai_voltage_chan(
+                        physical_channel=ch,
+                        min_val=min_val,
+                        max_val=max_val
+                    )
+                
+                # Configure timing
+                task.timing.cfg_samp_clk_timing(
+                    rate=sample_rate,
+                    sample_mode=nidaqmx.constants.AcquisitionType.FINITE,
+                    samps_per_chan=samples_per_channel
+                )
+                
+                # Read voltage data (1-D list for a single channel)
+                voltages = task.read(number_of_samples_per_channel=samples_per_channel)
+
+        return self._voltages_to_power(channels, voltages, unit, return_std)
+
+    def set_photodiode_calibration(self, calibration):
+        """
+        Replace the photodiode calibration.
+
+        Args:
+            calibration (dict): {"ai0": {"slope": W/V, "offset": W}, ...}, keyed
+                by channel terminal name; missing offsets default to 0
+        """
+        self.config["photodiode_calibration"] = calibration
+        self._pd_vectors.clear()
+
+    def photodiode_vectors(self, channels):
+        """
+        Per-channel (slope, offset) arrays converting volts to watts.
+
+        Channels without an entry in config["photodiode_calibration"] (or the
+        built-in defaults) use V / (load_resistor * responsivity).
+        """
+        key = tuple(channels)
+        vectors = self._pd_vectors.get(key)
+        if vectors is None:
+            calibration = self.config.get("photodiode_calibration", DEFAULT_PHOTODIODE_CALIBRATION)
+            fallback = 1.0 / (self.config.get('load_resistor', 4700) * self.config.get('responsivity', 1.07))
+            slope = np.full(len(channels), fallback)
+            offset = np.zeros(len(channels))
+            for i, ch in enumerate(channels):
+                entry = calibration.get(ch.split("/")[-1].lower())
+                if entry is not None:
+                    slope[i] = float(entry["slope"])
+                    offset[i] = float(entry.get("offset", 0.0))
+            vectors = (slope[:, None], offset[:, None])
+            self._pd_vectors[key] = vectors
+        return vectors
+
+    def _voltages_to_power(self, channels, voltages, unit, return_std=False):
+        """Convert a (channels, samples) voltage block to mean power (and std) in `unit`."""
+        voltages = np.asarray(voltages, dtype=float).reshape(len(channels), -1)
+        slope, offset = self.photodiode_vectors(channels)
+        power = (slope * voltages + offset) * POWER_UNITS[unit]
+        mean = power.mean(axis=1)
+        if return_std:
+            return mean, power.std(axis=1)
+        return mean
 
     def show_status(self):
         """
@@ -267,6 +463,7 @@ class DAQ:
         """
         if self._is_connected:
             print(f"[INFO][DAQ] Disconnecting device: {self.device_name}")
+            self.stop_stream()
             # Mark not connected
             self._is_connected = False
             self.device_name = None
@@ -278,8 +475,10 @@ class DAQ:
         Clear any existing DAQ tasks.
         Should be called after completing measurements to release hardware resources.
         """
+        if self.is_streaming:
+            return  # the shared stream task stays alive until stop_stream()
         try:
-            with nidaqmx.Task() as task:
+            with self._new_task() as task:
                 # Creating and closing an empty task helps clear any hanging tasks
                 pass
             print("[INFO][DAQ] Task cleared successfully")
@@ -0,0 +1,338 @@
+# app/devices/hardware.py
+"""
+Instrument setup shared by the GUI (main.py) and the headless runner
+(python -m app.run): settings loading, device tracing, and connecting the
+lab instruments, a simulated chip or a recorded trace. Nothing here imports
+the GUI.
+"""
+
+import json
+import logging
+import os
+
+from app.devices.daq_device import DAQ
+from app.devices.qontrol_device import QontrolDevice
+from app.devices.thorlabs_device import ThorlabsDevice
+from app.devices.switch_device import Switch
+from app.devices.simulated_chip import SimulatedChip
+from app.devices.mock_devices import MockQontrol, MockThorlabsPM100, MockDAQ, MockSwitch
+from app.utils.device_trace import DeviceTrace
+from app.utils.device_discovery import DeviceDiscovery
+from app.utils.lazy_import import lazy_import
+
+nidaqmx = lazy_import("nidaqmx")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SETTINGS_PATH = os.path.join(REPO_ROOT, "config", "settings.json")
+
+
+def load_settings(path=None):
+    """Load config/settings.json (or `path`)."""
+    with open(path or SETTINGS_PATH, "r") as f:
+        return json.load(f)
+
+
+def settings_path(path):
+    """A path from settings.json; relative paths are relative to the repo root, not the working directory."""
+    return path if os.path.isabs(path) else os.path.join(REPO_ROOT, path)
+
+
+def start_trace(config):
+    """Start recording/replaying device traffic as configured in settings.json "trace".
+
+    Returns:
+        str: the trace mode ("off", "record" or "replay")
+    """
+    trace = config.get("trace", {})
+    trace_mode = trace.get("mode", "off")
+    path = settings_path(trace.get("path", os.path.join("trace", "session.mztrace")))
+    if trace_mode == "record":
+        DeviceTrace.record(path)
+    elif trace_mode == "replay":
+        DeviceTrace.replay(path, realtime=bool(trace.get("realtime", True)))
+    return trace_mode
+
+
+def initialize_switch(port=None, switch_name="Switch"):
+    """Initialize switch device on the specified port, or the first discovered one"""
+    if port:
+        try:
+            switch = Switch(port)
+            # Test connection
+            channel = switch.get_channel()
+            if channel is not None:
+                logging.info(f"[{switch_name}] Connected to {port}, current channel: {channel}")
+                return switch
+            switch.close()  # release the port for other probes
+        except Exception as e:
+            logging.error(f"[{switch_name}] Failed to connect to {port}: {e}")
+            return None
+    else:
+        # Auto-detect switch
+        discovery = DeviceDiscovery.last() or DeviceDiscovery().run({"switch": 1})
+        for discovered in discovery.ports("switch"):
+            switch = initialize_switch(discovered, switch_name)
+            if switch:
+                return switch
+            discovery.forget(discovered)
+        logging.warning(f"[{switch_name}] No switch device detected")
+        return None
+
+
+def initialize_dual_switches(config, discovery=None, ports=None):
+    """
+    Initialize both input and output switches based on configuration.
+
+    Ports missing from the config are taken from `ports` (in that order) if
+    given, else from `discovery` (by default the last DeviceDiscovery run,
+    or a new one), output switch first.
+    """
+    # Get switch ports from config or use defaults
+    input_port = config.get("switch_input_port", None)
+    output_port = config.get("switch_output_port", None)
+    
+    switch_input = None
+    switch_output = None
+    used_ports = []  # Track which ports are already in use
+
+    # Use specified ports
+    if output_port:
+        switch_output = initialize_switch(output_port, "Output Switch")
+        if switch_output:
+            used_ports.append(output_port)
+
+    if input_port and input_port not in used_ports:
+        switch_input = initialize_switch(input_port, "Input Switch")
+        if switch_input:
+            used_ports.append(input_port)
+
+    # Fill the missing switches from the discovered ports
+    if not switch_input or not switch_output:
+        if ports is None:
+            if discovery is None:
+                discovery = DeviceDiscovery.last() or DeviceDiscovery().run({"switch": 2})
+            ports = discovery.ports("switch")
+        else:
+            discovery = None
+        for port in ports:
+            if port in used_ports:
+                continue
+            if switch_input and switch_output:
+                break
+            role, name = ("output", "Output Switch") if not switch_output else ("input", "Input Switch")
+            switch = initialize_switch(port, name)
+            if not switch:
+                if discovery is not None:
+                    discovery.forget(port)
+                continue
+            used_ports.append(port)
+            if discovery is not None:
+                discovery.remember_role(port, role)
+            if role == "output":
+                switch_output = switch
+            else:
+                switch_input = switch
+    
+    return switch_input, switch_output
+
+
+def initialize_hardware(config):
+    """Connect the lab instruments, falling back to mocks where none are found"""
+    # Identify the serial instruments concurrently (or from the port cache)
+    expected = {
+        "qontrol": 0 if config.get("qontrol_port") else 1,
+        "switch": sum(1 for key in ("switch_input_port", "switch_output_port") if not config.get(key)),
+    }
+    DeviceDiscovery(timeout=config.get("discovery_timeout", 0.25)).run(expected)
+
+    # List available Thorlabs devices
+    available_devices = ThorlabsDevice.list_available_devices()
+    logging.info(f"[Thorlabs] Found {len(available_devices)} Thorlabs devices:")
+    for i, device in enumerate(available_devices):
+        logging.info(f"{i+1}. {device['model']} (SN: {device['serial']})")
+    
+    # Initialize devices
+    qontrol = QontrolDevice(config=config)
+    # Connect to Qontrol device
+    qontrol.connect()
+
+    # Connect to multiple Thorlabs devices if available 
+    thorlabs_devices = []
+    
+    if available_devices:
+        # Connect to the first device
+        thorlabs = ThorlabsDevice.get_device(
+            serial=available_devices[0]['serial'], 
+            resource=available_devices[0]['resource'],
+            config=config
+        )
+        thorlabs_devices.append(thorlabs)
+        
+        # Connect to additional devices if available
+        if len(available_devices) > 1:
+            thorlabs1 = ThorlabsDevice.get_device(
+                serial=available_devices[1]['serial'], 
+                resource=available_devices[1]['resource'],
+                config=config
+            )
+            thorlabs_devices.append(thorlabs1)
+            
+        if len(available_devices) > 2:
+            thorlabs2 = ThorlabsDevice.get_device(
+                serial=available_devices[2]['serial'], 
+                resource=available_devices[2]['resource'],
+                config=config
+            )
+            thorlabs_devices.append(thorlabs2)
+    else:
+        # No devices found, use a mock device
+        thorlabs = ThorlabsDevice(config=config)
+        thorlabs.connect()
+        thorlabs_devices.append(thorlabs)
+
+    # daq = MockNIDAQ()
+    # Attempt to use a DAQ device or mock if unavailable
+    try:
+        daq_devices_info = DAQ.list_available_devices()
+        logging.info(f"[DAQ] Found {len(daq_devices_info)} NI-DAQ device(s):")
+        for i, dev_info in enumerate(daq_devices_info):
+            logging.info(f"{i+1}. {dev_info['product_type']} (Name: {dev_info['name']})")
+    
+        if len(daq_devices_info) == 0:
+            logging.info("[DAQ] No DAQ devices found, using mock NI-DAQ device.")
+            daq = MockDAQ()
+        else:
+            daq = DAQ.get_device(config=config)
+    except ImportError:
+        logging.info("[DAQ] nidaqmx not installed, using mock NI-DAQ device.")
+        daq = MockDAQ()
+    except nidaqmx.errors.DaqNotFoundError:
+        logging.info("[DAQ] NI-DAQmx not found, using mock NI-DAQ device.")
+        daq = MockDAQ()
+
+    # Initialize switches
+    switch_input, switch_output = initialize_dual_switches(config)
+
+    # Print switch status
+    logging.info("Switch Configuration:")
+    logging.info(f"  Input Switch: {'Connected' if switch_input else 'Not connected'}")
+    logging.info(f"  Output Switch: {'Connected' if switch_output else 'Not connected'}")
+
+    # For backward compatibility - if only one switch is connected, use it as output
+    if not switch_output and switch_input:
+        logging.info("Only one switch detected, using it as output switch")
+        switch_output = switch_input
+        switch_input = None
+
+    return qontrol, thorlabs_devices, daq, switch_input, switch_output
+
+
+def initialize_simulation(config):
+    """
+    Build mock instruments around a SimulatedChip (settings.json "simulation"),
+    so the GUI and experiments run end to end without the lab.
+    """
+    settings = config.get("simulation", {})
+    chip = SimulatedChip.from_calibration_file(
+        settings_path(settings.get("calibration", os.path.join("config", "12_modechip_20250727_ref10k_1550nm.json"))),
+        n_modes=int(settings.get("n_modes", 12)),
+        input_power_mW=float(settings.get("input_power_mW", 1.0)),
+        noise=float(settings.get("noise", 0.0)),
+        noise_floor_mW=float(settings.get("noise_floor_mW", 0.0)),
+        settle_time=float(settings.get("settle_ms", 0.0)) / 1e3,
+        loss_dB=float(settings.get("loss_dB", 0.0)),
+        seed=settings.get("seed"),
+    )
+    logging.info(f"[SimChip] Simulating a {chip.n_modes}x{chip.n_modes} mesh with {chip.n_channels} heaters")
+
+    qontrol = QontrolDevice(config=config)
+    qontrol.attach(MockQontrol(chip=chip))
+
+    thorlabs = ThorlabsDevice(config=config)
+    thorlabs.use_mock(MockThorlabsPM100(chip=chip))
+
+    daq = MockDAQ(chip=chip)
+    daq.connect()
+    switch_input = MockSwitch(chip=chip, role="input")
+    switch_output = MockSwitch(chip=chip, role="output")
+    return qontrol, [thorlabs], daq, switch_input, switch_output
+
+
+def initialize_replay(config):
+    """
+    Reconnect the instruments of a recorded device trace (settings.json
+    "trace"); the drivers get their answers from the trace instead of the lab.
+    """
+    qontrol = QontrolDevice(config=config)
+    qontrol.connect()
+
+    thorlabs_devices = [ThorlabsDevice.get_device(resource=resource, config=config)
+                        for resource in DeviceTrace.replay_sources("thorlabs")]
+    if not thorlabs_devices:
+        thorlabs = ThorlabsDevice(config=config)
+        thorlabs.connect()
+        thorlabs_devices.append(thorlabs)
+
+    daq = DAQ.get_device(config=config) if DeviceTrace.recorded("daq.system") else MockDAQ()
+
+    # Same ports as the recorded session, in the order they were opened
+    switch_input, switch_output = initialize_dual_switches(config, ports=DeviceTrace.replay_sources("switch"))
+    if not switch_output and switch_input:
+        switch_output, switch_input = switch_input, None
+    return qontrol, thorlabs_devices, daq, switch_input, switch_output
+
+
+class Instruments:
+    """The connected instruments, as passed around by the experiment runners.
+
+    Args:
+        qontrol (QontrolDevice): current driver
+        thorlabs (list[ThorlabsDevice]): power meters
+        daq (DAQ | MockDAQ): NI DAQ
+        switch_input, switch_output: optical switches (None if absent)
+    """
+
+    def __init__(self, qontrol=None, thorlabs=None, daq=None, switch_input=None, switch_output=None):
+        self.qontrol = qontrol
+        self.thorlabs = list(thorlabs or [])
+        self.daq = daq
+        self.switch_input = switch_input
+        self.switch_output = switch_output
+
+    @classmethod
+    def connect(cls, config, trace_mode="off"):
+        """Connect whatever initialize_devices selects for `config`."""
+        return cls(*initialize_devices(config, trace_mode))
+
+    def close(self):
+        shutdown_devices(self.qontrol, self.thorlabs, self.daq)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def initialize_devices(config, trace_mode="off"):
+    """Simulated chip, trace replay or lab hardware, as selected by the settings.
+
+    Returns:
+        tuple: (qontrol, thorlabs_devices, daq, switch_input, switch_output)
+    """
+    if config.get("simulation", {}).get("enabled"):
+        return initialize_simulation(config)
+    if trace_mode == "replay":
+        return initialize_replay(config)
+    return initialize_hardware(config)
+
+
+def shutdown_devices(qontrol, thorlabs_devices, daq):
+    """Disconnect the instruments and close the device trace."""
+    for device in thorlabs_devices or []:
+        device.disconnect()
+    if daq is not None:
+        daq.disconnect()
+    if qontrol is not None:
+        qontrol.disconnect()
+    DeviceTrace.stop()
@@ -1,13 +1,92 @@
-from app.imports import *
+import logging
+import re
+import threading
+import time
+import numpy as np
+from app.utils.ring_buffer import RingBuffer
+from app.devices.daq_device import POWER_UNITS
+
+class _ChipCurrents(list):
+    """Current list of MockQontrol; writes are clamped to imax and passed to the chip."""
+
+    def __init__(self, owner):
+        super().__init__([0.0] * owner.n_chs)
+        self._owner = owner
+
+    def __setitem__(self, channel, value):
+        limit = self._owner.imax[channel]
+        value = min(float(value), limit) if limit else float(value)
+        super().__setitem__(channel, value)
+        if self._owner.chip is not None:
+            self._owner.chip.set_current(channel, value)
+
 
 # Mock Qontrol Device
 class MockQontrol:
-    def __init__(self, serial_port_name=None, response_timeout=None):
+    def __init__(self, serial_port_name=None, response_timeout=None, chip=None):
         self.device_id = "QX-1234"
         self.firmware = "1.0.0"
-        self.n_chs = 100  # Simulate 100 channels
+        self.chip = chip  # optional SimulatedChip driven by the currents
+        self.n_chs = max(100, chip.n_channels if chip is not None else 0)  # Simulate 100 channels
         self.imax = [0] * self.n_chs
-        self.i = [0] * self.n_chs
+        self.i = _ChipCurrents(self)
+        self.log = []
+        self._replies = []  # "OK" per command accepted by transmit
+
+    @property
+    def v(self):
+        """Heater voltages (V); 0 without a chip."""
+        if self.chip is None:
+            return [0.0] * self.n_chs
+        voltages = np.zeros(self.n_chs)
+        voltages[:self.chip.n_channels] = self.chip.voltages()
+        return voltages.tolist()
+
+    def get_all_values(self, para):
+        if para == 'V':
+            return self.v
+        if para == 'I':
+            return list(self.i)
+        if para == 'IMAX':
+            return list(self.imax)
+        raise AttributeError(f"MockQontrol: unsupported parameter {para}")
+
+    def set_all_values(self, para, values):
+        if not isinstance(values, (list, tuple, np.ndarray)):
+            values = [values] * self.n_chs
+        if para == 'IMAX':
+            self.imax = [float(v) for v in values]
+        elif para == 'I':
+            for ch, value in enumerate(values):
+                list.__setitem__(self.i, ch, float(value))
+            if self.chip is not None:
+                currents = np.zeros(self.chip.n_channels)
+                n = min(len(values), self.chip.n_channels)
+                currents[:n] = np.asarray(values[:n], dtype=float)
+                self.chip.set_currents(currents)
+        else:
+            raise AttributeError(f"MockQontrol: unsupported parameter {para}")
+
+    def transmit(self, command_string, binary_mode=False):
+        """Accept the ASCII "I<ch>=<value>" commands sent by QontrolDevice.set_currents."""
+        currents = np.full(self.chip.n_channels if self.chip is not None else self.n_chs, np.nan)
+        for line in command_string.splitlines():
+            match = re.fullmatch(r"I(\d+)=([-+0-9.eE]+)", line.strip())
+            if not match:
+                continue
+            ch, value = int(match.group(1)), float(match.group(2))
+            limit = self.imax[ch]
+            value = min(value, limit) if limit else value
+            list.__setitem__(self.i, ch, value)
+            if ch < len(currents):
+                currents[ch] = value
+            self._replies.append("OK\n")
+        if self.chip is not None:
+            self.chip.set_currents(currents)
+
+    def receive(self):
+        replies, self._replies = self._replies, []
+        return replies, []
 
     def connect(self):
         logging.info("MockQontrol: Connected successfully.")
@@ -16,8 +95,12 @@ class MockQontrol:
         logging.info("MockQontrol: Connection closed.")
 
 class MockSwitch:
-    def __init__(self):
+    def __init__(self, chip=None, role="output"):
         self.current_channel = None  # Simulates the currently active channel
+        self.last_timing = {}
+        self.chip = chip  # optional SimulatedChip whose input/output port this switch selects
+        self.role = role
+        self.port = f"MOCK-{role.upper()}"
 
     def _checksum(self, data):
         """
@@ -41,6 +124,12 @@ class MockSwitch:
 
         # Simulate setting the channel
         self.current_channel = channel
+        if self.chip is not None:
+            port = channel - 1 if channel else None  # channel 0 blocks, 1..N are ports
+            if self.role == "input":
+                self.chip.select_input(port)
+            else:
+                self.chip.select_output(port)
         logging.info(f"[MOCK][SWITCH] Channel set to {channel}")
 
     def get_channel(self):
@@ -52,15 +141,47 @@ class MockSwitch:
             return None
         logging.info(f"[MOCK][SWITCH] Current channel is {self.current_channel}")
         return self.current_channel
+
+    def set_and_confirm(self, channel):
+        """
+        Simulates setting the channel and reading it back.
+        """
+        t0 = time.perf_counter()
+        self.set_channel(channel)
+        t1 = time.perf_counter()
+        confirmed = self.get_channel() == channel
+        t2 = time.perf_counter()
+        self.last_timing = {
+            "set_ms": (t1 - t0) * 1e3,
+            "confirm_ms": (t2 - t1) * 1e3,
+            "total_ms": (t2 - t0) * 1e3,
+        }
+        return confirmed
+
+    def close(self):
+        """Nothing to release on the mock switch."""
+        logging.info("[MOCK][SWITCH] Closed.")
     
 # Mock Thorlabs PM100D Power Meter
 class MockThorlabsPM100:
     """Mock version of Thorlabs PM100D Power Meter for testing."""
     
-    def __init__(self, inst=None):
-        self.power = 0.123  # Simulated power reading
+    def __init__(self, inst=None, chip=None):
+        self.chip = chip  # optional SimulatedChip, read at its selected output port
+        self._power = 0.123  # Simulated power reading
         self.connected = False
 
+    @property
+    def power(self):
+        """Power (W): fixed value, or the simulated chip output."""
+        if self.chip is None:
+            return self._power
+        return float(self.chip.measure([self.chip.output_port])[0, 0]) * 1e-3
+
+    @power.setter
+    def power(self, value):
+        self._power = value
+
     def connect(self):
         """Simulates connecting to the power meter."""
         self.connected = True
@@ -71,6 +192,11 @@ class MockThorlabsPM100:
         self.connected = False
         logging.info("[Mock] Thorlabs PM100D disconnected.")
 
+    @property
+    def read(self):
+        """Same attribute as ThorlabsPM100.read (W)."""
+        return self.power
+
     def read_power(self):
         """Simulated power reading."""
         if not self.connected:
@@ -82,12 +208,21 @@ class MockDAQ:
     Mock version of the DAQ class for testing when no physical DAQ is present.
     """
 
-    def __init__(self, config=None):
+    def __init__(self, config=None, chip=None):
         self.config = config if config is not None else {}
+        self.chip = chip  # optional SimulatedChip; aiK reads output port K
         self._is_connected = False
         # Give the mock a 'device_name' so it looks like the real one
         self.device_name = "MockDAQ"
 
+        # Synthetic continuous stream (same interface as DAQ.start_stream)
+        self._stream_thread = None
+        self._stream_stop = threading.Event()
+        self.stream_channels = []
+        self.stream_rate = None
+        self.stream_buffer = None
+        self.stream_noise = 1e-5  # W, standard deviation of the synthetic signal
+
     def connect(self, device_name=None):
         # Always "succeed" in connecting
         self._is_connected = True
@@ -149,9 +284,104 @@ class MockDAQ:
             logging.info(f"[MockDAQ] Device Name: {self.device_name}")
             logging.info(f"[MockDAQ] AI Channels: {self.list_ai_channels()}")
 
+    # ------------------------------------------------------------------
+    # Synthetic continuous acquisition
+    # ------------------------------------------------------------------
+    @property
+    def is_streaming(self):
+        return self._stream_thread is not None and self._stream_thread.is_alive()
+
+    def _stream_levels(self, channels):
+        """Mean signal of each streamed channel (W), same values as read_power."""
+        return 0.001 * (np.arange(len(channels)) + 1)
+
+    @staticmethod
+    def _channel_port(channel):
+        """Output port read by a channel name ('MockDAQ/ai3' -> 3)."""
+        match = re.search(r"ai(\d+)$", channel)
+        return int(match.group(1)) if match else None
+
+    def _samples(self, channels, samples_per_channel, rng=None):
+        """(channels, samples) block in W, from the chip when one is attached."""
+        if self.chip is not None:
+            ports = [self._channel_port(ch) for ch in channels]
+            return self.chip.measure(ports, samples_per_channel) * 1e-3
+        levels = np.repeat(self._stream_levels(channels)[:, None], samples_per_channel, axis=1)
+        if rng is None:
+            return levels
+        return levels + self.stream_noise * rng.standard_normal(levels.shape)
+
+    def start_stream(self, channels=None, sample_rate=1000, buffer_seconds=10.0, chunk_size=None,
+                     min_val=-10.0, max_val=10.0):
+        """
+        Simulate a hardware-timed stream: a thread appends noisy samples
+        around `_stream_levels` to `stream_buffer` in real time.
+        """
+        if not self._is_connected:
+            logging.info("[MockDAQ] Device not connected.")
+            return False
+        if channels is None:
+            channels = self.list_ai_channels()
+        if not channels:
+            logging.info("[MockDAQ] No channels to stream.")
+            return False
+        channels = list(channels)
+        if self.is_streaming and channels == self.stream_channels and sample_rate == self.stream_rate:
+            return True
+        self.stop_stream()
+
+        chunk_size = int(chunk_size or max(1, sample_rate // 20))
+        capacity = max(int(sample_rate * buffer_seconds), chunk_size)
+        self.stream_channels = channels
+        self.stream_rate = sample_rate
+        self.stream_buffer = RingBuffer(len(channels), capacity)
+        self._stream_stop.clear()
+        self._stream_thread = threading.Thread(
+            target=self._stream_loop, args=(self.stream_buffer, chunk_size, sample_rate), daemon=True
+        )
+        self._stream_thread.start()
+        logging.info(f"[MockDAQ] Streaming {len(channels)} channels at {sample_rate} Hz")
+        return True
+
+    def _stream_loop(self, buffer, chunk_size, sample_rate):
+        rng = np.random.default_rng()
+        period = chunk_size / sample_rate
+        next_t = time.perf_counter()
+        while not self._stream_stop.is_set():
+            buffer.write(self._samples(self.stream_channels, chunk_size, rng))
+            next_t += period
+            self._stream_stop.wait(max(0.0, next_t - time.perf_counter()))
+
+    def stop_stream(self):
+        self._stream_stop.set()
+        if self._stream_thread is not None:
+            self._stream_thread.join(timeout=2.0)
+        self._stream_thread = None
+        self.stream_channels = []
+        self.stream_rate = None
+
+    def read_stream(self, channels, samples_per_channel=10, fresh=True, timeout=None):
+        """Window of synthetic samples, see DAQ.read_stream."""
+        if not self.is_streaming or not set(channels) <= set(self.stream_channels):
+            raise RuntimeError("Requested channels are not being streamed")
+        rows = [self.stream_channels.index(ch) for ch in channels]
+        buffer = self.stream_buffer
+        if not fresh:
+            return buffer.latest(samples_per_channel)[rows]
+        start = buffer.total
+        if timeout is None:
+            timeout = 1.0 + 2 * samples_per_channel / self.stream_rate
+        if not buffer.wait_for(start + samples_per_channel, timeout=timeout):
+            raise TimeoutError("[MockDAQ] Stream did not deliver samples in time")
+        return buffer.since(start, samples_per_channel)[rows]
+
+    def clear_task(self):
+        """Nothing to release on the mock."""
+
     def disconnect(self):
         if self._is_connected:
             logging.info(f"[MockDAQ] Disconnecting device: {self.device_name}")
+            self.stop_stream()
             self._is_connected = False
             self.device_name = None
         else:
@@ -164,7 +394,8 @@ class MockDAQ:
         return [f"{self.device_name}/ai{i}" for i in range(8)]
 
 
-    def read_power(self, channels=None, samples_per_channel=10, unit="uW"):
+    def read_power(self, channels=None, samples_per_channel=10, sample_rate=1000, min_val=-10.0, max_val=10.0, unit="uW",
+                   fresh=True, return_std=False):
         """
         Simulate reading power values for the specified channels.
 
@@ -172,8 +403,13 @@ class MockDAQ:
                         If None, read from all available AI channels.
         :param samples_per_channel: Number of samples to simulate for each channel.
         :param unit: The desired unit for power measurement. Options are "mW", "uW", or "W".
-        :return: A list of simulated power values in the specified unit.
+        :param return_std: also return the per-channel standard deviation
+        :return: Array of simulated power values in the specified unit
+                 (or (mean, std) arrays if return_std is True).
         """
+        if unit not in POWER_UNITS:
+            raise ValueError(f"[ERROR][MockDAQ] Unsupported unit: {unit}. Use 'mW', 'uW', or 'W'.")
+
         if not self._is_connected:
             logging.info("[MockDAQ] Device not connected.")
             return None
@@ -184,16 +420,14 @@ class MockDAQ:
 
         if not channels:
             logging.info("[MockDAQ] No channels to read from.")
-            return []  # Return an empty list if no channels are available
-
-        simulated_power_in_watts = [0.001 * (i + 1) for i in range(len(channels))]  # Simulated power in watts
+            return np.zeros(0)
 
-        # Convert to the desired unit
-        if unit == "mW":
-            return [p * 1000.0 for p in simulated_power_in_watts]  # Convert to milliwatts
-        elif unit == "uW":
-            return [p * 1e6 for p in simulated_power_in_watts]  # Convert to microwatts
-        elif unit == "W":
-            return simulated_power_in_watts  # Keep in watts
+        if self.is_streaming and set(channels) <= set(self.stream_channels):
+            samples = self.read_stream(channels, samples_per_channel, fresh=fresh)
         else:
-            raise ValueError(f"[ERROR][MockDAQ] Unsupported unit: {unit}. Use 'mW', 'uW', or 'W'.")
\ No newline at end of file
+            samples = self._samples(channels, samples_per_channel)
+
+        power = samples * POWER_UNITS[unit]
+        if return_std:
+            return power.mean(axis=1), power.std(axis=1)
+        return power.mean(axis=1)
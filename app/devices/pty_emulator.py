@@ -0,0 +1,392 @@
+# app/devices/pty_emulator.py
+"""
+Wire-protocol emulators for the Qontrol driver and the optical switches.
+
+Each emulator owns a pseudo-terminal pair and answers on the master side,
+so the unmodified drivers (qontrol.QXOutput through QontrolDevice, Switch,
+initialize_dual_switches) open the slave path exactly like a USB serial
+port. Per-command latency and randomly dropped responses reproduce slow or
+flaky links; the switch can answer with either the EF EF or the ED FA
+header.
+
+    python -m app.devices.pty_emulator --switches 2 --qontrol-modules 17
+    python -m app.devices.pty_emulator --latency-ms 2 --drop-rate 0.01 --bench 200
+
+Print the port paths, which go into settings.json as "switch_input_port",
+"switch_output_port" and "qontrol_port". Only the ASCII Qontrol protocol is
+emulated (QXOutput's default, binary_mode=False).
+
+POSIX only: pseudo-terminals do not exist on Windows, use a com0com pair
+there instead.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import select
+import threading
+import time
+
+import numpy as np
+
+SWITCH_HEADER = b"\xEF\xEF"
+SWITCH_ALT_HEADER = b"\xED\xFA"
+
+# Qontrol error codes used by the emulator (see the Qontrol programming manual)
+ERR_OVER_CURRENT = 2
+ERR_UNRECOGNISED_COMMAND = 10
+ERR_UNRECOGNISED_CHANNEL = 12
+
+# e.g. "I5=1.2", "IMAX?"... "Vall?", "IVEC8=0.1,0.2"
+_COMMAND = re.compile(r"^(VMAX|IMAX|V|I)(ALL|VEC)?(\d*)([=?])(.*)$", re.IGNORECASE)
+
+
+class PtyEmulator:
+    """Base class: serve a byte protocol on a pseudo-terminal.
+
+    Subclasses implement `_parse(buffer) -> (consumed, responses)`, taking
+    complete commands off the front of the receive buffer and returning one
+    response (bytes, or None for no reply) per command.
+
+    Args:
+        name (str): label used in logs
+        latency (float): delay before every response, seconds
+        drop_rate (float): probability that a response is never sent
+        seed (int, optional): seed of the drop generator
+    """
+
+    def __init__(self, name, latency=0.0, drop_rate=0.0, seed=None):
+        if os.name != "posix":
+            raise RuntimeError("pty emulators need a POSIX system; use a com0com pair on Windows")
+        import tty
+
+        self.name = name
+        self.latency = float(latency)
+        self.drop_rate = float(drop_rate)
+        self.stats = {"commands": 0, "dropped": 0, "bytes_in": 0, "bytes_out": 0}
+        self._rng = random.Random(seed)
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._buffer = b""
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._serve, name=f"pty-{self.name}", daemon=True)
+            self._thread.start()
+            logging.info(f"[PTY] {self.name} serving on {self.port}")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _serve(self):
+        # The slave fd stays open here, so a client closing the port does not
+        # turn the master into EOF; the next client can simply reopen it.
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._master], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                data = os.read(self._master, 4096)
+            except OSError:
+                break
+            self.stats["bytes_in"] += len(data)
+            self._buffer += data
+            consumed, responses = self._parse(self._buffer)
+            self._buffer = self._buffer[consumed:]
+            for response in responses:
+                self._reply(response)
+
+    def _reply(self, response):
+        self.stats["commands"] += 1
+        if response is None:
+            return
+        if self.drop_rate and self._rng.random() < self.drop_rate:
+            self.stats["dropped"] += 1
+            return
+        if self.latency:
+            time.sleep(self.latency)
+        os.write(self._master, response)
+        self.stats["bytes_out"] += len(response)
+
+    def _parse(self, buffer):
+        raise NotImplementedError
+
+
+class SwitchEmulator(PtyEmulator):
+    """Optical switch speaking the EF EF framed protocol.
+
+    Commands are `EF EF <len> <payload...> <checksum>`; set (0x0D) and get
+    (0x02) are answered with `<header> 04 FF <cmd> <channel> <checksum>`.
+    Frames with a bad checksum or an unknown command get no reply, like the
+    hardware.
+
+    Args:
+        channel (int): initially selected channel (0 = block)
+        n_channels (int): highest valid channel
+        header (bytes): SWITCH_HEADER or SWITCH_ALT_HEADER for responses
+        chip (SimulatedChip, optional): routed like MockSwitch
+        role (str): "input" or "output" side of `chip`
+    """
+
+    def __init__(self, channel=1, n_channels=64, header=SWITCH_ALT_HEADER, chip=None, role="output",
+                 name="switch", **kwargs):
+        super().__init__(name, **kwargs)
+        self.n_channels = n_channels
+        self.header = bytes(header)
+        self.chip = chip
+        self.role = role
+        self.channel = 0
+        self.select(channel)
+
+    def select(self, channel):
+        self.channel = channel
+        if self.chip is not None:
+            port = channel - 1 if channel > 0 else None
+            (self.chip.select_input if self.role == "input" else self.chip.select_output)(port)
+
+    def _frame(self, cmd, channel):
+        frame = self.header + bytes([0x04, 0xFF, cmd, channel & 0xFF])
+        return frame + bytes([sum(frame) & 0xFF])
+
+    def _parse(self, buffer):
+        consumed, responses = 0, []
+        while True:
+            start = buffer.find(SWITCH_HEADER, consumed)
+            if start < 0:
+                # Keep a trailing EF that may be the first half of a header
+                consumed = max(consumed, len(buffer) - 1 if buffer.endswith(b"\xEF") else len(buffer))
+                return consumed, responses
+            if len(buffer) < start + 3 or len(buffer) < start + 3 + buffer[start + 2]:
+                return start, responses
+            end = start + 3 + buffer[start + 2]
+            frame, consumed = buffer[start:end], end
+            if sum(frame[:-1]) & 0xFF != frame[-1] or len(frame) < 6:
+                responses.append(None)
+                continue
+            cmd = frame[4]
+            if cmd == 0x0D and len(frame) == 9 and frame[7] <= self.n_channels:
+                self.select(frame[7])
+                responses.append(self._frame(0x0D, self.channel))
+            elif cmd == 0x02:
+                responses.append(self._frame(0x02, self.channel))
+            else:
+                responses.append(None)
+
+
+class QontrolEmulator(PtyEmulator):
+    """Qontrol daisy chain speaking the ASCII protocol used by qontrol.QXOutput.
+
+    Supports id?, nup=, nupall?/nup?, vfull?, ifull?, nchan?, firmware?,
+    lifetime?, and V/I/VMAX/IMAX as single-channel set/get, `all?` reads and
+    `VEC` writes. Set commands answer OK; unknown commands E10, bad channels
+    E12, currents above IMAX are clamped and answer E02.
+
+    Args:
+        n_modules (int): Q8iv modules in the chain (8 channels each)
+        device_type (str): module type reported in the IDs
+        resistance_kohm (float): heater resistance for V = I*R without a chip
+        chip (SimulatedChip, optional): currents are forwarded to it and
+            voltages come from its resistance fit
+    """
+
+    V_FULL, I_FULL = 12.0, 24.0
+    FIRMWARE = "v2.4.1-emulated"
+
+    def __init__(self, n_modules=2, device_type="Q8iv", resistance_kohm=1.0, chip=None,
+                 name="qontrol", **kwargs):
+        super().__init__(name, **kwargs)
+        self.n_modules = n_modules
+        self.device_type = device_type
+        self.n_chs = 8 * n_modules
+        self.resistance_kohm = resistance_kohm
+        self.chip = chip
+        self._started = time.monotonic()
+        self.values = {
+            "I": np.zeros(self.n_chs),
+            "V": np.zeros(self.n_chs),
+            "IMAX": np.full(self.n_chs, self.I_FULL),
+            "VMAX": np.full(self.n_chs, self.V_FULL),
+        }
+
+    def module_id(self, index):
+        return f"{self.device_type}-{index + 1:04X}"
+
+    def voltages(self):
+        if self.chip is None:
+            return self.values["I"] * self.resistance_kohm
+        volts = np.zeros(self.n_chs)
+        chip_v = self.chip.voltages()
+        n = min(self.n_chs, len(chip_v))
+        volts[:n] = chip_v[:n]
+        return volts
+
+    def _set(self, para, ch, value):
+        """Store one value; returns an error code or None."""
+        if not 0 <= ch < self.n_chs:
+            return ERR_UNRECOGNISED_CHANNEL
+        error = None
+        if para == "I" and value > self.values["IMAX"][ch]:
+            value, error = self.values["IMAX"][ch], ERR_OVER_CURRENT
+        self.values[para][ch] = value
+        if para == "I" and self.chip is not None and ch < self.chip.n_channels:
+            self.chip.set_current(ch, value)
+        return error
+
+    def _get(self, para):
+        return self.voltages() if para == "V" else self.values[para]
+
+    def _parse(self, buffer):
+        consumed, responses = 0, []
+        while True:
+            end = buffer.find(b"\n", consumed)
+            if end < 0:
+                return consumed, responses
+            line = buffer[consumed:end].decode("ascii", errors="replace").strip()
+            consumed = end + 1
+            if line:
+                responses.append(self.handle(line).encode("ascii"))
+
+    def handle(self, line):
+        """Response text for one command line."""
+        cmd = line.replace(" ", "")
+        lower = cmd.lower()
+        if lower == "id?":
+            return self.module_id(0) + "\n"
+        if lower.startswith("nup="):
+            return "OK\n"
+        if lower in ("nupall?", "nup?"):
+            return "".join(f"{self.module_id(k)} : {k}\n" for k in range(self.n_modules))
+        if lower == "vfull?":
+            return f"{self.V_FULL} V\n"
+        if lower == "ifull?":
+            return f"{self.I_FULL} mA\n"
+        if lower == "nchan?":
+            return f"{self.n_chs}\n"
+        if lower == "firmware?":
+            return f"{self.FIRMWARE}\n"
+        if lower == "lifetime?":
+            return f"{int(time.monotonic() - self._started)}\n"
+
+        ob = _COMMAND.match(cmd)
+        if ob is None:
+            return f"E{ERR_UNRECOGNISED_COMMAND:02d}:00\n"
+        para, mode, ch, op, value = ob.groups()
+        para, mode = para.upper(), (mode or "").upper()
+        try:
+            if mode == "ALL" and op == "?":
+                return "".join(f"{v:.4f}\n" for v in self._get(para))
+            if mode == "VEC" and op == "=":
+                first = int(ch or 0)
+                errors = [self._set(para, first + k, float(v)) for k, v in enumerate(value.split(","))]
+                return self._status(errors, first)
+            if mode == "" and ch and op == "?":
+                channel = int(ch)
+                if not 0 <= channel < self.n_chs:
+                    return f"E{ERR_UNRECOGNISED_CHANNEL:02d}:{channel:02d}\n"
+                return f"{self._get(para)[channel]:.4f}\n"
+            if mode == "" and ch and op == "=":
+                return self._status([self._set(para, int(ch), float(value))], int(ch))
+        except ValueError:
+            pass
+        return f"E{ERR_UNRECOGNISED_COMMAND:02d}:00\n"
+
+    @staticmethod
+    def _status(errors, first):
+        for k, error in enumerate(errors):
+            if error is not None:
+                return f"E{error:02d}:{first + k:02d}\n"
+        return "OK\n"
+
+
+# ----------------------------------------------------------------------
+# Command line: serve (and optionally benchmark) emulated devices
+# ----------------------------------------------------------------------
+def _bench(switches, qontrol, n):
+    """Round-trip throughput of the real drivers against the emulators."""
+    from app.devices.qontrol_device import QontrolDevice
+    from app.devices.switch_device import Switch
+
+    for emulator in switches:
+        switch = Switch(emulator.port, timeout=0.5)
+        t0 = time.perf_counter()
+        ok = sum(switch.set_and_confirm(1 + k % 12) for k in range(n))
+        dt = time.perf_counter() - t0
+        switch.close()
+        print(f"[BENCH] switch {emulator.port}: {n} set_and_confirm in {dt:.3f} s "
+              f"({n / dt:.0f}/s, {ok} confirmed)")
+
+    if qontrol is not None:
+        device = QontrolDevice(config={"qontrol_port": qontrol.port, "globalcurrrentlimit": 5.0})
+        device.connect()
+        rng = np.random.default_rng(0)
+        t0 = time.perf_counter()
+        written = sum(device.set_currents(rng.uniform(0, 5, device.device.n_chs))[0] for _ in range(n))
+        dt = time.perf_counter() - t0
+        print(f"[BENCH] qontrol {qontrol.port}: {n} full-vector set_currents in {dt:.3f} s "
+              f"({n / dt:.1f}/s, {written} channel writes)")
+        device.disconnect()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve emulated Qontrol/switch devices on pseudo-terminals.")
+    parser.add_argument("--switches", type=int, default=2, help="number of switches (input, output, ...)")
+    parser.add_argument("--qontrol-modules", type=int, default=17, help="Q8iv modules, 0 for none")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay before every response")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="probability of dropping a response")
+    parser.add_argument("--header", choices=["edfa", "efef"], default="edfa", help="switch response header")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--bench", type=int, default=0, metavar="N", help="run N round trips per device and exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING if args.bench else logging.INFO)
+    link = {"latency": args.latency_ms / 1e3, "drop_rate": args.drop_rate, "seed": args.seed}
+    header = SWITCH_ALT_HEADER if args.header == "edfa" else SWITCH_HEADER
+    switches = [SwitchEmulator(header=header, name=f"switch{k}", **link).start() for k in range(args.switches)]
+    qontrol = QontrolEmulator(args.qontrol_modules, **link).start() if args.qontrol_modules else None
+
+    ports = {}
+    if len(switches) > 0:
+        ports["switch_input_port"] = switches[0].port
+    if len(switches) > 1:
+        ports["switch_output_port"] = switches[1].port
+    if qontrol is not None:
+        ports["qontrol_port"] = qontrol.port
+    print(json.dumps(ports, indent=2))
+
+    try:
+        if args.bench:
+            _bench(switches, qontrol, args.bench)
+        else:
+            print("[PTY] Serving, Ctrl+C to stop.")
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for emulator in switches + ([qontrol] if qontrol else []):
+            emulator.stop()
+
+
+if __name__ == "__main__":
+    main()
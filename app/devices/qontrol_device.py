@@ -1,7 +1,17 @@
 # app/devices/qontrol_device.py
 
-from app.imports import *
-import platform  
+import logging
+import platform
+import time
+import numpy as np
+import serial
+import serial.tools.list_ports
+from app.utils.lazy_import import lazy_import
+from app.utils.io_arbiter import IOArbiter, EXPERIMENT, MEASUREMENT, HOUSEKEEPING
+from app.utils.device_trace import DeviceTrace
+from app.utils.device_discovery import DeviceDiscovery
+
+qontrol = lazy_import("qontrol")  # vendor driver, imported when a port is opened
 
 
 
@@ -19,6 +29,10 @@ class QontrolDevice:
         self.config = config if config is not None else {}
         # Global current limit (in mA) to be set on all channels after connecting.
         self.globalcurrrentlimit = self.config.get("globalcurrrentlimit")
+        # Last current written to each channel (mA); NaN = unknown
+        self.shadow_currents = np.zeros(0)
+        # All serial traffic runs on the arbiter's thread, by priority
+        self.arbiter = IOArbiter("qontrol")
 
     def _enforce_operation_delay(self):
         """Ensure minimum time between operations"""
@@ -32,7 +46,22 @@ class QontrolDevice:
         """
         Scan available COM ports for a Qontrol device.
         Prioritize FTDI devices (which Qontrol uses).
+        A port given as config["qontrol_port"] (e.g. a pty emulator), the
+        recorded port when replaying a device trace, and ports identified by
+        the last DeviceDiscovery run are tried first.
         """
+        discovery = DeviceDiscovery.last()
+        preferred = [DeviceTrace.replay_port("qontrol"), self.config.get("qontrol_port")]
+        preferred += DeviceDiscovery.last_ports("qontrol")
+        tried = set()
+        for port_name in dict.fromkeys(p for p in preferred if p):
+            tried.add(port_name)
+            print(f"[INFO][Qontrol] Trying known port {port_name}...")
+            if self._open_port(port_name):
+                return port_name
+            if discovery is not None:
+                discovery.forget(port_name)
+
         print("\n[INFO][Qontrol] Scanning available COM ports...")
         available_ports = list(serial.tools.list_ports.comports())
         # Search the higher-numbered ports first.
@@ -44,7 +73,13 @@ class QontrolDevice:
 
         print("[INFO][Qontrol] Available ports:", [port.device for port in available_ports])
 
+        # Ports the discovery identified as other instruments (switches)
+        claimed = {port for port, info in discovery.devices.items() if info["kind"] != "qontrol"} \
+            if discovery is not None else set()
+
         for port in available_ports:
+            if port.device in claimed or port.device in tried:
+                continue
             # Linux-specific detection by VID/PID
             if platform.system() == "Linux":
                 if not (port.vid == 0x0403 and port.pid == 0x6001):  # FTDI FT232
@@ -57,28 +92,30 @@ class QontrolDevice:
                     continue
                 print(f"[INFO][Qontrol] Trying {port.device} (FTDI detected by description)...")
 
-            try:
-                # Instantiate a QXOutput from the core library.
-                q = qontrol.QXOutput(serial_port_name=port.device, response_timeout=0.5)
-                self.serial_port = port.device
-                self.device = q
-
-                print("[INFO][Qontrol] Qontroller '{0}' initialized with firmware {1} and {2} channels."
-                      .format(q.device_id, q.firmware, q.n_chs))
-                self.params = {
-                    "Device id": q.device_id,
-                    "Available channels": q.n_chs,
-                    "Firmware": q.firmware,
-                    "Available modes": int(q.n_chs / 8)
-                }
+            if self._open_port(port.device):
                 return port.device
 
-            except Exception as e:
-                print(f"[ERROR][Qontrol] Failed to connect on {port.device}: {str(e)}")
-                continue
-
         print("[INFO][Qontrol] No device found.")
         return None
+
+    def _open_port(self, port_name):
+        """Open a QXOutput on one port; True on success."""
+        try:
+            # Instantiate a QXOutput from the core library.
+            q = DeviceTrace.open(
+                "qontrol", lambda: qontrol.QXOutput(serial_port_name=port_name, response_timeout=0.5), port=port_name
+            )
+            self.serial_port = port_name
+            self.device = q
+
+            print("[INFO][Qontrol] Qontroller '{0}' initialized with firmware {1} and {2} channels."
+                  .format(q.device_id, q.firmware, q.n_chs))
+            self._set_params(q)
+            return True
+
+        except Exception as e:
+            print(f"[ERROR][Qontrol] Failed to connect on {port_name}: {str(e)}")
+            return False
         
     def connect(self):
         """
@@ -87,16 +124,39 @@ class QontrolDevice:
         displays device status.
         """
         if self.find_serial_port():
-            q = self.device
-            print("\n[INFO][Qontrol] Initializing current limit on all channels ({0}) to {1} mA"
-                  .format(q.n_chs, self.globalcurrrentlimit))
-            for i in range(q.n_chs):
-                q.imax[i] = self.globalcurrrentlimit
-            print("\n[INFO][Qontrol] Device Status:")
-            self.show_status()
+            self._initialize_channels()
         else:
             print("[INFO][Qontrol] Device connection failed.")
 
+    def attach(self, device, port_name="SIMULATED"):
+        """
+        Use an already opened controller object instead of scanning ports,
+        e.g. a MockQontrol driving a SimulatedChip.
+        """
+        self.device = device
+        self.serial_port = port_name
+        self._set_params(device)
+        print(f"[INFO][Qontrol] Attached {device.device_id} ({device.n_chs} channels) on {port_name}")
+        self._initialize_channels()
+
+    def _set_params(self, q):
+        self.params = {
+            "Device id": q.device_id,
+            "Available channels": q.n_chs,
+            "Firmware": q.firmware,
+            "Available modes": int(q.n_chs / 8)
+        }
+
+    def _initialize_channels(self):
+        """Set the global current limit on all channels and show the status."""
+        q = self.device
+        print("\n[INFO][Qontrol] Initializing current limit on all channels ({0}) to {1} mA"
+              .format(q.n_chs, self.globalcurrrentlimit))
+        self.arbiter.call(self._set_all, 'IMAX', self.globalcurrrentlimit, priority=EXPERIMENT)
+        self.shadow_currents = np.full(q.n_chs, np.nan)
+        print("\n[INFO][Qontrol] Device Status:")
+        self.show_status()
+
     def disconnect(self):
         """
         Disconnect from the Qontrol device.
@@ -104,10 +164,10 @@ class QontrolDevice:
         """
         if self.device:
             q = self.device
-            for i in range(q.n_chs):
-                q.i[i] = 0
-                print("[INFO][Qontrol] Resetting current for channel {0} to 0 mA".format(i))
-            self.device.close()
+            self.arbiter.call(self._set_all, 'I', 0, priority=EXPERIMENT)
+            self.shadow_currents = np.zeros(q.n_chs)
+            print("[INFO][Qontrol] Reset all {0} channel currents to 0 mA".format(q.n_chs))
+            self.arbiter.call(self.device.close, priority=EXPERIMENT)
             print("[INFO][Qontrol] Device disconnected.")
         else:
             print("[INFO][Qontrol] No device to disconnect.")
@@ -135,7 +195,9 @@ class QontrolDevice:
                 raise ValueError(f"Invalid channel {channel} (0-{self.device.n_chs-1})")
 
             # Use direct integer indexing
-            self.device.i[channel_int] = current
+            self.arbiter.call(self.device.i.__setitem__, channel_int, current, priority=EXPERIMENT)
+            if channel_int < len(self.shadow_currents):
+                self.shadow_currents[channel_int] = float(current)
             print(f"[INFO][Qontrol] Set current for channel {channel_int} to {current} mA")
 
         except ValueError as ve:
@@ -147,13 +209,109 @@ class QontrolDevice:
             if hasattr(self.device, 'log'):
                 print(f"[ERROR][Qontrol] Last device errors: {self.device.log[-3:]}")
 
+    def _set_all(self, para, value):
+        """Set one parameter on every channel, vectorised per module when supported."""
+        q = self.device
+        try:
+            q.set_all_values(para, value)
+            return
+        except AttributeError:
+            pass  # no vector command (e.g. mock device)
+        except Exception as e:
+            print(f"[WARNING][Qontrol] Vector {para} write failed ({e}), falling back to per-channel writes")
+        target = q.imax if para == 'IMAX' else q.i
+        for ch in range(q.n_chs):
+            target[ch] = value
+
+    def set_currents(self, currents, tolerance=1e-9):
+        """
+        Write a full current vector, sending only channels that changed.
+
+        The last written value of every channel is kept in `shadow_currents`;
+        channels within `tolerance` of it are skipped. The remaining set
+        commands are sent in a single serial write.
+
+        Args:
+            currents (array_like): current (mA) per channel, length n_chs;
+                NaN leaves a channel untouched
+            tolerance (float): changes smaller than this are not sent (mA)
+
+        Returns:
+            tuple: (number of channels written, elapsed time in seconds)
+        """
+        t0 = time.perf_counter()
+        if not self.device:
+            raise RuntimeError("Device not connected")
+        n_chs = self.device.n_chs
+        currents = np.asarray(currents, dtype=float)
+        if currents.shape != (n_chs,):
+            raise ValueError(f"Expected {n_chs} currents, got shape {currents.shape}")
+        if len(self.shadow_currents) != n_chs:
+            self.shadow_currents = np.full(n_chs, np.nan)
+
+        channels = self.arbiter.call(self._write_changed, currents, tolerance, priority=EXPERIMENT)
+        elapsed = time.perf_counter() - t0
+        logging.debug(f"[Qontrol] set_currents wrote {len(channels)}/{n_chs} channels in {elapsed * 1e3:.2f} ms")
+        return len(channels), elapsed
+
+    def _write_changed(self, currents, tolerance):
+        """Diff against the shadow and send the changes (runs on the arbiter thread)."""
+        shadow = self.shadow_currents
+        changed = ~np.isnan(currents) & (np.isnan(shadow) | (np.abs(currents - shadow) > tolerance))
+        channels = np.flatnonzero(changed)
+        if len(channels):
+            values = currents[channels]
+            if hasattr(self.device, 'transmit'):
+                # Same ASCII "I<ch>=<value>" commands as set_value, in one write
+                self.device.transmit("".join(
+                    f"I{ch}={value}\n" for ch, value in zip(channels.tolist(), values.tolist())
+                ))
+                self._await_replies(len(channels))
+            else:
+                for ch, value in zip(channels.tolist(), values.tolist()):
+                    self.device.i[ch] = value
+            shadow[channels] = values
+        return channels
+
+    def _await_replies(self, n):
+        """
+        Collect the OK/error replies to `n` set commands sent in one write,
+        so late replies are not taken as the answer to the next query.
+        Gives up once nothing has arrived for the device's response_timeout.
+        """
+        if not getattr(self.device, 'wait_for_responses', True):
+            self.device.receive()  # collect errors reported so far
+            return
+        timeout = getattr(self.device, 'response_timeout', 0.1)
+        answered = 0
+        deadline = time.perf_counter() + timeout
+        while answered < n:
+            lines, errs = self.device.receive()
+            received = sum(line == 'OK\n' for line in lines) + len(errs)
+            if received:
+                answered += received
+                deadline = time.perf_counter() + timeout
+            elif time.perf_counter() > deadline:
+                logging.warning(f"[Qontrol] {n - answered} of {n} set commands unanswered")
+                return
+            else:
+                time.sleep(0.0002)
+
+    def read_voltage(self, channel):
+        """Voltage (V) of one channel, read as a measurement."""
+        return float(self.arbiter.call(self.device.v.__getitem__, int(channel), priority=MEASUREMENT))
+
+    def _read_channels(self):
+        """Voltages and currents of all channels (runs on the arbiter thread)."""
+        return self.device.get_all_values('V'), self.device.get_all_values('I')
+
     def show_voltages(self):
         """
         Retrieve and print voltage readings from all channels.
         Uses the core library's get_all_values('V') method.
         """
         try:
-            voltages = self.device.get_all_values('V')
+            voltages = self.arbiter.call(self.device.get_all_values, 'V', priority=MEASUREMENT)
             if voltages is None:
                 print("[INFO][Qontrol] No voltage readings available.")
             else:
@@ -187,8 +345,7 @@ class QontrolDevice:
         including voltage and current readings.
         """
         try:
-            voltages = self.device.get_all_values('V')
-            currents = self.device.get_all_values('I')
+            voltages, currents = self.arbiter.call(self._read_channels, priority=MEASUREMENT)
             print("[INFO][Qontrol] Channel Status:")
             for i in range(self.device.n_chs):
                 v_str = "{0} V".format(voltages[i]) if voltages and i < len(voltages) else "N/A"
@@ -197,6 +354,25 @@ class QontrolDevice:
         except Exception as e:
             print("[INFO][Qontrol] Error retrieving channel status:", e)
 
+    def read_telemetry(self):
+        """
+        Read channel voltages/currents and the error log without printing.
+
+        Returns:
+            dict: {"voltage": list, "current": list,
+                   "errors": tuple of (timestamp, id, ch, desc)}
+        """
+        if not self.device:
+            raise RuntimeError("Device not connected")
+        # Coalesced: a poll still waiting behind experiment traffic is not queued twice
+        voltages, currents = self.arbiter.call(self._read_channels, priority=HOUSEKEEPING, key="telemetry")
+        log = list(getattr(self.device, 'log', []))
+        errors = tuple(
+            (entry.get('timestamp'), entry.get('id'), entry.get('ch'), entry.get('desc'))
+            for entry in log if entry.get('type') == 'err'
+        )
+        return {"voltage": voltages, "current": currents, "errors": errors}
+
 
 # For testing the QontrolDevice wrapper:
 if __name__ == "__main__":
@@ -0,0 +1,211 @@
+# app/devices/simulated_chip.py
+"""
+Physics-based stand-in for the photonic chip, used by the mock devices.
+
+Heater currents written to the mock Qontrol are turned into phases with
+the same calibration model the solvers invert:
+
+    P     = c_res * I^2 * (1 + alpha_res * I^2)      (mW, I in mA)
+    phase = c + b * P / pi                           (π units, b = omega, c = phase)
+
+The theta/phi phases are reduced modulo 2 (a heater phase only matters
+modulo 2π and the solvers add 2 to targets below the offset c, but the MZI
+block is not 2-periodic in theta), placed on the Clements grid in the PNN
+slot order (SEQUENCE_PNN_<n>, the same layout get_mesh_pnn uses), converted
+to the MZI block convention (A_theta = theta * pi / 2, A_phi = phi * pi) and
+propagated with mesh_transfer(block='mzi'). The light injected into the
+input port selected on the mock input switch then gives the output-port
+powers served by the mock power meter, DAQ and output switch.
+
+Phases follow a written current with a first-order response of time
+constant `settle_time`, and readings get Gaussian noise proportional to
+the signal plus an absolute floor.
+"""
+
+import json
+import logging
+import threading
+import time
+
+import numpy as np
+
+from app.utils.calibrate.calibration_table import CalibrationTable
+from app.utils.decomposition.forward import mesh_transfer
+from app.utils.decomposition.mapping.mzi_lut import get_sequence_pnn
+
+
+class SimulatedChip:
+    """Simulated n x n MZI mesh driven by heater currents.
+
+    Args:
+        table (CalibrationTable): per-channel resistance/phase calibration
+        n_modes (int): mesh size (8 or 12)
+        n_channels (int, optional): heater channels; defaults to the table size
+        input_power_mW (float): power launched into the selected input port
+        noise (float): relative standard deviation of every reading
+        noise_floor_mW (float): absolute standard deviation of every reading
+        settle_time (float): thermal time constant in seconds (0 = instant)
+        loss_dB (float): insertion loss applied to all outputs
+        seed (int, optional): noise generator seed
+    """
+
+    def __init__(self, table, n_modes=12, n_channels=None, input_power_mW=1.0, noise=0.0,
+                 noise_floor_mW=0.0, settle_time=0.0, loss_dB=0.0, seed=None):
+        self.table = table
+        self.n_modes = int(n_modes)
+        self.n_channels = int(n_channels or table.n_channels)
+        self.input_power_mW = float(input_power_mW)
+        self.noise = float(noise)
+        self.noise_floor_mW = float(noise_floor_mW)
+        self.settle_time = float(settle_time)
+        self.loss = 10 ** (-float(loss_dB) / 10)
+        self.input_port = 0
+        self.output_port = 0
+
+        # Calibration padded to n_channels; uncalibrated heaters do nothing
+        def padded(values, fill):
+            out = np.full(self.n_channels, fill, dtype=float)
+            n = min(self.n_channels, table.n_channels)
+            out[:n] = np.where(np.isnan(values[:n]), fill, values[:n])
+            return out
+        self._c_res = padded(table.c_res, 0.0)
+        self._alpha = padded(table.alpha_res, 0.0)
+        self._a_res = padded(table.a_res, 0.0)
+        self._omega = padded(table.omega, 0.0)
+        self._offset = padded(table.phase, 0.0)
+
+        # Channel driving each theta/phi slot of the (rows, cols) grid, -1 if none
+        sequence = get_sequence_pnn(self.n_modes)
+        self._theta_ch = np.array([[table.channel_of.get(f"{label}_theta", -1) for label in row]
+                                   for row in sequence])
+        self._phi_ch = np.array([[table.channel_of.get(f"{label}_phi", -1) for label in row]
+                                 for row in sequence])
+        self._alphas = np.zeros(self.n_modes)
+
+        self.currents = np.zeros(self.n_channels)
+        zero = self.heater_phase(self.currents)
+        self._phase_from = zero.copy()   # phase when the last change started
+        self._phase_to = zero.copy()     # phase the heater is settling towards
+        self._t_change = np.zeros(self.n_channels)
+        self._version = 0
+        self._cache = (None, None)       # (version, unitary) once settled
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_calibration_file(cls, path, **kwargs):
+        """Build from an exported calibration JSON ("resistance_calibration"/"phase_calibration")."""
+        with open(path, "r") as f:
+            data = json.load(f)
+        table = CalibrationTable.from_calibration(
+            data.get("resistance_calibration", {}), data.get("phase_calibration", {})
+        )
+        logging.info(f"[SimChip] Loaded {table} from {path}")
+        return cls(table, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Heaters
+    # ------------------------------------------------------------------
+    def heater_phase(self, currents):
+        """Steady-state phase (π units) of every channel for a current vector (mA)."""
+        currents = np.asarray(currents, dtype=float)
+        power = self._c_res * currents**2 * (1 + self._alpha * currents**2)
+        return self._offset + self._omega * power / np.pi
+
+    def voltages(self):
+        """Heater voltages (V) from the resistance fit, V = a*I^3 + c*I."""
+        currents = self.currents
+        return self._a_res * currents**3 + self._c_res * currents
+
+    def set_currents(self, currents):
+        """Apply a current vector (mA); NaN entries leave a channel unchanged."""
+        currents = np.asarray(currents, dtype=float)
+        with self._lock:
+            now = time.perf_counter()
+            target = np.where(np.isnan(currents), self.currents, currents)
+            changed = target != self.currents
+            if not changed.any():
+                return
+            self._phase_from[changed] = self._phases_at(now)[changed]
+            self.currents = target
+            self._phase_to = self.heater_phase(target)
+            self._t_change[changed] = now
+            self._version += 1
+
+    def set_current(self, channel, current):
+        currents = np.full(self.n_channels, np.nan)
+        currents[int(channel)] = current
+        self.set_currents(currents)
+
+    def _phases_at(self, now):
+        if self.settle_time <= 0:
+            return self._phase_to.copy()
+        decay = np.exp(-(now - self._t_change) / self.settle_time)
+        return self._phase_to + (self._phase_from - self._phase_to) * decay
+
+    def phases(self):
+        """Current (possibly still settling) phase of every channel, π units."""
+        with self._lock:
+            return self._phases_at(time.perf_counter())
+
+    # ------------------------------------------------------------------
+    # Optics
+    # ------------------------------------------------------------------
+    def _grid(self, channels, phases):
+        grid = np.zeros(channels.shape)
+        mapped = channels >= 0
+        grid[mapped] = phases[channels[mapped]]
+        return grid
+
+    def unitary(self):
+        """Transfer matrix for the present heater state (cached once settled)."""
+        with self._lock:
+            now = time.perf_counter()
+            version, cached = self._cache
+            if version == self._version:
+                return cached
+            phases = self._phases_at(now) % 2
+            settled = self.settle_time <= 0 or (now - self._t_change.max()) > 10 * self.settle_time
+            snapshot = self._version
+        thetas = self._grid(self._theta_ch, phases) * np.pi / 2
+        phis = self._grid(self._phi_ch, phases) * np.pi
+        u = mesh_transfer(phis, thetas, self._alphas, block='mzi')
+        if settled:
+            with self._lock:
+                if self._version == snapshot:
+                    self._cache = (snapshot, u)
+        return u
+
+    def select_input(self, port):
+        """Route the laser to `port` (0-based); None blocks the input."""
+        self.input_port = port
+
+    def select_output(self, port):
+        """Route output `port` (0-based) to the power meter; None blocks it."""
+        self.output_port = port
+
+    def output_powers(self):
+        """Noise-free power (mW) at every output port for the selected input."""
+        if self.input_port is None or not 0 <= self.input_port < self.n_modes:
+            return np.zeros(self.n_modes)
+        column = self.unitary()[:, self.input_port]
+        return self.input_power_mW * self.loss * np.abs(column) ** 2
+
+    def measure(self, ports, samples=1):
+        """Noisy readings (mW) of output ports.
+
+        Args:
+            ports (list[int | None]): 0-based output ports; None or out of
+                range ports read only noise
+            samples (int): readings per port
+
+        Returns:
+            np.ndarray: (len(ports), samples)
+        """
+        powers = self.output_powers()
+        levels = np.array([powers[p] if p is not None and 0 <= p < self.n_modes else 0.0 for p in ports])
+        readings = np.repeat(levels[:, None], samples, axis=1)
+        sigma = np.hypot(self.noise * readings, self.noise_floor_mW)
+        if sigma.any():
+            readings = readings + sigma * self._rng.standard_normal(readings.shape)
+        return readings
@@ -1,16 +1,96 @@
-from app.imports import *
+import logging
+import threading
+import time
+import serial
+from app.utils.io_arbiter import IOArbiter, EXPERIMENT, MEASUREMENT
+from app.utils.device_trace import DeviceTrace
+
+# Frames start with one of these headers, followed by a length byte and
+# `length` bytes of payload, the last of which is the checksum.
+# e.g. ED FA 04 FF 02 01 ED -> header ED FA, length 4, channel 1, checksum ED
+FRAME_HEADERS = (b"\xEF\xEF", b"\xED\xFA")
 
 class Switch:
-    def __init__(self, port, baudrate=115200, timeout=1):
+    """Optical switch driver keeping one serial port open for its lifetime.
+
+    The port is opened on first use and reused for every command. On a
+    serial error the port is dropped and reopened, and the command is
+    retried up to `max_retries` times before the error is raised.
+    """
+
+    def __init__(self, port, baudrate=115200, timeout=1, max_retries=1):
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
+        self.max_retries = max_retries
+        self.last_timing = {}  # filled by set_and_confirm
+        self._ser = None
+        self._lock = threading.RLock()
+        self.arbiter = IOArbiter(f"switch-{port}")
 
     def _checksum(self, data):
         return sum(data) & 0xFF
 
     def _open_serial(self):
-        return serial.Serial(self.port, baudrate=self.baudrate, timeout=self.timeout)
+        return DeviceTrace.open(
+            "switch", lambda: serial.Serial(self.port, baudrate=self.baudrate, timeout=self.timeout), port=self.port
+        )
+
+    def _ensure_open(self):
+        if self._ser is None or not self._ser.is_open:
+            self._ser = self._open_serial()
+            logging.info(f"[SWITCH] Opened {self.port}")
+        return self._ser
+
+    def close(self):
+        """Close the serial port (it is reopened automatically on next use)."""
+        with self._lock:
+            if self._ser is not None:
+                try:
+                    self._ser.close()
+                except Exception as e:
+                    logging.warning(f"[SWITCH] Error closing {self.port}: {e}")
+                self._ser = None
+
+    disconnect = close
+
+    def _read_frame(self, ser):
+        """Read one response frame; returns (frame, valid)."""
+        head = ser.read(3)
+        if len(head) < 3:
+            return head, False
+        body = ser.read(head[2])
+        frame = head + body
+        if head[:2] not in FRAME_HEADERS or len(body) != head[2]:
+            ser.reset_input_buffer()  # resync on the next command
+            return frame, False
+        return frame, self._checksum(frame[:-1]) == frame[-1]
+
+    def _transact(self, command, priority=MEASUREMENT):
+        """Send a command on the persistent port and read back one frame.
+
+        The exchange runs on the switch's I/O arbiter thread.
+
+        Returns:
+            (bytes, bool): the raw response and whether it is a valid frame
+        """
+        return self.arbiter.call(self._exchange, command, priority=priority)
+
+    def _exchange(self, command):
+        with self._lock:
+            attempt = 0
+            while True:
+                try:
+                    ser = self._ensure_open()
+                    ser.reset_input_buffer()  # drop stale bytes from earlier replies
+                    ser.write(bytes(command))
+                    return self._read_frame(ser)
+                except (serial.SerialException, OSError) as e:
+                    self.close()
+                    if attempt >= self.max_retries:
+                        raise
+                    attempt += 1
+                    logging.warning(f"[SWITCH] {self.port} error ({e}), reconnecting ({attempt}/{self.max_retries})")
 
     def set_channel(self, channel):
         """
@@ -23,18 +103,19 @@ class Switch:
         command = [0xEF, 0xEF, 0x06, 0xFF, 0x0D, 0x00, 0x00, channel]
         command.append(self._checksum(command))
 
-        logging.info(f"[SWITCH] Sending command to {self.port}: {bytes(command).hex()}")  # Fixed: port -> self.port
+        logging.info(f"[SWITCH] Sending command to {self.port}: {bytes(command).hex()}")
 
-        with self._open_serial() as ser:
-            ser.write(bytes(command))
-            response = ser.read(7)
+        response, valid = self._transact(command, priority=EXPERIMENT)
 
-        if response:
+        if valid:
             logging.info(f"[SWITCH] Received response: {response.hex()}")
+        elif response:
+            logging.error(f"[SWITCH] Invalid response: {response.hex()}")
         else:
             logging.error(f"[SWITCH] No response received — device may be ignoring command.")
+        return valid
 
-    def get_channel(self):
+    def get_channel(self, priority=MEASUREMENT):
         """
         Queries the switch to find the currently active channel.
         Returns the channel number or None if communication fails.
@@ -42,22 +123,42 @@ class Switch:
         command = [0xEF, 0xEF, 0x03, 0xFF, 0x02]
         command.append(self._checksum(command))
 
-        with self._open_serial() as ser:
-            ser.write(bytes(command))
-            response = ser.read(7)
-
-        # Fixed: Check for valid response with either header format
-        if len(response) == 7:
-            # Response format appears to be: ED FA 04 FF 02 01 ED
-            # where response[5] is the current channel
-            if (response[0] == 0xED and response[1] == 0xFA and response[4] == 0x02) or \
-               (response[0] == 0xEF and response[1] == 0xEF and response[4] == 0x02):
-                current_channel = response[5]
-                logging.info(f"[Switch] Current active channel: {current_channel}")
-                return current_channel
-        
+        response, valid = self._transact(command, priority=priority)
+
+        # Response format: ED FA 04 FF 02 <channel> <checksum> (or EF EF header)
+        if valid and len(response) == 7 and response[4] == 0x02:
+            current_channel = response[5]
+            logging.info(f"[Switch] Current active channel: {current_channel}")
+            return current_channel
+
         logging.info(f"[Switch] Failed to get channel. Response: {response.hex()}")
         return None
+
+    def set_and_confirm(self, channel):
+        """
+        Set the channel, then query it back.
+
+        Timings (ms) of both round trips are stored in `last_timing`.
+
+        Returns:
+            bool: True if the switch reports the requested channel
+        """
+        t0 = time.perf_counter()
+        self.set_channel(channel)
+        t1 = time.perf_counter()
+        current = self.get_channel(priority=EXPERIMENT)
+        t2 = time.perf_counter()
+
+        self.last_timing = {
+            "set_ms": (t1 - t0) * 1e3,
+            "confirm_ms": (t2 - t1) * 1e3,
+            "total_ms": (t2 - t0) * 1e3,
+        }
+        confirmed = current == channel
+        if not confirmed:
+            logging.error(f"[SWITCH] Requested channel {channel}, switch reports {current}")
+        logging.debug(f"[SWITCH] set_and_confirm({channel}) timing: {self.last_timing}")
+        return confirmed
     
     def swap_ports(self):
         """
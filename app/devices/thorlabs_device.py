@@ -1,10 +1,16 @@
 import platform
-import pyvisa
-from ThorlabsPM100 import ThorlabsPM100, USBTMC
-from unittest.mock import MagicMock
 from app.devices.mock_devices import MockThorlabsPM100
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.lazy_import import lazy_import, lazy_attr
+from app.utils.io_arbiter import IOArbiter, MEASUREMENT
+from app.utils.device_trace import DeviceTrace
+
+# Vendor libraries, imported on first connection attempt
+pyvisa = lazy_import("pyvisa")
+ThorlabsPM100 = lazy_attr("ThorlabsPM100", "ThorlabsPM100")
+USBTMC = lazy_attr("ThorlabsPM100", "USBTMC")
 
 class ThorlabsDevice:
     _connected_devices = {}
@@ -36,22 +42,12 @@ class ThorlabsDevice:
             
             elif system == 'Linux':
                 import glob
-                usbtmc_devices = glob.glob('/dev/usbtmc*')
-                for dev_path in usbtmc_devices:
-                    try:
-                        inst = USBTMC(device=dev_path)
-                        idn = inst.query("*IDN?").strip().split(',')
-                        if idn[0].strip().lower() == 'thorlabs':
-                            devices.append({
-                                "resource": dev_path,
-                                "manufacturer": idn[0],
-                                "model": idn[1],
-                                "serial": idn[2],
-                                "firmware": idn[3]
-                            })
-                        inst.close()
-                    except Exception as e:
-                        logging.error(f"[Thorlabs] Error inspecting {dev_path}: {e}")
+                usbtmc_devices = sorted(glob.glob('/dev/usbtmc*'))
+                # Query all instruments at once; a slow one no longer delays the rest
+                if usbtmc_devices:
+                    with ThreadPoolExecutor(max_workers=len(usbtmc_devices)) as pool:
+                        found = pool.map(cls._inspect_usbtmc, usbtmc_devices)
+                    devices.extend(device for device in found if device)
             
             return devices
         
@@ -59,6 +55,27 @@ class ThorlabsDevice:
             logging.error(f"[Thorlabs] Error listing devices: {e}")
             return []
     
+    @staticmethod
+    def _inspect_usbtmc(dev_path):
+        """Identify one /dev/usbtmc* instrument; a device dict if it is a Thorlabs meter."""
+        try:
+            inst = USBTMC(device=dev_path)
+            try:
+                idn = inst.query("*IDN?").strip().split(',')
+            finally:
+                inst.close()
+            if idn[0].strip().lower() == 'thorlabs':
+                return {
+                    "resource": dev_path,
+                    "manufacturer": idn[0],
+                    "model": idn[1],
+                    "serial": idn[2],
+                    "firmware": idn[3]
+                }
+        except Exception as e:
+            logging.error(f"[Thorlabs] Error inspecting {dev_path}: {e}")
+        return None
+
     @classmethod
     def get_device(cls, serial=None, resource=None, config=None):
         device_key = serial or resource
@@ -79,28 +96,36 @@ class ThorlabsDevice:
         self.wavelength = self.config.get("wavelength", 1550)
         self.resource = None
         self.serial = None
+        self.arbiter = IOArbiter("thorlabs")  # measurement code and telemetry share the instrument
 
     def connect(self, serial=None, resource=None):
         if self._find_device(serial, resource):
             logging.info(f"[Thorlabs] Connected to {self.params['Model']} (SN: {self.params['Serial']})")
             return True
         else:
+            from unittest.mock import MagicMock
             logging.info("[Mock] Using mock device")
-            self.device = MockThorlabsPM100(MagicMock())
-            self.params = {
-                "Manufacturer": "MockThorlabs",
-                "Model": "PM100D-MOCK",
-                "Serial": serial or "MOCK1234",
-                "Firmware": "1.0.0",
-                "Wavelength": f"{self.wavelength} nm",
-                "Power Range": "100 mW"
-            }
-            self.serial = serial or "MOCK1234"
-            self.resource = resource or "MOCK_RESOURCE"
+            self.use_mock(MockThorlabsPM100(MagicMock()), serial, resource)
             return True
 
+    def use_mock(self, mock, serial=None, resource=None):
+        """Use a mock power meter (e.g. one reading a SimulatedChip)."""
+        self.device = mock
+        self.params = {
+            "Manufacturer": "MockThorlabs",
+            "Model": "PM100D-MOCK",
+            "Serial": serial or "MOCK1234",
+            "Firmware": "1.0.0",
+            "Wavelength": f"{self.wavelength} nm",
+            "Power Range": "100 mW"
+        }
+        self.serial = serial or "MOCK1234"
+        self.resource = resource or "MOCK_RESOURCE"
+
     def _find_device(self, serial=None, resource=None):
         system = platform.system()
+        # When replaying a device trace, connect to the next recorded meter
+        resource = resource or DeviceTrace.replay_port("thorlabs")
         try:
             if system == 'Windows':
                 return self._windows_find_device(serial, resource)
@@ -142,7 +167,7 @@ class ThorlabsDevice:
 
     def _try_connect_windows(self, resource, rm, expected_serial):
         try:
-            self.inst = rm.open_resource(resource)
+            self.inst = DeviceTrace.open("thorlabs", lambda: rm.open_resource(resource), port=resource)
             idn = self.inst.query("*IDN?").strip().split(',')
             if expected_serial and idn[2] != expected_serial:
                 self.inst.close()
@@ -156,7 +181,7 @@ class ThorlabsDevice:
 
     def _try_connect_linux(self, resource, expected_serial):
         try:
-            self.inst = USBTMC(device=resource)
+            self.inst = DeviceTrace.open("thorlabs", lambda: USBTMC(device=resource), port=resource)
             idn = self.inst.query("*IDN?").strip().split(',')
             if expected_serial and idn[2] != expected_serial:
                 self.inst.close()
@@ -189,20 +214,22 @@ class ThorlabsDevice:
         
         logging.info(f"[Thorlabs] Connected to {self.params['Model']} at {resource}")
 
-    def read_power(self, unit="uW"):
+    def read_power(self, unit="uW", priority=MEASUREMENT):
         """
         Read the power measurement from the device.
 
         Args:
             unit (str): The desired unit for the power reading. 
                         Options are "mW" (default) or "W".
+            priority (int): I/O priority class (see app.utils.io_arbiter)
 
         Returns:
             float: The power reading in the specified unit.
         """
         if self.device:
             try:
-                power_in_watts = self.device.read  # This will now return hardware-averaged value
+                # This will now return hardware-averaged value
+                power_in_watts = self.arbiter.call(getattr, self.device, "read", priority=priority)
             except AttributeError:
                 power_in_watts = self.device.power  # Fallback to another attribute
                 logging.info(f"[Thorlabs] Using fallback power reading method: {power_in_watts} W")
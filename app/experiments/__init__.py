@@ -0,0 +1,32 @@
+# app/experiments/__init__.py
+"""
+Headless experiments: plan files, measurement readout and the runners
+behind `python -m app.run`.
+"""
+
+from .plan import ExperimentPlan, PlanError, EXPERIMENTS
+from .measurement import Measurement
+from .executor import JobExecutor, JobControl, JobCancelled
+from .results import ResultWriter, load_binary
+from .store import ExperimentStore, StoreReader, open_store
+from .runners import Experiment, UnitaryCycle, MziSweep, PathSequence, AutoCalibration
+
+__all__ = [
+    'ExperimentPlan',
+    'PlanError',
+    'EXPERIMENTS',
+    'Measurement',
+    'JobExecutor',
+    'JobControl',
+    'JobCancelled',
+    'ResultWriter',
+    'load_binary',
+    'ExperimentStore',
+    'StoreReader',
+    'open_store',
+    'Experiment',
+    'UnitaryCycle',
+    'MziSweep',
+    'PathSequence',
+    'AutoCalibration',
+]
@@ -0,0 +1,236 @@
+# app/experiments/executor.py
+"""
+Runs an experiment off the Tk main thread.
+
+The runner executes on a worker thread and reports through a thread-safe
+queue that the GUI drains with after(). Dwell times are timed on the worker,
+so they no longer depend on how long the window takes to redraw.
+
+Events are (kind, data) tuples: the runner's "log", "progress" and
+"measurement" events, then exactly one of "done" ({"result": ...}),
+"cancelled" or "error" ({"error": ..., "traceback": ...}). Progress and
+measurement events are throttled to one per `min_interval` (the newest one
+wins); log lines are never dropped.
+"""
+
+import logging
+import queue
+import threading
+import time
+import traceback
+
+# Events that may be coalesced: only the newest one matters to the UI
+_THROTTLED = ("progress", "measurement")
+_FINAL = ("done", "cancelled", "error")
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once it has been cancelled."""
+
+
+class JobControl:
+    """Pause/resume/cancel flags shared between the executor and the running job.
+
+    The job calls wait() for its dwells and checkpoint() between steps; the
+    UI calls pause(), resume() and cancel().
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set()  # release a paused job so it can stop
+
+    def wait(self, seconds):
+        """Sleep until `seconds` from now; a cancel interrupts the dwell at once.
+
+        Raises:
+            JobCancelled: if the job is cancelled before the deadline
+        """
+        deadline = time.perf_counter() + seconds
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            if self._cancelled.wait(remaining):
+                raise JobCancelled()
+
+    def checkpoint(self):
+        """Block while paused.
+
+        Raises:
+            JobCancelled: if the job has been cancelled
+        """
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+
+class JobExecutor:
+    """Runs one experiment at a time on a worker thread.
+
+    Only threads are used: the instruments hold open serial/VISA/DAQ handles
+    that cannot be shared with another process. The GUI shares one executor
+    between its tabs, so two experiments never drive the chip at once.
+
+    Args:
+        min_interval (float): minimum time between two progress (or two
+            measurement) events posted to the queue (s)
+    """
+
+    def __init__(self, min_interval=0.1):
+        self.min_interval = float(min_interval)
+        self.events = queue.Queue()
+        self.control = JobControl()
+        self.experiment = None
+        self._thread = None
+        self._last_post = {}
+        self._pending = {}
+
+    # ------------------------------------------------------------------
+    # Job control
+    # ------------------------------------------------------------------
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def paused(self):
+        return self.running and self.control.paused
+
+    @property
+    def kind(self):
+        """Kind of the running experiment ("sweep", "cycle_unitaries", ...), None when idle."""
+        return self.experiment.kind if self.running else None
+
+    def start(self, experiment):
+        """Run experiment.run() on a worker thread.
+
+        The experiment's listener and control are replaced by the executor's.
+
+        Raises:
+            RuntimeError: if a job is still running
+        """
+        if self.running:
+            raise RuntimeError(f"A {self.kind} experiment is already running")
+        self.control = JobControl()
+        # Events of a previous job nobody pumped (its tab was closed) are dropped
+        self.events = queue.Queue()
+        self.experiment = experiment
+        self._last_post, self._pending = {}, {}
+        experiment.listener = self._post
+        experiment.control = self.control
+        self._thread = threading.Thread(target=self._work, args=(experiment,),
+                                        name=f"experiment-{experiment.kind}", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def pause(self):
+        """Hold the job before its next step (the current step completes)."""
+        if self.running:
+            self.control.pause()
+
+    def resume(self):
+        self.control.resume()
+
+    def cancel(self):
+        """Stop the job: a dwell in progress is cut short, the chip is reset."""
+        self.control.cancel()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _work(self, experiment):
+        try:
+            result = experiment.run()
+        except JobCancelled:
+            self._finish("cancelled", {})
+        except Exception as e:
+            logging.exception(f"[Executor] {experiment.kind} failed: {e}")
+            self._finish("error", {"error": e, "traceback": traceback.format_exc()})
+        else:
+            self._finish("done", {"result": result})
+
+    # ------------------------------------------------------------------
+    # Events
+    # ------------------------------------------------------------------
+    def _post(self, kind, data):
+        """Listener given to the experiment; runs on the worker thread."""
+        if kind in _THROTTLED:
+            now = time.perf_counter()
+            if now - self._last_post.get(kind, float("-inf")) < self.min_interval:
+                self._pending[kind] = data
+                return
+            self._last_post[kind] = now
+            self._pending.pop(kind, None)
+        self.events.put((kind, data))
+
+    def _finish(self, kind, data):
+        for pending_kind, pending in self._pending.items():
+            self.events.put((pending_kind, pending))
+        self._pending = {}
+        self.events.put((kind, data))
+
+    def poll(self):
+        """Every event posted since the last poll, oldest first (never blocks)."""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def pump(self, widget, handler, interval_ms=100):
+        """Deliver the events to handler(kind, data) on the Tk thread until the job ends.
+
+        Args:
+            widget: any Tk widget (its after() schedules the polling)
+            handler (callable): handler(kind, data)
+            interval_ms (int): polling period
+        """
+        def _tick():
+            finished = False
+            for kind, data in self.poll():
+                try:
+                    handler(kind, data)
+                except Exception as e:
+                    logging.error(f"[Executor] Event handler failed for {kind}: {e}")
+                finished = finished or kind in _FINAL
+            if not finished:
+                widget.after(interval_ms, _tick)
+
+        widget.after(interval_ms, _tick)
+
+    def watch(self, widget, callback, interval_ms=250):
+        """Call callback(running) on the Tk thread now and, if a job runs, once it has ended.
+
+        Lets every tab lock its chip controls while a job started anywhere runs.
+        """
+        def _check():
+            if self.running:
+                widget.after(interval_ms, _check)
+            else:
+                callback(False)
+
+        running = self.running
+        callback(running)
+        if running:
+            widget.after(interval_ms, _check)
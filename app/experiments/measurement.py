@@ -0,0 +1,121 @@
+# app/experiments/measurement.py
+"""
+Power readout for the experiment runners: Thorlabs meters read directly,
+Thorlabs behind the output switch, or all DAQ channels on a shared stream.
+Same readout and column naming as the Unitary tab.
+"""
+
+import logging
+
+from app.utils.switch_measurements import SwitchMeasurements
+
+
+class Measurement:
+    """One power reading per step from the configured source.
+
+    Args:
+        instruments (Instruments): connected devices
+        source (str): "thorlabs", "daq" or "switch"
+        switch_channels (str | list[int]): output switch channels for "switch"
+        unit (str): "W", "mW" or "uW"
+        sample_rate (float): DAQ sample rate (Hz)
+        settling_time (float): wait after each switch move (s)
+    """
+
+    def __init__(self, instruments, source="thorlabs", switch_channels=None, unit="mW",
+                 sample_rate=1000, settling_time=0.05):
+        self.instruments = instruments
+        self.source = source.lower()
+        self.unit = unit
+        self.sample_rate = float(sample_rate)
+        self.settling_time = float(settling_time)
+        self.switch_channels = []
+        self.daq_channels = []
+
+        if self.source == "switch":
+            if isinstance(switch_channels, str):
+                switch_channels = SwitchMeasurements.parse_switch_channels(switch_channels)
+            self.switch_channels = [int(ch) for ch in switch_channels or []]
+            if not instruments.switch_output:
+                raise RuntimeError("Measurement via switch requested but no output switch is connected")
+            if not instruments.thorlabs:
+                raise RuntimeError("Measurement via switch requested but no Thorlabs power meter is connected")
+        elif self.source == "daq":
+            if instruments.daq is None:
+                raise RuntimeError("DAQ measurement requested but no DAQ is connected")
+            self.daq_channels = list(instruments.daq.list_ai_channels() or [])
+            if not self.daq_channels:
+                raise RuntimeError("The DAQ reports no analog input channels")
+        elif not instruments.thorlabs:
+            raise RuntimeError("Thorlabs measurement requested but no power meter is connected")
+
+    @classmethod
+    def from_plan(cls, plan, instruments):
+        settings = plan.measurement
+        return cls(
+            instruments,
+            source=settings["source"],
+            switch_channels=settings.get("switch_channels"),
+            unit=settings.get("unit", "mW"),
+            sample_rate=settings.get("sample_rate", 1000),
+            settling_time=settings.get("settling_ms", 50) / 1000.0,
+        )
+
+    @property
+    def labels(self):
+        """Short name of every value returned by read()."""
+        if self.source == "switch":
+            return [f"Ch{ch}" for ch in self.switch_channels]
+        if self.source == "daq":
+            return list(self.daq_channels)
+        return [f"Thorlabs{i}" for i in range(len(self.instruments.thorlabs))]
+
+    def headers(self):
+        """CSV column names, as written by the GUI experiments."""
+        if self.source == "switch":
+            return SwitchMeasurements.create_headers_with_switch(self.switch_channels, self.unit)
+        if self.source == "daq":
+            return [f"{ch}_{self.unit}" for ch in self.daq_channels]
+        return SwitchMeasurements.create_headers_thorlabs(len(self.instruments.thorlabs), self.unit)
+
+    def start(self, dwell_s):
+        """Open the shared DAQ stream (one acquisition task for the whole run)."""
+        if self.source == "daq":
+            self.instruments.daq.start_stream(self.daq_channels, sample_rate=self.sample_rate,
+                                              buffer_seconds=max(10.0, 2 * dwell_s))
+
+    def read(self, dwell_s=0.0):
+        """Read every value once.
+
+        Args:
+            dwell_s (float): dwell of the step; the DAQ averages a window of
+                this length (at least one sample)
+
+        Returns:
+            list[float]: one value per label; failed readings are 0.0
+        """
+        if self.source == "switch":
+            return SwitchMeasurements.measure_with_switch(
+                self.instruments.switch_output, self.instruments.thorlabs[0],
+                self.switch_channels, self.unit, settling_time=self.settling_time,
+            )
+        if self.source == "daq":
+            try:
+                readings = self.instruments.daq.read_power(
+                    channels=self.daq_channels,
+                    samples_per_channel=max(1, int(dwell_s * self.sample_rate)),
+                    sample_rate=self.sample_rate,
+                    unit=self.unit,
+                )
+                if readings is None:
+                    logging.error("[Measurement] DAQ read returned no data")
+                    return [0.0] * len(self.daq_channels)
+                return [float(value) for value in readings]
+            except Exception as e:
+                logging.error(f"[Measurement] DAQ read error: {e}")
+                return [0.0] * len(self.daq_channels)
+        return SwitchMeasurements.measure_thorlabs_direct(self.instruments.thorlabs, self.unit)
+
+    def stop(self):
+        if self.source == "daq" and self.instruments.daq.is_streaming:
+            self.instruments.daq.stop_stream()
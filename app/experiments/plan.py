@@ -0,0 +1,198 @@
+# app/experiments/plan.py
+"""
+Declarative experiment plans for the headless runner (python -m app.run).
+
+A plan is a JSON file describing one experiment:
+
+    {
+        "experiment": "cycle_unitaries",
+        "grid_size": "12x12",
+        "calibration": "config/12_modechip_20250727_ref10k_1550nm.json",
+        "unitaries": {"folder": "unitaries/run3", "decomposition": "pnn"},
+        "dwell_ms": 500,
+        "measurement": {"source": "switch", "switch_channels": "1-12", "unit": "mW"},
+        "output": "results/cycle_{timestamp}.csv"
+    }
+
+Relative paths are resolved against the directory of the plan file.
+"{timestamp}" in the output path is replaced by the start time.
+See the README ("Headless Runs") for the keys of each experiment type.
+"""
+
+import json
+import os
+from datetime import datetime
+
+EXPERIMENTS = ("cycle_unitaries", "sweep", "path_sequence", "auto_calibrate")
+MEASUREMENT_SOURCES = ("thorlabs", "daq", "switch")
+GRID_SIZES = ("4x4", "6x6", "8x8", "12x12")
+SWEEP_DESIGNS = ("grid", "random", "lhs")
+SWEEP_ORDERS = ("none", "snake", "nearest")
+
+
+class PlanError(ValueError):
+    """A plan file that cannot be run as written."""
+
+
+class ExperimentPlan:
+    """A validated experiment plan.
+
+    Args:
+        data (dict): parsed plan
+        base_dir (str, optional): directory relative paths are resolved against
+    """
+
+    DEFAULTS = {
+        "grid_size": "12x12",
+        "dwell_ms": 500.0,
+        "measurement": {"source": "thorlabs", "unit": "mW", "sample_rate": 1000},
+        "reset_to_zero": True,
+        "output": "results/{experiment}_{timestamp}.csv",
+        "flush_rows": 20,
+        "flush_seconds": 5.0,
+    }
+
+    def __init__(self, data, base_dir=None):
+        if not isinstance(data, dict):
+            raise PlanError("A plan must be a JSON object")
+        self.data = {**self.DEFAULTS, **data}
+        self.data["measurement"] = {**self.DEFAULTS["measurement"], **(data.get("measurement") or {})}
+        self.base_dir = os.path.abspath(base_dir or os.getcwd())
+        self.started = datetime.now()
+        self.validate()
+
+    @classmethod
+    def from_file(cls, path):
+        """Load and validate a plan file."""
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise PlanError(f"{path}: invalid JSON ({e})") from e
+        return cls(data, base_dir=os.path.dirname(os.path.abspath(path)))
+
+    # ------------------------------------------------------------------
+    # Access
+    # ------------------------------------------------------------------
+    @property
+    def experiment(self):
+        return self.data["experiment"]
+
+    @property
+    def grid_size(self):
+        return self.data["grid_size"]
+
+    @property
+    def n(self):
+        return int(self.grid_size.split("x")[0])
+
+    @property
+    def dwell_s(self):
+        return float(self.data["dwell_ms"]) / 1000.0
+
+    @property
+    def measurement(self):
+        return self.data["measurement"]
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def section(self, key):
+        """Sub-dictionary of the plan ({} if absent)."""
+        return self.data.get(key) or {}
+
+    def path(self, value):
+        """Resolve a path from the plan against the plan's directory."""
+        if value is None:
+            return None
+        value = os.path.expanduser(str(value))
+        return value if os.path.isabs(value) else os.path.join(self.base_dir, value)
+
+    def output_path(self, key="output"):
+        """Result file path with {experiment} and {timestamp} filled in.
+
+        Args:
+            key (str): plan key of the path ("output", or "store" for the
+                columnar store); None if the plan has no such key
+        """
+        if not self.data.get(key):
+            return None
+        output = str(self.data[key]).format(
+            experiment=self.experiment, timestamp=self.started.strftime("%Y%m%d_%H%M%S")
+        )
+        return self.path(output)
+
+    # ------------------------------------------------------------------
+    # Validation
+    # ------------------------------------------------------------------
+    def validate(self):
+        """Raise PlanError for missing or inconsistent keys."""
+        experiment = self.data.get("experiment")
+        if experiment not in EXPERIMENTS:
+            raise PlanError(f"'experiment' must be one of {', '.join(EXPERIMENTS)} (got {experiment!r})")
+        if self.data["grid_size"] not in GRID_SIZES:
+            raise PlanError(f"'grid_size' must be one of {', '.join(GRID_SIZES)}")
+        try:
+            if float(self.data["dwell_ms"]) < 0:
+                raise PlanError("'dwell_ms' must be non-negative")
+        except (TypeError, ValueError):
+            raise PlanError("'dwell_ms' must be a number")
+        for key in ("flush_rows", "flush_seconds"):
+            try:
+                if float(self.data[key]) <= 0:
+                    raise PlanError(f"'{key}' must be positive")
+            except (TypeError, ValueError):
+                raise PlanError(f"'{key}' must be a number")
+
+        source = str(self.measurement.get("source", "")).lower()
+        if source not in MEASUREMENT_SOURCES:
+            raise PlanError(f"measurement 'source' must be one of {', '.join(MEASUREMENT_SOURCES)}")
+        self.measurement["source"] = source
+        if source == "switch" and not self.measurement.get("switch_channels"):
+            raise PlanError("measurement source 'switch' needs 'switch_channels', e.g. \"1-12\"")
+
+        if experiment == "cycle_unitaries":
+            unitaries = self.section("unitaries")
+            if not unitaries.get("folder") and not unitaries.get("stack"):
+                raise PlanError("cycle_unitaries needs 'unitaries': {\"folder\": ...} or {\"stack\": ...}")
+            if unitaries.get("decomposition", "pnn") not in ("pnn", "interferometer"):
+                raise PlanError("'decomposition' must be 'pnn' or 'interferometer'")
+        elif experiment == "sweep":
+            self._validate_sweep(self.section("sweep"))
+        elif experiment == "path_sequence":
+            if not self.data.get("paths"):
+                raise PlanError("path_sequence needs 'paths' (a list of JSON grids or a .json/.jsonl file)")
+        elif experiment == "auto_calibrate":
+            if self.measurement["source"] == "daq":
+                raise PlanError("auto_calibrate measures with the Thorlabs power meter")
+
+    @staticmethod
+    def _validate_sweep(sweep):
+        axes = sweep.get("axes")
+        if axes is not None and (not isinstance(axes, list) or not axes):
+            raise PlanError("sweep 'axes' must be a non-empty list")
+        for axis in axes or [sweep]:
+            if "mzi" not in axis:
+                raise PlanError("every sweep axis needs 'mzi'")
+            if "values" not in axis:
+                for key in ("start", "stop", "steps"):
+                    if key not in axis:
+                        raise PlanError(f"sweep axis {axis['mzi']} needs '{key}' (or 'values')")
+                if int(axis["steps"]) <= 0:
+                    raise PlanError("sweep 'steps' must be positive")
+            if axis.get("parameter", "theta") not in ("theta", "phi"):
+                raise PlanError("sweep 'parameter' must be 'theta' or 'phi'")
+
+        design = sweep.get("design", "grid")
+        if design not in SWEEP_DESIGNS:
+            raise PlanError(f"sweep 'design' must be one of {', '.join(SWEEP_DESIGNS)}")
+        if design != "grid" and int(sweep.get("points", 0)) <= 0:
+            raise PlanError(f"a '{design}' sweep needs a positive 'points'")
+        order = sweep.get("order", "none")
+        if order not in SWEEP_ORDERS:
+            raise PlanError(f"sweep 'order' must be one of {', '.join(SWEEP_ORDERS)}")
+        if order == "snake" and design != "grid":
+            raise PlanError("the 'snake' order needs a grid design")
+
+    def __repr__(self):
+        return f"ExperimentPlan({self.experiment}, {self.grid_size})"
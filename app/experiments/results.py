@@ -0,0 +1,252 @@
+# app/experiments/results.py
+"""
+Append-only result files that survive a crash.
+
+ResultWriter appends one row per completed step, either to a CSV or to a
+binary columnar result (".bin": a directory holding one raw little-endian
+float64 file per column and schema.json with the column names; read it back,
+whole or a few columns, with load_binary). Every `flush_rows` rows or
+`flush_seconds` seconds the file is flushed and fsync'ed, then a sidecar
+checkpoint (<results>.checkpoint.json) records the last completed step, the
+file size (per column file for ".bin") at that point and the runner's state.
+
+A run opened with resume=True cuts the file back to the checkpointed size
+(rows written after the last checkpoint are measured again) and the runner
+continues after the checkpointed step.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+def plan_fingerprint(data):
+    """Hash of a plan's settings, stored in the checkpoint to refuse resuming a different plan."""
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+SCHEMA = "schema.json"
+
+
+def _column_file(index):
+    return f"{index:04d}.f8"
+
+
+def load_binary(path, columns=None):
+    """Read a ".bin" columnar result; only the requested column files are read.
+
+    Args:
+        path (str): result directory written by ResultWriter
+        columns (list[str], optional): columns to read, all by default
+
+    Returns:
+        tuple: (column names, (rows, columns) float64 array)
+    """
+    with open(os.path.join(path, SCHEMA), "r") as f:
+        schema = json.load(f)
+    names = schema["columns"]
+    columns = names if columns is None else list(columns)
+    files = [os.path.join(path, schema["files"][names.index(name)]) for name in columns]
+    # Columns of a run still being written may be a partial row apart
+    rows = min((os.path.getsize(file) // 8 for file in files), default=0)
+    data = np.empty((rows, len(files)))
+    for j, file in enumerate(files):
+        data[:, j] = np.fromfile(file, dtype="<f8", count=rows)
+    return columns, data
+
+
+def _numeric(value):
+    """Float of a row value; "%Y-%m-%d %H:%M:%S" timestamps become epoch seconds, anything else NaN."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        try:
+            return datetime.strptime(str(value), "%Y-%m-%d %H:%M:%S").timestamp()
+        except ValueError:
+            return np.nan
+
+
+class ResultWriter:
+    """Crash-safe, append-only writer of experiment rows.
+
+    Args:
+        path (str): result file; ".bin" selects the binary columnar format (a
+            directory), anything else CSV
+        headers (list[str]): column names
+        flush_rows (int): make the file durable at least every `flush_rows` rows
+        flush_seconds (float): ... and at least every `flush_seconds` seconds
+        on_flush (callable, optional): called before every checkpoint, so files
+            written alongside (an ExperimentStore) are never behind it
+    """
+
+    def __init__(self, path, headers, flush_rows=20, flush_seconds=5.0, on_flush=None):
+        self.path = path
+        self.headers = list(headers)
+        self.format = "bin" if path.lower().endswith(".bin") else "csv"
+        self.flush_rows = max(1, int(flush_rows))
+        self.flush_seconds = float(flush_seconds)
+        self.on_flush = on_flush
+        self.fingerprint = None
+        self.state = {}
+        self.rows = 0
+        self.last_step = None
+        self._file = None
+        self._csv = None
+        self._columns = []  # ".bin": one open file per column
+        self._buffer = []   # ".bin": rows not written to the column files yet
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    @staticmethod
+    def checkpoint_path(path):
+        return path + ".checkpoint.json"
+
+    @classmethod
+    def read_checkpoint(cls, path):
+        """Checkpoint of a result file, or None if there is none."""
+        try:
+            with open(cls.checkpoint_path(path), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    # ------------------------------------------------------------------
+    # Open / write / close
+    # ------------------------------------------------------------------
+    def open(self, fingerprint=None, state=None, resume=False):
+        """Create the file, or reopen it after its checkpoint.
+
+        Args:
+            fingerprint (str): plan_fingerprint of the plan being run
+            state (dict): runner state saved with every checkpoint (kept by reference)
+            resume (bool): continue an interrupted run instead of starting over
+
+        Returns:
+            dict | None: the checkpoint resumed from (None for a new file)
+
+        Raises:
+            FileNotFoundError: resume without a checkpoint
+            ValueError: the checkpoint belongs to another plan or column layout
+        """
+        self.fingerprint = fingerprint
+        self.state = {} if state is None else state
+        checkpoint = None
+        if resume:
+            checkpoint = self.read_checkpoint(self.path)
+            if checkpoint is None:
+                raise FileNotFoundError(f"No checkpoint for {self.path}")
+            if fingerprint is not None and checkpoint.get("fingerprint") != fingerprint:
+                raise ValueError(f"{self.path} was written by a different plan")
+            if checkpoint.get("headers") != self.headers:
+                raise ValueError(f"{self.path} has different columns")
+            self.rows = int(checkpoint["rows"])
+            self.last_step = checkpoint.get("last_step")
+            self.state.update(checkpoint.get("state") or {})
+            # Drop whatever was appended after the checkpoint
+            for path in self._paths():
+                with open(path, "r+b") as f:
+                    f.truncate(int(checkpoint["bytes"]))
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        mode = "a" if resume else "w"
+        if self.format == "csv":
+            self._file = open(self.path, mode, newline="")
+            self._csv = csv.writer(self._file)
+            if not resume:
+                self._csv.writerow(self.headers)
+        else:
+            os.makedirs(self.path, exist_ok=True)
+            if not resume:
+                self._write_json(os.path.join(self.path, SCHEMA), {
+                    "columns": self.headers,
+                    "files": [_column_file(j) for j in range(len(self.headers))],
+                    "dtype": "<f8",
+                })
+            self._columns = [open(path, mode + "b") for path in self._paths()]
+        self.flush()
+        return checkpoint
+
+    def write(self, row, step):
+        """Append the row of a completed step (durable at the next flush)."""
+        if self.format == "csv":
+            self._csv.writerow(row)
+        else:
+            self._buffer.append([_numeric(value) for value in row])
+        self.rows += 1
+        self.last_step = step
+        self._pending += 1
+        if self._pending >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self, complete=False):
+        """fsync the rows written so far, then record them in the checkpoint."""
+        if self.format == "csv":
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            size = os.fstat(self._file.fileno()).st_size
+        else:
+            if self._buffer:
+                block = np.asarray(self._buffer, dtype="<f8").reshape(len(self._buffer), -1)
+                for j, f in enumerate(self._columns):
+                    f.write(block[:, j].tobytes())
+                self._buffer = []
+            for f in self._columns:
+                f.flush()
+                os.fsync(f.fileno())
+            size = self.rows * 8
+        if self.on_flush is not None:
+            self.on_flush()
+        self._write_json(self.checkpoint_path(self.path), {
+            "results": os.path.basename(self.path),
+            "format": self.format,
+            "headers": self.headers,
+            "fingerprint": self.fingerprint,
+            "rows": self.rows,
+            "last_step": self.last_step,
+            "bytes": size,
+            "state": self.state,
+            "complete": complete,
+            "updated": datetime.now().isoformat(timespec="seconds"),
+        })
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self, complete=False):
+        """Final flush; `complete` marks a run that needs no resuming."""
+        if self._file is None and not self._columns:
+            return
+        try:
+            self.flush(complete=complete)
+        finally:
+            for f in [self._file] + self._columns:
+                if f is not None:
+                    f.close()
+            self._file = None
+            self._columns = []
+
+    def _paths(self):
+        """The file(s) holding the rows: the CSV, or every column file of a ".bin"."""
+        if self.format == "csv":
+            return [self.path]
+        return [os.path.join(self.path, _column_file(j)) for j in range(len(self.headers))]
+
+    @staticmethod
+    def _write_json(path, data):
+        """Write a sidecar atomically: a crash leaves either the old or the new version."""
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(complete=exc_type is None)
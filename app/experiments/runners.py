@@ -0,0 +1,659 @@
+# app/experiments/runners.py
+"""
+Headless experiment runners.
+
+Each runner implements one experiment of the GUI without Tk: unitary
+cycling (Unitary tab), single-MZI sweeps and path sequences (Mesh tab) and
+the step-file auto-calibration (Calibrate tab). A runner is built from an
+ExperimentPlan and the connected Instruments; run() applies every step,
+dwells, measures, appends one CSV row per step and resets the chip.
+
+Progress, measurements and log lines are reported through an optional
+listener, listener(kind, data), with kind "log", "progress" or
+"measurement"; without one they only go to the logging module. An optional
+JobControl (see executor.py) makes the dwells interruptible and lets the
+run be paused or cancelled between steps.
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from app.experiments.executor import JobCancelled
+from app.experiments.measurement import Measurement
+from app.experiments.results import ResultWriter, plan_fingerprint
+from app.experiments.store import ExperimentStore
+from app.experiments.sweeps import plan_sweep, sweep_axes
+from app.experiments.unitaries import (
+    COMPILE_CHUNK,
+    UnitaryCompiler,
+    embed_unitaries,
+    list_step_files,
+    load_step_unitaries,
+    load_unitary_stack,
+    mesh_channel_values,
+    mesh_phases,
+)
+from app.utils.appdata import AppData
+from app.utils.mesh_config import MeshConfig
+from app.utils.qontrol.mapping_utils import get_mapping_functions
+from app.utils.qontrol.qmapper8x8 import apply_qontrol_mapping
+
+# θ applied to a node for its IO mode during auto-calibration (π units),
+# same defaults as the grid widget
+_MODE_THETA = {"bar": 1.0, "cross": 0.0, "split": 0.5, "arbitrary": 0.0}
+
+
+class Experiment:
+    """Base class of the runners; subclasses set `kind` and implement the steps.
+
+    Args:
+        plan (ExperimentPlan): validated plan
+        instruments (Instruments): connected devices
+        listener (callable, optional): listener(kind, data) for progress events
+        control (JobControl, optional): pause/cancel flags checked between steps
+    """
+
+    kind = None
+    _registry = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.kind:
+            Experiment._registry[cls.kind] = cls
+
+    @classmethod
+    def create(cls, plan, instruments, listener=None, control=None):
+        """Runner for plan.experiment."""
+        return cls._registry[plan.experiment](plan, instruments, listener=listener, control=control)
+
+    def __init__(self, plan, instruments, listener=None, control=None):
+        self.plan = plan
+        self.instruments = instruments
+        self.listener = listener
+        self.control = control
+        self.grid_size = plan.grid_size
+        self.n = plan.n
+        self.qontrol = instruments.qontrol
+        self.current_limit = self.qontrol.config.get("globalcurrrentlimit") if self.qontrol else None
+        self.measurement = None
+        self.write_time = 0.0  # time spent in Qontrol writes (s)
+        self.theta_override = None  # {label: theta (π)} replacing the mesh values, e.g. interpolated
+        self.total = 0
+        self.output_path = None
+        self.state = {}         # saved with every checkpoint, restored on resume
+        self.completed = None   # last step of the run being resumed
+        self.store = None       # ExperimentStore of the run ("store" plan key)
+        self.sample = None      # numbers of the last measurement, for the store
+        self._clock = None      # time.monotonic() at which the store's "time" is 0
+
+    # ------------------------------------------------------------------
+    # Reporting and timing hooks
+    # ------------------------------------------------------------------
+    def emit(self, kind, **data):
+        if self.listener is not None:
+            self.listener(kind, data)
+
+    def log(self, message, level="info"):
+        getattr(logging, level)(f"[Run] {message}")
+        self.emit("log", message=message, level=level)
+
+    def wait(self, seconds):
+        """Dwell between applying a step and measuring it."""
+        if self.control is not None:
+            self.control.wait(seconds)
+        elif seconds > 0:
+            time.sleep(seconds)
+
+    def checkpoint(self):
+        """Called between steps: blocks while paused, raises JobCancelled once cancelled."""
+        if self.control is not None:
+            self.control.checkpoint()
+
+    # ------------------------------------------------------------------
+    # Steps, implemented by the subclasses
+    # ------------------------------------------------------------------
+    def setup(self):
+        """Load inputs and open the measurement; returns the number of steps."""
+        raise NotImplementedError
+
+    def headers(self):
+        return ["timestamp", "step"] + self.measurement.headers()
+
+    def phase_names(self):
+        """Names of the target phases passed to measure(), one store column each."""
+        return []
+
+    def steps(self):
+        """Generator applying and measuring every step, yielding one CSV row each."""
+        raise NotImplementedError
+
+    def teardown(self):
+        if self.measurement is not None:
+            self.measurement.stop()
+        if self.plan.get("reset_to_zero", True):
+            self.reset_chip()
+
+    # ------------------------------------------------------------------
+    # Shared actions
+    # ------------------------------------------------------------------
+    def apply_channels(self, channel_values):
+        """Write {channel: current} to the Qontrol (changed channels only)."""
+        if self.qontrol is not None:
+            apply_qontrol_mapping(self.qontrol, channel_values)
+
+    def write_channels(self, channels, currents):
+        """Write currents to a few channels only; every other channel keeps its value."""
+        if self.qontrol is None or not self.qontrol.device:
+            return
+        frame = np.full(self.qontrol.device.n_chs, np.nan)
+        frame[channels] = currents
+        _, elapsed = self.qontrol.set_currents(frame)
+        self.write_time += elapsed
+
+    def apply_mesh(self, mesh):
+        """Solve the currents of a phase mesh and write them."""
+        channel_values, failed = mesh_channel_values(mesh, self.grid_size, self.current_limit,
+                                                     theta_override=self.theta_override)
+        if failed:
+            self.log(f"Unsolved channels (raw values applied): {failed}", "warning")
+        self.apply_channels(channel_values)
+
+    def reset_chip(self):
+        if self.qontrol is None:
+            return
+        mesh = MeshConfig.for_grid(self.n)
+        mesh.active[:] = True
+        _, apply_grid_mapping = get_mapping_functions(self.grid_size)
+        apply_grid_mapping(self.qontrol, mesh, self.grid_size)
+        self.log("Chip reset to zero")
+
+    def set_switches(self, input_channel=None, output_channel=None):
+        for switch, channel in ((self.instruments.switch_input, input_channel),
+                                (self.instruments.switch_output, output_channel)):
+            if channel is None:
+                continue
+            if switch is None:
+                self.log(f"No switch connected for channel {channel}", "warning")
+                continue
+            switch.set_channel(int(channel))
+
+    def measure(self, step, phases=None, **info):
+        """Dwell, then read the measurement source; `info` is added to the measurement event.
+
+        Args:
+            step (int): step number
+            phases (array_like, optional): target phases of the step (π), in
+                phase_names() order, for the store
+        """
+        self.wait(self.plan.dwell_s)
+        values = self.measurement.read(self.plan.dwell_s)
+        if self._clock is not None:
+            self.sample = {"time": time.monotonic() - self._clock, "phases": phases, "powers": values}
+        self.emit("measurement", step=step, labels=self.measurement.labels, values=values, **info)
+        return values
+
+    @staticmethod
+    def timestamp():
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+    def run(self, resume=False, output_path=None):
+        """Run every step and write the results.
+
+        Args:
+            resume (bool): continue the interrupted run of `output_path` after
+                its last checkpointed step
+            output_path (str, optional): result file; defaults to the plan's output path
+
+        Returns:
+            str: path of the results file
+        """
+        t0 = time.perf_counter()
+        self.output_path = output_path or self.plan.output_path()
+        if resume:
+            checkpoint = ResultWriter.read_checkpoint(self.output_path)
+            if checkpoint is None:
+                raise FileNotFoundError(f"No checkpoint for {self.output_path}")
+            if checkpoint.get("complete"):
+                self.log(f"{self.output_path} is already complete")
+                return self.output_path
+            self.state.update(checkpoint.get("state") or {})
+            self.completed = checkpoint.get("last_step")
+
+        self.log(f"Starting {self.kind} ({self.grid_size}, dwell {self.plan.dwell_s * 1e3:g} ms)")
+        switch = self.plan.section("switch")
+        self.set_switches(switch.get("input"), switch.get("output"))
+        if "store" not in self.state and self.plan.get("store"):
+            self.state["store"] = self.plan.output_path("store")
+        writer = None
+        written = 0
+        finished = False
+        try:
+            self.total = self.setup()
+            writer = ResultWriter(self.output_path, self.headers(),
+                                  flush_rows=self.plan.get("flush_rows"),
+                                  flush_seconds=self.plan.get("flush_seconds"))
+            writer.open(plan_fingerprint(self.plan.data), self.state, resume=resume)
+            written = writer.rows
+            if self.state.get("store"):
+                self.store = self.open_store(self.state["store"], resume)
+                writer.on_flush = self.store.flush
+            if resume:
+                self.log(f"Resuming after step {self.completed} ({written} rows kept)")
+            self.emit("progress", step=written, total=self.total)
+            self.checkpoint()
+            for row in self.steps():
+                if self.store is not None:
+                    self.record(row[1])
+                writer.write(row, step=row[1])  # rows start with timestamp, step
+                written += 1
+                self.emit("progress", step=written, total=self.total)
+                if written < self.total:
+                    self.checkpoint()
+            finished = True
+        except JobCancelled:
+            self.log(f"Cancelled after {written}/{self.total} steps → {self.output_path}", "warning")
+            raise
+        finally:
+            if writer is not None:
+                writer.close(complete=finished)
+            if self.store is not None:
+                self.store.close()
+            self.teardown()
+        self.log(f"Finished {written}/{self.total} steps in {time.perf_counter() - t0:.1f} s → {self.output_path}")
+        return self.output_path
+
+    def done(self, step):
+        """True for steps completed before a resume."""
+        return self.completed is not None and step <= self.completed
+
+    def open_store(self, path, resume=False):
+        """Open the columnar store of the run (see app/experiments/store.py)."""
+        labels = self.measurement.labels if self.measurement is not None else []
+        n_chs = self.qontrol.device.n_chs if self.qontrol is not None and self.qontrol.device else 0
+        store = ExperimentStore(path, {"currents": n_chs, "phases": len(self.phase_names()), "powers": len(labels)},
+                                attrs={
+                                    "experiment": self.kind,
+                                    "grid_size": self.grid_size,
+                                    "plan": self.plan.data,
+                                    "calibration": AppData.calibration_fingerprint(),
+                                    "results": os.path.basename(self.output_path),
+                                    "started": self.plan.started.isoformat(timespec="seconds"),
+                                    "phase_names": self.phase_names(),
+                                    "power_labels": labels,
+                                    "power_unit": self.measurement.unit if self.measurement is not None else None,
+                                })
+        store.open(resume=resume, last_step=self.completed)
+        # "time" carries on from the last stored step when resuming
+        self._clock = time.monotonic() - self.state.get("elapsed", 0.0)
+        self.log(f"Storing numeric results in {path}")
+        return store
+
+    def record(self, step):
+        """Append the step just measured to the store: its Qontrol currents, target phases and powers."""
+        sample = self.sample or {"time": time.monotonic() - self._clock}
+        currents = self.qontrol.shadow_currents if self.qontrol is not None and self.qontrol.device else None
+        self.store.append(step, sample["time"], currents=currents,
+                          phases=sample.get("phases"), powers=sample.get("powers"))
+        self.state["elapsed"] = sample["time"]
+        self.sample = None
+
+
+class UnitaryCycle(Experiment):
+    """Apply every step_<k>.npy unitary of a folder, or every matrix of a stacked
+    file, and measure after the dwell.
+
+    Steps are loaded and compiled "chunk" at a time, ahead of the step being
+    applied; only the current chunk is held in memory.
+
+    Plan keys: "unitaries": {"folder" or "stack" (a (K, N, N) .npy, memory-mapped,
+    or .npz with an optional "key"), "decomposition" ("pnn"), "global_phase"
+    (false), "cache" (true), "chunk" (COMPILE_CHUNK)}.
+    """
+
+    kind = "cycle_unitaries"
+
+    def setup(self):
+        settings = self.plan.section("unitaries")
+        if settings.get("stack"):
+            path = self.plan.path(settings["stack"])
+            self.stack = load_unitary_stack(path, key=settings.get("key"))
+            self.files = None
+            self.stack_name = os.path.basename(path)
+            self.count = len(self.stack)
+        else:
+            self.folder = self.plan.path(settings["folder"])
+            self.files = list_step_files(self.folder)
+            if not self.files:
+                raise FileNotFoundError(f"No unitary step files (*_<k>.npy) in {self.folder}")
+            self.count = len(self.files)
+
+        self.compiler = UnitaryCompiler(
+            self.grid_size,
+            package=settings.get("decomposition", "pnn"),
+            global_phase=settings.get("global_phase", False),
+            current_limit=self.current_limit,
+            cache=None if settings.get("cache", True) else False,
+        )
+        self.chunk = max(1, int(settings.get("chunk", COMPILE_CHUNK)))
+        self.cache_hits = 0
+        source = f"unitaries in {self.stack_name}" if self.files is None else "unitary files"
+        self.log(f"{self.count} {source}, compiled {self.chunk} at a time")
+
+        self.measurement = Measurement.from_plan(self.plan, self.instruments)
+        self.measurement.start(self.plan.dwell_s)
+        return self.count
+
+    def phase_names(self):
+        return self.compiler.phase_names()
+
+    def step_name(self, step_idx):
+        return f"{self.stack_name}[{step_idx - 1}]" if self.files is None else self.files[step_idx - 1]
+
+    def load_chunk(self, start):
+        """Load the steps start .. start + chunk - 1 that are not done yet and prepare them.
+
+        Returns:
+            dict: {step_idx: U} of the chunk, embedded into the mesh size
+        """
+        stop = min(start + self.chunk, self.count + 1)
+        todo = [k for k in range(start, stop) if not self.done(k)]
+        if not todo:
+            return {}
+        if self.files is None:
+            block = embed_unitaries(self.stack[start - 1:stop - 1], self.n)
+            unitaries = {k: block[k - start] for k in todo}
+        else:
+            loaded, errors = load_step_unitaries(self.folder, self.files[start - 1:stop - 1], self.n, start=start)
+            for name, error in errors.items():
+                self.log(f"Could not load {name}: {error}", "error")
+            unitaries = {k: loaded[k] for k in todo if k in loaded}
+        self.cache_hits += self.compiler.prepare(unitaries)
+        return unitaries
+
+    def steps(self):
+        for start in range(1, self.count + 1, self.chunk):
+            unitaries = self.load_chunk(start)
+            for step_idx, U in unitaries.items():
+                try:
+                    channel_values, failed, phases = self.compiler.channel_values(step_idx, U)
+                except Exception as e:
+                    self.log(f"Step {step_idx} ({self.step_name(step_idx)}): decomposition failed: {e}", "error")
+                    continue
+                if failed:
+                    self.log(f"Step {step_idx}: unsolved channels {failed}", "warning")
+                self.apply_channels(channel_values)
+                values = self.measure(step_idx, phases=phases)
+                yield [self.timestamp(), step_idx] + values
+        self.log(f"{self.cache_hits} step(s) found in the compile cache")
+
+
+class MziSweep(Experiment):
+    """Sweep the phases of one or more MZIs.
+
+    The sweep is planned and compiled to currents in setup(); each step then
+    only writes the swept channels before the dwell and the measurement. Rows
+    (and measurement events) carry the swept coordinates.
+
+    Plan keys: "sweep": either one axis {"mzi", "parameter" ("theta"), "start",
+    "stop", "steps"} or "axes": a list of them ("mzi" may be a list of MZIs set
+    together, "values" may replace start/stop/steps); "design" ("grid":
+    Cartesian product, "random"/"lhs": "points" samples, "seed"); "order"
+    ("none", "snake", "nearest"); "base" (JSON grid or path to one, the
+    configuration of the other MZIs).
+    """
+
+    kind = "sweep"
+
+    def setup(self):
+        settings = self.plan.section("sweep")
+        self.axes = sweep_axes(settings)
+        # A single-MZI sweep keeps the Mesh tab's CSV layout
+        self.single = "axes" not in settings and len(self.axes[0].targets) == 1
+        self.base = _load_grid(self.plan, settings.get("base"), self.n)
+        for axis in self.axes:
+            for label, _ in axis.targets:
+                if label not in self.base.index:
+                    raise ValueError(f"Unknown MZI '{label}' for a {self.grid_size} mesh")
+
+        design = settings.get("design", "grid")
+        seed = settings.get("seed")
+        if design != "grid" and seed is None:
+            # Saved with the checkpoints so a resumed run samples the same points
+            seed = self.state.setdefault("seed", int(np.random.SeedSequence().entropy % 2**32))
+
+        t0 = time.perf_counter()
+        self.program = plan_sweep(
+            self.base, self.axes, self.grid_size, self.current_limit,
+            design=design, points=settings.get("points"), seed=seed,
+            order=settings.get("order", "none"), theta_override=self.theta_override,
+        )
+        for failed in self.program.failed:
+            self.log(f"Unsolved: {failed}", "warning")
+        travel, largest = self.program.travel()
+        self.log(f"Planned {self.program} in {(time.perf_counter() - t0) * 1e3:.0f} ms "
+                 f"(heater travel {travel:.1f} mA, largest step {largest:.2f} mA)")
+
+        self.measurement = Measurement.from_plan(self.plan, self.instruments)
+        self.measurement.start(self.plan.dwell_s)
+        return self.program.steps
+
+    def headers(self):
+        if self.single:
+            return ["timestamp", "step", f"{self.axes[0].targets[0][1]}_pi_units"] + self.measurement.headers()
+        return (["timestamp", "step", "point"] + [f"{name}_pi_units" for name in self.program.names]
+                + self.measurement.headers())
+
+    def phase_names(self):
+        return self.program.names
+
+    def steps(self):
+        program = self.program
+        self.apply_channels(program.base_values)
+        for step in range(1, program.steps + 1):
+            if self.done(step):
+                continue
+            self.write_channels(program.channels, program.currents[step - 1])
+            values = self.measure(step, phases=program.phases[step - 1], coordinates=program.coordinates(step - 1))
+            coordinates = [f"{value:.6f}" for value in program.phases[step - 1]]
+            if self.single:
+                yield [self.timestamp(), step] + coordinates + [f"{m:.6f}" for m in values]
+            else:
+                yield ([self.timestamp(), step, int(program.points[step - 1])] + coordinates
+                       + [f"{m:.6f}" for m in values])
+        if self.total:
+            self.log(f"Mean Qontrol write per step: {self.write_time / self.total * 1e3:.2f} ms")
+
+
+class PathSequence(Experiment):
+    """Apply a list of JSON grids one after the other.
+
+    Plan keys: "paths": a list of JSON grids, or a .json (list) / .jsonl
+    (one grid per line) file.
+    """
+
+    kind = "path_sequence"
+
+    def setup(self):
+        paths = self.plan.get("paths")
+        if isinstance(paths, str):
+            path = self.plan.path(paths)
+            with open(path, "r") as f:
+                if path.endswith(".jsonl"):
+                    paths = [json.loads(line) for line in f if line.strip()]
+                else:
+                    paths = json.load(f)
+        self.meshes = [MeshConfig.from_json(grid, n=self.n) for grid in paths]
+        self.measurement = Measurement.from_plan(self.plan, self.instruments)
+        self.measurement.start(self.plan.dwell_s)
+        return len(self.meshes)
+
+    def phase_names(self):
+        labels = self.meshes[0].labels if self.meshes else ()
+        return [f"{label}_theta" for label in labels] + [f"{label}_phi" for label in labels]
+
+    def steps(self):
+        for step, mesh in enumerate(self.meshes, start=1):
+            if self.done(step):
+                continue
+            self.apply_mesh(mesh)
+            # MZIs the grid leaves out are stored as NaN
+            values = self.measure(step, phases=mesh_phases(mesh))
+            yield [self.timestamp(), step] + values
+
+
+class AutoCalibration(Experiment):
+    """Resistance and phase characterization of every step of a calibration step file.
+
+    Plan keys: "steps_file" ("calibration_steps.json"), "start_from" (first
+    step number), "delay_ms" (settling per calibration point, 500),
+    "calibration_output" (JSON rewritten after every step, next to the results
+    by default; a resumed run starts from it).
+    """
+
+    kind = "auto_calibrate"
+
+    def setup(self):
+        from app.utils.calibrate.calibrate import CalibrationUtils
+
+        self.utils = CalibrationUtils()
+        with open(self.plan.path(self.plan.get("steps_file", "calibration_steps.json")), "r") as f:
+            steps = json.load(f).get("steps", []) or []
+        start_from = self.plan.get("start_from")
+        numbered = [(step.get("step", i + 1), step) for i, step in enumerate(steps)]
+        self.steps_todo = [step for number, step in numbered if start_from is None or number >= int(start_from)]
+        self.delay = float(self.plan.get("delay_ms", 500)) / 1000.0
+        create_label_mapping, _ = get_mapping_functions(self.grid_size)
+        self.label_map = create_label_mapping(self.n)
+
+        output = self.plan.get("calibration_output")
+        self.calibration_path = (self.plan.path(output) if output
+                                 else os.path.splitext(self.output_path)[0] + ".json")
+        if self.completed is not None and os.path.exists(self.calibration_path):
+            self.utils.import_calibration(self.calibration_path)
+            self.log(f"Resuming from the calibration in {self.calibration_path}")
+        return len(self.steps_todo)
+
+    def headers(self):
+        return ["timestamp", "step", "node", "key", "channel", "io_config",
+                "rmin_kohm", "rmax_kohm", "alpha_res", "amplitude", "omega", "phase", "offset"]
+
+    def _step_mesh(self, step):
+        """Phase configuration of a step: the calibration node and the routing nodes in their IO mode."""
+        modes = dict(step.get("additional_nodes") or {})
+        if step.get("calibration_node") and step.get("Io_config"):
+            modes[step["calibration_node"]] = step["Io_config"]
+        grid = {}
+        for node, mode in modes.items():
+            theta = _MODE_THETA.get(_io_kind(mode), 0.0)
+            grid[node] = {"theta": str(theta), "phi": "0"}
+        return MeshConfig.from_json(grid, n=self.n)
+
+    def steps(self):
+        thorlabs = self.instruments.thorlabs
+        for index, step in enumerate(self.steps_todo, start=1):
+            number = step.get("step", index)
+            if self.done(number):
+                continue
+            node = step.get("calibration_node")
+            if not node or node not in self.label_map:
+                self.log(f"Step {number}: no mapped calibration node, skipped", "warning")
+                continue
+
+            self.apply_mesh(self._step_mesh(step))
+            self.set_switches(step.get("input_port"), step.get("output_port"))
+
+            kind = "phi" if str(step.get("Phase_shifter", "")).lower() == "external" else "theta"
+            theta_ch, phi_ch = self.label_map[node]
+            channel = theta_ch if kind == "theta" else phi_ch
+            key = f"{node}_{kind}"
+            io_config = _io_kind(step.get("Io_config"))
+            AppData.update_io_config(node, io_config)
+            self.log(f"Step {number}: calibrating {key} (channel {channel}, {io_config})")
+
+            res = self.utils.characterize_resistance(self.qontrol, channel, delay=self.delay)
+            AppData.update_resistance_calibration(key, _resistance_record(channel, res))
+            phase = self.utils.characterize_phase(
+                self.qontrol, thorlabs, channel, io_config,
+                AppData.get_resistance_calibration(key), delay=self.delay,
+            )
+            AppData.update_phase_calibration(key, _phase_record(channel, phase))
+            self._export()
+
+            yield [self.timestamp(), number, node, key, channel, io_config,
+                   res["rmin"], res["rmax"], res["alpha_res"],
+                   phase["amp"], phase["omega"], phase["phase"], phase["offset"]]
+
+    def _export(self):
+        self.utils.export_calibration(AppData.resistance_calibration_data, AppData.phase_calibration_data,
+                                      filepath=self.calibration_path, grid_size=self.grid_size)
+
+    def teardown(self):
+        super().teardown()
+        if getattr(self, "calibration_path", None):
+            self._export()
+            self.log(f"Calibration written to {self.calibration_path}")
+
+
+def _load_grid(plan, grid, n):
+    """MeshConfig from a JSON grid, a path to one, or an empty mesh."""
+    if grid is None:
+        return MeshConfig.for_grid(n)
+    if isinstance(grid, str):
+        with open(plan.path(grid), "r") as f:
+            grid = json.load(f)
+    return MeshConfig.from_json(grid, n=n)
+
+
+def _io_kind(mode):
+    """'cross0' -> 'cross', 'Bar1' -> 'bar', ..."""
+    mode = (mode or "").lower()
+    for kind in ("cross", "bar", "split"):
+        if mode.startswith(kind):
+            return kind
+    return mode
+
+
+def _resistance_record(channel, result):
+    """AppData resistance entry, as stored by the Calibrate tab."""
+    return {
+        "pin": channel,
+        "resistance_params": {
+            "a_res": float(result["a_res"]),
+            "c_res": float(result["c_res"]),
+            "d_res": float(result["d_res"]),
+            "rmin": float(result["rmin"]),
+            "rmax": float(result["rmax"]),
+            "alpha_res": float(result["alpha_res"]),
+        },
+        "measurement_data": {
+            "currents": result["currents"],
+            "voltages": result["voltages"],
+            "max_current": float(result["max_current"]),
+        },
+    }
+
+
+def _phase_record(channel, result):
+    """AppData phase entry, as stored by the Calibrate tab."""
+    return {
+        "pin": channel,
+        "phase_params": {
+            "io_config": result["io_config"],
+            "amplitude": float(result["amp"]),
+            "omega": float(result["omega"]),
+            "phase": float(result["phase"]),
+            "offset": float(result["offset"]),
+        },
+        "measurement_data": {
+            "currents": result["currents"],
+            "optical_powers": result["optical_powers"],
+        },
+    }
@@ -0,0 +1,291 @@
+# app/experiments/store.py
+"""
+Columnar experiment store: the numbers of a run, one dataset per quantity.
+
+    store = ExperimentStore("results/run.h5", {"currents": 132, "phases": 2, "powers": 12},
+                            attrs={"plan": plan.data, "calibration": AppData.calibration_fingerprint()})
+    store.open()
+    store.append(step=1, time=0.51, currents=..., phases=..., powers=...)
+    store.close()
+
+    data = open_store("results/run.h5")      # also while the run is going
+    data["powers"][:, 3]
+
+Every store holds "step" (int64) and "time" (float64, seconds on a monotonic
+clock since the run started), plus one float64 (rows, width) dataset per
+entry of `columns`. Rows are buffered and written in chunks of `chunk_rows`
+at every flush(); attributes (plan, calibration fingerprint, column names)
+are JSON.
+
+Two backends, chosen by the file name:
+
+- ".h5" / ".hdf5": HDF5 through h5py (optional, imported on first use),
+  chunked and gzip-compressed datasets, opened in SWMR mode so readers can
+  follow the run.
+- anything else: a directory of raw little-endian column files plus
+  store.json (attributes, widths and the committed row count). No
+  dependency and no compression; read back with np.memmap, so reading
+  100k rows costs nothing until they are touched.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from app.utils.lazy_import import lazy_import
+
+h5py = lazy_import("h5py")
+
+MANIFEST = "store.json"
+SCALARS = ("step", "time")  # one value per row, stored 1-D
+HDF5_SUFFIXES = (".h5", ".hdf5")
+
+
+def _is_hdf5(path):
+    return str(path).lower().endswith(HDF5_SUFFIXES)
+
+
+class ExperimentStore:
+    """Append-only writer of a columnar store.
+
+    Args:
+        path (str): ".h5"/".hdf5" file, or a directory for the raw backend
+        columns (dict): {dataset name: values per row}, e.g. {"powers": 12}
+        attrs (dict, optional): metadata stored with the data (JSON-serializable)
+        chunk_rows (int): rows per HDF5 chunk / write
+    """
+
+    def __init__(self, path, columns, attrs=None, chunk_rows=256):
+        self.path = path
+        self.widths = {"step": 1, "time": 1,
+                       **{name: int(width) for name, width in columns.items() if int(width) > 0}}
+        self.dtypes = {name: "<i8" if name == "step" else "<f8" for name in self.widths}
+        self.attrs = dict(attrs or {})
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.hdf5 = _is_hdf5(path)
+        self.rows = 0
+        self._buffer = {name: [] for name in self.widths}
+        self._h5 = None
+        self._files = {}
+
+    # ------------------------------------------------------------------
+    # Open / append / close
+    # ------------------------------------------------------------------
+    def open(self, resume=False, last_step=None):
+        """Create the store, or reopen it and keep only the rows up to `last_step`.
+
+        Args:
+            resume (bool): continue an existing store
+            last_step (int, optional): last step of the run being resumed;
+                rows of later steps are dropped
+
+        Raises:
+            FileNotFoundError: resume without an existing store
+            ValueError: the existing store has different datasets
+        """
+        if resume and not os.path.exists(self.path):
+            raise FileNotFoundError(f"No experiment store at {self.path}")
+        if self.hdf5:
+            self._open_hdf5(resume, last_step)
+        else:
+            self._open_raw(resume, last_step)
+        return self
+
+    def append(self, step, time, **values):
+        """Buffer one row; datasets without a value get NaN."""
+        self._buffer["step"].append(int(step))
+        self._buffer["time"].append(float(time))
+        for name, width in self.widths.items():
+            if name in SCALARS:
+                continue
+            value = values.get(name)
+            row = np.full(width, np.nan) if value is None else np.array(value, dtype=float).ravel()  # copy
+            if row.size != width:
+                raise ValueError(f"'{name}' has {width} columns, got {row.size} values")
+            self._buffer[name].append(row)
+        if len(self._buffer["step"]) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows and make them visible to readers."""
+        count = len(self._buffer["step"])
+        if count:
+            block = {name: np.asarray(rows, dtype=self.dtypes[name]).reshape(count, -1)
+                     for name, rows in self._buffer.items()}
+            if self.hdf5:
+                # "step" is extended last: its length is the committed row count
+                for name in sorted(block, key=lambda name: name == "step"):
+                    data = block[name]
+                    dataset = self._h5[name]
+                    dataset.resize(self.rows + count, axis=0)
+                    dataset[self.rows:] = data[:, 0] if name in SCALARS else data
+            else:
+                for name, data in block.items():
+                    self._files[name].write(data.tobytes())
+            self.rows += count
+            self._buffer = {name: [] for name in self.widths}
+        if self.hdf5:
+            self._h5.flush()
+        else:
+            for f in self._files.values():
+                f.flush()
+                os.fsync(f.fileno())
+            # The manifest is what readers trust: update it after the data
+            self._write_manifest()
+
+    def close(self):
+        if self._h5 is None and not self._files:
+            return
+        try:
+            self.flush()
+        finally:
+            if self._h5 is not None:
+                self._h5.close()
+                self._h5 = None
+            for f in self._files.values():
+                f.close()
+            self._files = {}
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Backends
+    # ------------------------------------------------------------------
+    def _open_hdf5(self, resume, last_step):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if resume:
+            self._h5 = h5py.File(self.path, "r+", libver="latest")
+            self._check_datasets(list(self._h5.keys()))
+            self.rows = _kept_rows(self._h5["step"][:], last_step)
+            for name in self.widths:
+                self._h5[name].resize(self.rows, axis=0)
+        else:
+            self._h5 = h5py.File(self.path, "w", libver="latest")
+            for name, width in self.widths.items():
+                shape = (0,) if name in SCALARS else (0, width)
+                self._h5.create_dataset(
+                    name, shape=shape, maxshape=(None,) + shape[1:], dtype=self.dtypes[name],
+                    chunks=(self.chunk_rows,) + shape[1:], compression="gzip", shuffle=True,
+                )
+            for key, value in self.attrs.items():
+                self._h5.attrs[key] = json.dumps(value, default=str)
+        self._h5.swmr_mode = True
+
+    def _open_raw(self, resume, last_step):
+        os.makedirs(self.path, exist_ok=True)
+        if resume:
+            manifest = _read_manifest(self.path)
+            self._check_datasets(list(manifest["datasets"]))
+            self.attrs = manifest.get("attrs", self.attrs)
+            committed = int(manifest["rows"])
+            steps = np.fromfile(os.path.join(self.path, "step.raw"), dtype="<i8", count=committed)
+            self.rows = _kept_rows(steps, last_step)
+        for name, width in self.widths.items():
+            path = os.path.join(self.path, f"{name}.raw")
+            if resume:
+                # Drop the rows after the kept ones, including any the manifest never committed
+                with open(path, "r+b") as f:
+                    f.truncate(self.rows * width * 8)
+            self._files[name] = open(path, "ab" if resume else "wb")
+        self._write_manifest()
+
+    def _write_manifest(self):
+        manifest = {
+            "rows": self.rows,
+            "datasets": {name: {"dtype": self.dtypes[name], "width": width} for name, width in self.widths.items()},
+            "attrs": self.attrs,
+        }
+        tmp = os.path.join(self.path, MANIFEST + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, MANIFEST))
+
+    def _check_datasets(self, names):
+        if sorted(names) != sorted(self.widths):
+            raise ValueError(f"{self.path} holds {sorted(names)}, expected {sorted(self.widths)}")
+
+
+def _kept_rows(steps, last_step):
+    """Number of leading rows to keep when resuming after `last_step`."""
+    later = np.flatnonzero(steps > last_step) if last_step is not None else []
+    return int(later[0]) if len(later) else len(steps)
+
+
+def _read_manifest(path):
+    with open(os.path.join(path, MANIFEST), "r") as f:
+        return json.load(f)
+
+
+class StoreReader:
+    """Read access to a store, also while it is being written.
+
+    store["powers"] returns a (rows, width) array of the rows committed so
+    far (an np.memmap for the raw backend, read from the file for HDF5);
+    refresh() picks up rows appended since.
+
+    Args:
+        path (str): store written by ExperimentStore
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hdf5 = _is_hdf5(path)
+        self._h5 = h5py.File(path, "r", libver="latest", swmr=True) if self.hdf5 else None
+        self.refresh()
+
+    def refresh(self):
+        """Re-read the committed row count."""
+        if self.hdf5:
+            for name in self._h5:
+                self._h5[name].refresh()
+            self.rows = len(self._h5["step"])
+            self.attrs = {key: json.loads(value) for key, value in self._h5.attrs.items()}
+            self.datasets = list(self._h5.keys())
+        else:
+            manifest = _read_manifest(self.path)
+            self.rows = int(manifest["rows"])
+            self.attrs = manifest.get("attrs", {})
+            self._layout = manifest["datasets"]
+            self.datasets = list(self._layout)
+        return self
+
+    def __getitem__(self, name):
+        if self.hdf5:
+            return self._h5[name][: self.rows]
+        layout = self._layout[name]
+        shape = (self.rows,) if name in SCALARS else (self.rows, layout["width"])
+        if not self.rows:
+            return np.empty(shape, dtype=layout["dtype"])
+        return np.memmap(os.path.join(self.path, f"{name}.raw"), dtype=layout["dtype"], mode="r", shape=shape)
+
+    def to_npz(self, path):
+        """Compressed copy of every dataset (and the attributes as JSON) in one .npz."""
+        arrays = {name: np.asarray(self[name][: self.rows]) for name in self.datasets}
+        np.savez_compressed(path, attrs=json.dumps(self.attrs, default=str), **arrays)
+        return path
+
+    def close(self):
+        if self._h5 is not None:
+            self._h5.close()
+            self._h5 = None
+
+    def __len__(self):
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_store(path):
+    """StoreReader of a store (see the module docstring)."""
+    return StoreReader(path)
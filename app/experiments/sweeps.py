@@ -0,0 +1,288 @@
+# app/experiments/sweeps.py
+"""
+Sweeps compiled to currents before the run.
+
+compile_sweep() solves every point of a sweep against the calibration in one
+vectorized call and returns a SweepProgram: the channel currents of the base
+configuration, applied once, plus a (steps, channels) matrix holding only the
+swept channels. During the run each step is a single diffed write of one row
+of that matrix, followed by the dwell and the measurement.
+
+plan_sweep() builds the points first: the Cartesian product of one or more
+SweepAxis (a 2-D theta x phi map, several MZIs, ...) or random / Latin
+hypercube samples of their ranges, optionally reordered so consecutive
+points change the heaters as little as possible.
+"""
+
+import numpy as np
+
+from app.experiments.plan import SWEEP_DESIGNS, SWEEP_ORDERS
+from app.experiments.unitaries import mesh_channel_values
+from app.utils.calibrate.phase_solver import solve_phase_currents
+from app.utils.qontrol.mapping_utils import clamp_currents, get_mapping_functions
+
+PARAMETERS = ("theta", "phi")
+
+
+class SweepAxis:
+    """One swept dimension: one or more MZI phases moved together over `values`.
+
+    Args:
+        targets (list[tuple]): (label, parameter) pairs set to the same value
+        values (array_like): axis values (π)
+    """
+
+    def __init__(self, targets, values):
+        self.targets = list(targets)
+        self.values = np.asarray(values, dtype=float)
+        if not self.targets or not len(self.values):
+            raise ValueError("A sweep axis needs at least one MZI and one value")
+
+    @classmethod
+    def from_dict(cls, data):
+        """Axis from a plan entry: {"mzi": "A1" or [...], "parameter", "start", "stop", "steps"} or "values"."""
+        labels = data["mzi"] if isinstance(data["mzi"], (list, tuple)) else [data["mzi"]]
+        parameter = data.get("parameter", "theta")
+        if "values" in data:
+            values = data["values"]
+        else:
+            values = np.linspace(float(data["start"]), float(data["stop"]), int(data["steps"]))
+        return cls([(str(label).strip().upper(), parameter) for label in labels], values)
+
+    @property
+    def low(self):
+        return float(self.values.min())
+
+    @property
+    def high(self):
+        return float(self.values.max())
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        names = ", ".join(f"{label}_{parameter}" for label, parameter in self.targets)
+        return f"SweepAxis({names}: {len(self)} values)"
+
+
+def sweep_axes(settings):
+    """Axes of a plan's "sweep" section: its "axes" list, or the single-MZI keys."""
+    return [SweepAxis.from_dict(axis) for axis in settings.get("axes") or [settings]]
+
+
+def grid_points(axes):
+    """Cartesian product of the axis values, first axis slowest.
+
+    Returns:
+        np.ndarray: (points, axes) axis values
+    """
+    grids = np.meshgrid(*[axis.values for axis in axes], indexing="ij")
+    return np.stack([grid.ravel() for grid in grids], axis=1)
+
+
+def sampled_points(axes, points, design="random", seed=None):
+    """Random points inside the axis ranges.
+
+    Args:
+        design (str): "random" (uniform) or "lhs" (Latin hypercube: every axis
+            range split into `points` strata, each sampled once)
+
+    Returns:
+        np.ndarray: (points, axes) axis values
+    """
+    rng = np.random.default_rng(seed)
+    k = len(axes)
+    if design == "lhs":
+        strata = rng.permuted(np.tile(np.arange(points), (k, 1)), axis=1).T
+        unit = (strata + rng.random((points, k))) / points
+    else:
+        unit = rng.random((points, k))
+    low = np.array([axis.low for axis in axes])
+    high = np.array([axis.high for axis in axes])
+    return low + unit * (high - low)
+
+
+def snake_order(shape):
+    """Boustrophedon order of a grid (first axis slowest).
+
+    Every other row is walked backwards, recursively, so consecutive points
+    differ by one step on a single axis.
+
+    Returns:
+        np.ndarray: flat (C-order) indices in visiting order
+    """
+    order = np.arange(shape[-1])
+    for size in reversed(shape[:-1]):
+        block = len(order)
+        rows = np.vstack((order, order[::-1]))[np.arange(size) % 2]
+        order = (rows + np.arange(size)[:, None] * block).ravel()
+    return order
+
+
+def nearest_order(currents):
+    """Greedy nearest-neighbour tour: always go to the closest unvisited point.
+
+    Distances are summed absolute current changes, i.e. how far the heaters move.
+
+    Returns:
+        np.ndarray: row indices in visiting order, starting at row 0
+    """
+    currents = np.asarray(currents, dtype=float)
+    count = len(currents)
+    order = np.empty(count, dtype=int)
+    remaining = np.ones(count, dtype=bool)
+    current = 0
+    for i in range(count):
+        order[i] = current
+        remaining[current] = False
+        if i == count - 1:
+            break
+        distance = np.abs(currents - currents[current]).sum(axis=1)
+        distance[~remaining] = np.inf
+        current = int(np.argmin(distance))
+    return order
+
+
+class SweepProgram:
+    """A sweep ready to stream to the Qontrol.
+
+    Args:
+        base_values (dict): {channel: current} of the configuration the sweep starts from
+        targets (list[tuple]): swept (label, parameter) pairs, one per column
+        channels (np.ndarray): Qontrol channel of every target
+        phases (np.ndarray): (steps, targets) swept phases (π)
+        currents (np.ndarray): (steps, targets) currents written for them (mA)
+        failed (list[str]): targets/steps without a calibrated solution (raw value applied)
+    """
+
+    def __init__(self, base_values, targets, channels, phases, currents, failed=None, points=None):
+        self.base_values = base_values
+        self.targets = list(targets)
+        self.channels = np.asarray(channels, dtype=int)
+        self.phases = np.asarray(phases, dtype=float)
+        self.currents = np.asarray(currents, dtype=float)
+        self.failed = list(failed or [])
+        # index of every step in the design before any reordering
+        self.points = np.arange(len(self.currents)) if points is None else np.asarray(points, dtype=int)
+
+    @property
+    def steps(self):
+        return len(self.currents)
+
+    @property
+    def names(self):
+        """Column name of every target, e.g. "A1_theta"."""
+        return [f"{label}_{parameter}" for label, parameter in self.targets]
+
+    def coordinates(self, step):
+        """{name: phase} of a 0-based step."""
+        return dict(zip(self.names, self.phases[step].tolist()))
+
+    def travel(self):
+        """Heater movement of the run: (summed, largest single-step) absolute current change (mA)."""
+        changes = np.abs(np.diff(self.currents, axis=0)).sum(axis=1)
+        return (float(changes.sum()), float(changes.max())) if len(changes) else (0.0, 0.0)
+
+    def reorder(self, order):
+        """The same program with its steps visited in `order`."""
+        order = np.asarray(order, dtype=int)
+        return SweepProgram(self.base_values, self.targets, self.channels, self.phases[order],
+                            self.currents[order], self.failed, self.points[order])
+
+    def __len__(self):
+        return self.steps
+
+    def __repr__(self):
+        return f"SweepProgram({self.steps} steps, {', '.join(self.names)})"
+
+
+def compile_sweep(base, targets, phases, grid_size, current_limit, theta_override=None):
+    """Solve the currents of every sweep point up front.
+
+    Args:
+        base (MeshConfig): configuration of the MZIs that are not swept
+        targets (list[tuple]): (label, parameter) pairs, parameter "theta" or "phi"
+        phases (array_like): (steps, targets) phases (π); a 1-D array is one target
+        grid_size (str): mesh size, e.g. "12x12"
+        current_limit (float): channel clamp (mA)
+        theta_override (dict, optional): {label: theta} replacing base values
+            (interpolated thetas); the swept values themselves are applied as given
+
+    Returns:
+        SweepProgram
+    """
+    phases = np.asarray(phases, dtype=float)
+    if phases.ndim == 1:
+        phases = phases[:, None]
+    if phases.shape[1] != len(targets):
+        raise ValueError(f"{len(targets)} targets but {phases.shape[1]} phase columns")
+
+    create_label_mapping, _ = get_mapping_functions(grid_size)
+    label_map = create_label_mapping(int(grid_size.split("x")[0]))
+    channels = []
+    for label, parameter in targets:
+        if label not in label_map:
+            raise ValueError(f"MZI '{label}' is not mapped to Qontrol channels for a {grid_size} mesh")
+        if parameter not in PARAMETERS:
+            raise ValueError(f"Unknown sweep parameter '{parameter}'")
+        theta_ch, phi_ch = label_map[label]
+        channels.append(theta_ch if parameter == "theta" else phi_ch)
+
+    # Swept MZIs are part of the configuration even if the base leaves them
+    # out, so their other heater is set too
+    base = base.copy()
+    for label, _ in targets:
+        base.set(label)
+    base_values, _ = mesh_channel_values(base, grid_size, current_limit, theta_override=theta_override)
+
+    # One solver call for the whole (steps, targets) matrix, with the mesh
+    # path's rounding and its fallback of applying the raw value when unsolved
+    keys = [f"{label}_{parameter}" for label, parameter in targets] * len(phases)
+    solved = np.round(solve_phase_currents(keys, phases.ravel()), 5).reshape(phases.shape)
+    unsolved = np.isnan(solved)
+    failed = [f"{label}:{parameter} ({int(unsolved[:, j].sum())} points without calibration)"
+              for j, (label, parameter) in enumerate(targets) if unsolved[:, j].any()]
+    currents = clamp_currents(np.where(unsolved, phases, solved), current_limit)
+    return SweepProgram(base_values, targets, channels, phases, currents, failed)
+
+
+def plan_sweep(base, axes, grid_size, current_limit, design="grid", points=None, seed=None,
+               order="none", theta_override=None):
+    """Build the points of a sweep, compile them and put them in visiting order.
+
+    Args:
+        base (MeshConfig): configuration of the MZIs that are not swept
+        axes (list[SweepAxis]): swept dimensions
+        grid_size (str): mesh size, e.g. "12x12"
+        current_limit (float): channel clamp (mA)
+        design (str): "grid" (Cartesian product), "random" or "lhs" (sampled)
+        points (int): number of samples of a sampled design
+        seed (int, optional): random seed of a sampled design
+        order (str): "none", "snake" (grids only) or "nearest" (greedy, by current change)
+        theta_override (dict, optional): see compile_sweep
+
+    Returns:
+        SweepProgram
+    """
+    if design not in SWEEP_DESIGNS:
+        raise ValueError(f"Unknown sweep design '{design}'")
+    if order not in SWEEP_ORDERS:
+        raise ValueError(f"Unknown sweep order '{order}'")
+    if design == "grid":
+        values = grid_points(axes)
+    else:
+        values = sampled_points(axes, int(points), design, seed)
+
+    # Expand axis values to one column per target
+    columns = [j for j, axis in enumerate(axes) for _ in axis.targets]
+    targets = [target for axis in axes for target in axis.targets]
+    program = compile_sweep(base, targets, values[:, columns], grid_size, current_limit,
+                            theta_override=theta_override)
+
+    if order == "snake":
+        if design != "grid":
+            raise ValueError("The 'snake' order needs a grid design")
+        program = program.reorder(snake_order([len(axis) for axis in axes]))
+    elif order == "nearest":
+        program = program.reorder(nearest_order(program.currents))
+    return program
@@ -0,0 +1,318 @@
+# app/experiments/unitaries.py
+"""
+Unitary step files → chip currents, without the GUI.
+
+Same pipeline as the Unitary tab: step_<k>.npy files (or the matrices of one
+stacked (K, N, N) file) are embedded into the mesh size, decomposed (pnn in one batched pass, or the interferometer
+package), mapped to a MeshConfig, interpolated if enabled, solved for
+currents and mapped to Qontrol channels. Compiled channel vectors go through
+the CompileCache. Long runs are compiled COMPILE_CHUNK steps at a time, just
+ahead of the step being applied, so the first step never waits for the rest.
+"""
+
+import logging
+import os
+import re
+
+import numpy as np
+
+from app.utils.appdata import AppData
+from app.utils.calibrate.phase_solver import solve_mesh_currents
+from app.utils.compile_cache import CompileCache
+from app.utils.decomposition import (
+    decomposition,
+    decompose_clements,
+    decompose_clements_batch,
+    clements_to_chip,
+    get_mesh_interferometer,
+    get_mesh_pnn,
+)
+from app.utils.decomposition.interferometer import random_unitaries
+from app.utils.mesh_config import MeshConfig
+from app.utils.qontrol.mapping_utils import get_mapping_functions, grid_to_channel_values
+
+_STEP_FILE = re.compile(r"_(\d+)\.npy$")
+
+# Nodes with a theta sweep file for interpolation (utils/interpolation/data)
+INTERPOLATED_NODES = ("E1", "F1", "G1", "H1", "E2", "G2")
+
+# Steps hashed, looked up and batch-decomposed together by UnitaryCompiler.prepare
+COMPILE_CHUNK = 1024
+
+
+def list_step_files(folder):
+    """The *_<k>.npy files of `folder`, sorted by k."""
+    files = [f for f in os.listdir(folder) if _STEP_FILE.search(f)]
+    return sorted(files, key=lambda f: int(_STEP_FILE.search(f).group(1)))
+
+
+def embed_unitary(U, n):
+    """Embed U into an n x n identity if it is smaller than the mesh."""
+    return embed_unitaries(U[np.newaxis], n)[0]
+
+
+def embed_unitaries(stack, n):
+    """Embed every matrix of a (K, rows, cols) stack into an n x n identity, in one copy.
+
+    A stack that already has the mesh size is returned as it is, so a
+    memory-mapped stack stays mapped.
+    """
+    count, rows, cols = stack.shape
+    if rows >= n and cols >= n:
+        return stack
+    embedded = np.zeros((count, n, n), dtype=complex)
+    embedded[:, np.arange(n), np.arange(n)] = 1.0
+    embedded[:, :rows, :cols] = stack
+    return embedded
+
+
+def load_unitary_stack(path, key=None):
+    """Load a stacked (K, N, N) unitary file.
+
+    A .npy stack is memory-mapped: matrices are read from disk when a step
+    uses them. An .npz member (the first one, or `key`) is read into memory,
+    since zip members cannot be mapped. A single 2-D matrix is a stack of one.
+    The matrices are not embedded: pass the slices in use to embed_unitaries.
+
+    Returns:
+        np.ndarray: (K, N, N) unitaries, step k is stack[k - 1]
+    """
+    if path.lower().endswith(".npz"):
+        with np.load(path) as archive:
+            stack = archive[key or archive.files[0]]
+    else:
+        stack = np.load(path, mmap_mode="r")
+    if stack.ndim == 2:
+        stack = stack[np.newaxis]
+    if stack.ndim != 3:
+        raise ValueError(f"{path}: expected a (K, N, N) stack, got shape {stack.shape}")
+    return stack
+
+
+def write_haar_stack(path, count, n, seed=None, chunk=4096):
+    """Write `count` Haar-random n x n unitaries to a stacked .npy file.
+
+    The file is filled `chunk` matrices at a time through a memory map, so
+    large stacks are never held in memory at once.
+
+    Returns:
+        str: path
+    """
+    rng = np.random.default_rng(seed)
+    stack = np.lib.format.open_memmap(path, mode="w+", dtype=np.complex128, shape=(int(count), n, n))
+    for start in range(0, int(count), chunk):
+        stop = min(start + chunk, int(count))
+        stack[start:stop] = random_unitaries(stop - start, n, rng=rng)
+    stack.flush()
+    del stack
+    return path
+
+
+def load_step_unitaries(folder, files, n, start=1):
+    """Load and embed every step file.
+
+    Args:
+        start (int): step index of files[0]
+
+    Returns:
+        tuple: ({step_idx: U} with 1-based step indices, {file: error} of unreadable files)
+    """
+    unitaries, errors = {}, {}
+    for step_idx, name in enumerate(files, start=start):
+        try:
+            unitaries[step_idx] = embed_unitary(np.load(os.path.join(folder, name)), n)
+        except Exception as e:
+            errors[name] = e
+    return unitaries, errors
+
+
+def precompute_pnn_phases(unitaries, n):
+    """Decompose a {step_idx: U} set in one batched pnn pass.
+
+    Returns:
+        tuple: ({step_idx: (A_phi, A_theta)} in chip units (π), max reconstruction
+        error); steps whose shape does not match the mesh are left out
+    """
+    step_ids = [k for k, U in unitaries.items() if U.shape == (n, n)]
+    if not step_ids:
+        return {}, 0.0
+    phis, thetas, _, errors = decompose_clements_batch(np.stack([unitaries[k] for k in step_ids]), block="mzi")
+    thetas *= 2 / np.pi
+    phis = phis % (2 * np.pi)
+    phis /= np.pi
+    return {step_idx: (phis[k], thetas[k]) for k, step_idx in enumerate(step_ids)}, float(errors.max())
+
+
+def interpolate_special_nodes(mesh):
+    """Replace theta of the INTERPOLATED_NODES by the interpolated value (in place).
+
+    Returns:
+        tuple: ({node: interpolated theta (π)}, [(node, error)] of the nodes that failed)
+    """
+    from tests.interpolation.data import Reader_interpolation as reader
+
+    interpolated, failed = {}, []
+    for node in INTERPOLATED_NODES:
+        try:
+            slot = mesh.index[node]
+            theta_val = float(mesh.theta[slot])
+            reader.load_sweep_file(f"{node}_theta_200_steps.csv")
+            theta = reader.theta_trans(theta_val * np.pi, reader.theta, reader.theta_corrected) / np.pi
+            interpolated[node] = theta
+            mesh.theta[slot] = theta
+        except Exception as e:
+            failed.append((node, e))
+    return interpolated, failed
+
+
+def compile_mesh(U, n, package="pnn", global_phase=False, precomputed=None, interpolate=False):
+    """Decompose one unitary into a MeshConfig of phases (π units).
+
+    Args:
+        U (np.ndarray): embedded n x n unitary
+        n (int): mesh size
+        package (str): "pnn" or "interferometer"
+        global_phase (bool): global-phase flag of the interferometer package
+        precomputed (tuple, optional): (A_phi, A_theta) from precompute_pnn_phases
+        interpolate (bool): apply interpolate_special_nodes to the result
+
+    Returns:
+        MeshConfig
+    """
+    if package == "pnn":
+        if precomputed is not None:
+            A_phi, A_theta = precomputed
+        else:
+            A_phi, A_theta, *_ = decompose_clements(U, block="mzi")
+            A_theta = A_theta * 2 / np.pi
+            A_phi = (A_phi % (2 * np.pi)) / np.pi
+        mesh = get_mesh_pnn(n, A_theta, A_phi)
+    elif package == "interferometer":
+        I = decomposition(U, global_phase=global_phase)
+        bs_list = I.BS_list
+        clements_to_chip(bs_list)
+        mesh = get_mesh_interferometer(n, bs_list)
+    else:
+        raise ValueError(f"Unknown package: {package}")
+
+    if interpolate:
+        for node, e in interpolate_special_nodes(mesh)[1]:
+            logging.error(f"[Compile] Interpolation failed for {node}: {e}")
+    return mesh
+
+
+def mesh_phases(mesh):
+    """Theta then phi of every slot (π), NaN for the MZIs the mesh leaves out."""
+    active = np.concatenate((mesh.active, mesh.active))
+    return np.where(active, np.concatenate((mesh.theta, mesh.phi)), np.nan)
+
+
+def mesh_channel_values(mesh, grid_size, current_limit, theta_override=None):
+    """Solve the currents of every mapped MZI and map them to Qontrol channels.
+
+    Args:
+        theta_override (dict, optional): {label: theta (π)} used instead of the
+            mesh values for those MZIs (the Mesh tab's interpolated thetas)
+
+    Returns:
+        tuple: ({channel: current}, failed channel descriptions)
+    """
+    create_label_mapping, _ = get_mapping_functions(grid_size)
+    label_map = create_label_mapping(int(grid_size.split("x")[0]))
+    phase_mesh = mesh.copy()
+    slots = [slot for slot in np.flatnonzero(mesh.active) if mesh.labels[slot] in label_map]
+    theta = None
+    if theta_override:
+        theta = np.array([theta_override.get(mesh.labels[slot], mesh.theta[slot]) for slot in slots], dtype=float)
+    _, failed = solve_mesh_currents(phase_mesh, slots, theta=theta)
+    return grid_to_channel_values(phase_mesh, grid_size, current_limit), failed
+
+
+class UnitaryCompiler:
+    """Compiles the unitaries of a step folder to channel currents, with caching.
+
+    prepare() is called with one chunk of steps at a time (at most
+    COMPILE_CHUNK), before channel_values() of those steps; it only keeps the
+    state of the current chunk.
+
+    Args:
+        grid_size (str): mesh size, e.g. "12x12"
+        package (str): "pnn" or "interferometer"
+        global_phase (bool): interferometer global-phase flag
+        current_limit (float): channel clamp (mA)
+        cache (CompileCache | None): compile cache; False disables caching
+        interpolate (bool, optional): interpolate the special nodes; defaults to
+            AppData.interpolation_enabled
+    """
+
+    def __init__(self, grid_size, package="pnn", global_phase=False, current_limit=None, cache=None,
+                 interpolate=None):
+        self.grid_size = grid_size
+        self.n = int(grid_size.split("x")[0])
+        self.package = package
+        self.global_phase = bool(global_phase)
+        self.current_limit = current_limit
+        self.cache = CompileCache() if cache is None else (cache or None)
+        self.interpolate = AppData.interpolation_enabled if interpolate is None else bool(interpolate)
+        self.precomputed = {}
+        self.keys = {}
+        self.cached = {}
+
+    def prepare(self, unitaries):
+        """Look up the cache and batch-decompose the remaining steps of one chunk.
+
+        Args:
+            unitaries (dict): {step_idx: U} of the next steps to apply
+
+        Returns:
+            int: number of steps found in the cache
+        """
+        self.keys, self.cached = {}, {}
+        if self.cache is not None:
+            for step_idx, U in unitaries.items():
+                key = CompileCache.make_key(
+                    U, self.grid_size, self.package, self.global_phase,
+                    interpolation=self.interpolate, current_limit=self.current_limit,
+                )
+                self.keys[step_idx] = key
+                entry = self.cache.get(key)
+                if entry is not None:
+                    self.cached[step_idx] = entry
+
+        if self.package == "pnn":
+            todo = {k: U for k, U in unitaries.items() if k not in self.cached}
+            try:
+                self.precomputed, error = precompute_pnn_phases(todo, self.n)
+                if self.precomputed:
+                    logging.debug(f"[Compile] Decomposed {len(self.precomputed)} unitaries "
+                                 f"(max reconstruction error {error:.2e})")
+            except Exception as e:
+                logging.error(f"[Compile] Batched decomposition failed: {e}")
+                self.precomputed = {}
+        return len(self.cached)
+
+    def phase_names(self):
+        """Names of the phases returned by channel_values(), in mesh_phases() order."""
+        labels = MeshConfig.for_grid(self.n).labels
+        return [f"{label}_theta" for label in labels] + [f"{label}_phi" for label in labels]
+
+    def channel_values(self, step_idx, U):
+        """{channel: current} of one step, from the cache or compiled now.
+
+        Returns:
+            tuple: ({channel: current}, failed channel descriptions, compiled
+            phases (π) in phase_names() order)
+        """
+        if step_idx in self.cached:
+            values, phases = self.cached[step_idx]
+            if phases is None:
+                phases = np.full(len(self.phase_names()), np.nan)
+            return values, [], phases
+        key = self.keys.get(step_idx)
+        mesh = compile_mesh(U, self.n, self.package, self.global_phase, self.precomputed.get(step_idx),
+                            interpolate=self.interpolate)
+        values, failed = mesh_channel_values(mesh, self.grid_size, self.current_limit)
+        phases = mesh_phases(mesh)
+        if key is not None and self.current_limit is not None:
+            self.cache.put(key, values, phases)
+        return values, failed, phases
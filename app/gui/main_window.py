@@ -10,9 +10,11 @@ from app.gui.window1 import Window1Content  # Import the Window1Content widget
 from app.gui.window2 import Window2Content  # Import the Window2Content widget
 from app.gui.window3 import Window3Content  # Import the Window3Content widget
 from app.devices.qontrol_device import QontrolDevice  # Your QontrolDevice class
+from app.experiments import JobExecutor
 import app.utils
 from app.utils.utils import importfunc
 from app.utils.appdata import AppData   # Import the AppData class
+from app.utils.telemetry import TelemetryService, start_device_telemetry
 # from app.utils import utils            # This module contains apply_phase
 
 class MainWindow(ctk.CTk):
@@ -24,6 +26,9 @@ class MainWindow(ctk.CTk):
         self.daq = daq
         self.switch_input = switch_input
         self.switch_output = switch_output
+        # One executor for every tab: a sweep, a path sequence and a unitary
+        # cycle never drive the chip at the same time
+        self.executor = JobExecutor()
 
         self.current_content = None  # Important: so we can check it safely switch tabs
         screen_width = self.winfo_screenwidth()
@@ -111,6 +116,7 @@ class MainWindow(ctk.CTk):
                 switch_output = self.switch_output,
                 grid_size=mesh_size,
                 phase_selector=self.calibration_control,  
+                executor=self.executor,
             )
             self.current_content.pack(expand=True, fill="both", padx=10, pady=10)
 
@@ -138,6 +144,7 @@ class MainWindow(ctk.CTk):
                 IOconfig="Config1",
                 app=self.appdata,
                 qontrol=self.qontrol,
+                executor=self.executor,
             )
             self.current_content.pack(expand=True, fill="both", padx=10, pady=10)
         elif window_name == "Window 3":
@@ -152,7 +159,8 @@ class MainWindow(ctk.CTk):
                 switch=self.switch_output,  # For backward compatibility
                 switch_input=self.switch_input,
                 switch_output=self.switch_output,
-                grid_size=mesh_size
+                grid_size=mesh_size,
+                executor=self.executor,
             )            
             self.current_content.pack(expand=True, fill="both", padx=10, pady=10)
             
@@ -258,7 +266,13 @@ class MainWindow(ctk.CTk):
                 print(f"[ERROR][Input Switch] Connection error: {e}")
                 self.device_control.update_device_info(None, "switch_input")
 
+        # One background poller per connected device (see app/utils/telemetry.py)
+        start_device_telemetry(self.qontrol, self.thorlabs, self.daq, self.config)
+
     def disconnect_devices(self):
+        # Stop polling before the ports go away
+        TelemetryService.stop_all()
+
         if self.qontrol:
             self.qontrol.disconnect()
 
@@ -280,9 +294,11 @@ class MainWindow(ctk.CTk):
             self.device_control.update_device_info(None, "thorlabs")
         
         if self.switch_output:
+            self.switch_output.close()
             self.device_control.update_device_info(None, "switch_output")
         
         if self.switch_input:
+            self.switch_input.close()
             self.device_control.update_device_info(None, "switch_input")
         
         # Clear Qontrol display
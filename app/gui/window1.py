@@ -6,7 +6,6 @@ import time
 from decimal import *
 import copy
 import sympy as sp
-from scipy.optimize import brentq
 from app.utils.appdata import AppData
 import io
 from contextlib import redirect_stdout
@@ -14,6 +13,9 @@ from app.gui.widgets import PhaseShifterSelectionWidget
 import customtkinter as ctk
 from app.utils.gui import grid
 from app.utils.qontrol.mapping_utils import get_mapping_functions
+from app.utils.mesh_config import MeshConfig
+from app.utils.calibrate.phase_solver import solve_mesh_currents, solve_phase_currents
+from app.utils.telemetry import TelemetryService, format_qontrol_status, format_qontrol_errors
 # from app.utils.qontrol.qmapper8x8 import create_label_mapping, apply_grid_mapping
 # from app.utils.qontrol.qmapper12x12 import create_label_mapping as create_label_mapping_12x12   
 from collections import defaultdict
@@ -26,6 +28,8 @@ import json, time, logging
 from PIL import Image
 import os
 from app.devices.switch_device import Switch
+from app.devices.hardware import Instruments
+from app.experiments import ExperimentPlan, JobExecutor, MziSweep, PathSequence
 
 # from app.utils.grid import mode_to_arms
 
@@ -58,7 +62,8 @@ class Window1Content(ctk.CTkFrame):
             self.interpolated_theta_label.configure(text="")
         ######
 
-    def __init__(self, master, channel, fit, IOconfig, app, qontrol, thorlabs, daq, switch_input, switch_output, phase_selector=None, grid_size="8x8", **kwargs):
+    def __init__(self, master, channel, fit, IOconfig, app, qontrol, thorlabs, daq, switch_input, switch_output, phase_selector=None, grid_size="8x8",
+                 executor=None, **kwargs):
         super().__init__(master, **kwargs)
         self.qontrol = qontrol
         self.thorlabs = thorlabs
@@ -86,6 +91,13 @@ class Window1Content(ctk.CTkFrame):
         self._auto_idx = 0
         self._auto_running = False
         self._auto_paused = False
+        # Runs the MZI sweep and the path sequence off the Tk thread; shared with the other tabs (MainWindow)
+        self.executor = executor if executor is not None else JobExecutor()
+        self.chip_buttons = []  # compact-panel buttons that drive the chip, locked during a run
+        self._path_list = []
+        self._sweep_experiment = None
+        self._sweep_base_json = None
+        self._sweep_grid_drawn = 0.0  # time of the last grid redraw during a sweep
 
         self.phase_selector = phase_selector
         self.app = app  # Store the AppData instance
@@ -123,6 +135,7 @@ class Window1Content(ctk.CTkFrame):
         self.selected_unit = "uW"  # Default unit for power measurement
 
         self._initialize_live_graph() # Initialize the live graph
+        self._attach_running_job()
 
     def _create_grid_container(self):
         """Create expanded grid display area"""
@@ -191,6 +204,8 @@ class Window1Content(ctk.CTkFrame):
                 font=ctk.CTkFont(size=12) 
             )
             btn.grid(row=0, column=col, padx=1, sticky="nsew")
+            if text not in ("Imp", "Exp"):
+                self.chip_buttons.append(btn)
 
         # Label to show updated values
         self.interpolated_theta_label = ctk.CTkLabel(btn_frame, text="")
@@ -400,6 +415,23 @@ class Window1Content(ctk.CTkFrame):
         )
         self.run_path_sequence_button.pack(side="left", padx=5, pady=5)
 
+        self.path_pause_button = ctk.CTkButton(
+            row1_frame,
+            text="Pause",
+            width=60,
+            command=self._toggle_path_pause,
+            state="disabled"
+        )
+        self.path_pause_button.pack(side="left", padx=5, pady=5)
+        self.path_cancel_button = ctk.CTkButton(
+            row1_frame,
+            text="Cancel",
+            width=60,
+            command=lambda: self.executor.cancel(),
+            state="disabled"
+        )
+        self.path_cancel_button.pack(side="left", padx=5, pady=5)
+
         ### Status tab ###
         self.status_display = ctk.CTkTextbox(notebook.add("Status"), state="disabled")
         self.status_display.pack(fill="both", expand=True)
@@ -500,6 +532,31 @@ class Window1Content(ctk.CTkFrame):
         )
         self.sweep_run_button.grid(row=8, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
 
+        # Row 9: Pause / Cancel of a running sweep
+        self.sweep_pause_button = ctk.CTkButton(
+            sweep_tab,
+            text="Pause",
+            command=self._toggle_sweep_pause,
+            state="disabled"
+        )
+        self.sweep_pause_button.grid(row=9, column=0, padx=(10, 5), pady=(0, 10), sticky="ew")
+        self.sweep_cancel_button = ctk.CTkButton(
+            sweep_tab,
+            text="Cancel",
+            command=lambda: self.executor.cancel(),
+            state="disabled"
+        )
+        self.sweep_cancel_button.grid(row=9, column=1, padx=(5, 10), pady=(0, 10), sticky="ew")
+
+        # Row 10: Redraw the grid with the swept value while running (throttled)
+        self.sweep_grid_update_var = ctk.BooleanVar(value=False)
+        self.sweep_grid_update_checkbox = ctk.CTkCheckBox(
+            sweep_tab,
+            text="Update grid view during sweep",
+            variable=self.sweep_grid_update_var
+        )
+        self.sweep_grid_update_checkbox.grid(row=10, column=0, columnspan=2, padx=10, pady=(0, 10), sticky="w")
+
         ### Switch tab ###
         switch_tab = notebook.add("Switches")  
         switch_tab.grid_columnconfigure(0, weight=1)
@@ -712,25 +769,32 @@ class Window1Content(ctk.CTkFrame):
     #         self._show_error(f"Failed to swap ports: {e}")
 
     def _run_sweep(self):
-        """Run MZI Sweep with configurable switch channel measurement"""
+        """Run the MZI sweep on a worker thread, measuring through the switch or the Thorlabs directly.
+
+        Several comma-separated target MZIs are swept together over the same values.
+        """
+        busy = self._experiment_busy()
+        if busy:
+            self._show_error(busy)
+            return
         try:
             # Get parameters
-            target_mzi = self.sweep_target_entry.get().strip().upper()
+            targets = [t.strip() for t in self.sweep_target_entry.get().upper().split(",") if t.strip()]
             parameter = self.sweep_parameter_menu.get()
             start_val = float(self.sweep_start_entry.get())
             end_val = float(self.sweep_end_entry.get())
             num_steps = int(self.sweep_steps_entry.get())
-            dwell_time = float(self.sweep_dwell_entry.get()) / 1000  # Convert ms to seconds
+            dwell_ms = float(self.sweep_dwell_entry.get())
             use_switch = True if self.measure_switch_menu.get() == "Yes" else False
             
             # Validate MZI format (e.g., A1, B2, etc.)
-            if not re.match(r"^[A-Z][0-9]+$", target_mzi):
-                raise ValueError("Invalid MZI format. Use format like 'A1'")
+            if not targets or not all(re.match(r"^[A-Z][0-9]+$", t) for t in targets):
+                raise ValueError("Invalid MZI format. Use format like 'A1' (or 'A1, B2' to sweep several)")
             
             if num_steps <= 0:
                 raise ValueError("Number of steps must be positive")
             
-            # Get switch channels if using switch
+            measurement = {"source": "thorlabs", "unit": self.selected_unit}
             if use_switch:
                 if not self.switch_output:
                     raise ValueError("Output switch device not available but 'Measure using switch' is selected")
@@ -743,129 +807,103 @@ class Window1Content(ctk.CTkFrame):
                     raise ValueError("No valid switch channels specified")
                     
                 logging.info(f"  Using switch channels: {self.switch_channels}")
-            
-            # Get the current grid configuration as JSON
-            base_json = self.custom_grid.export_paths_json()
-            
-            # Update status
-            self.sweep_run_button.configure(state="disabled")
-            
-            # Generate sweep values
-            sweep_values = np.linspace(start_val, end_val, num_steps)
+                measurement = {"source": "switch", "switch_channels": self.switch_channels, "unit": self.selected_unit}
+
+            path = filedialog.asksaveasfilename(
+                title='Save Sweep Results',
+                defaultextension='.csv',
+                filetypes=[('CSV files', '*.csv')]
+            )
+            if not path:
+                return
+
+            # The current grid is the base configuration of the other MZIs
+            self._sweep_base_json = self.custom_grid.export_paths_json() or "{}"
+            plan = ExperimentPlan({
+                "experiment": "sweep",
+                "grid_size": self.grid_size,
+                "sweep": {
+                    "mzi": targets[0] if len(targets) == 1 else targets, "parameter": parameter,
+                    "start": start_val, "stop": end_val, "steps": num_steps,
+                    "base": json.loads(self._sweep_base_json),
+                },
+                "dwell_ms": dwell_ms,
+                "measurement": measurement,
+                "output": path.replace("{", "{{").replace("}", "}}"),
+            })
+            thorlabs = self.thorlabs if isinstance(self.thorlabs, list) else [self.thorlabs] if self.thorlabs else []
+            experiment = MziSweep(plan, Instruments(self.qontrol, thorlabs, self.daq, self.switch_input, self.switch_output))
+            if self.interpolation_enabled:
+                experiment.theta_override = dict(self.interpolated_theta)
             
             logging.info(f"\nStarting sweep:")
-            logging.info(f"  Target MZI: {target_mzi}")
+            logging.info(f"  Target MZI: {', '.join(targets)}")
             logging.info(f"  Parameter: {parameter}")
             logging.info(f"  Range: {start_val}π to {end_val}π")
             logging.info(f"  Steps: {num_steps}")
-            logging.info(f"  Dwell time: {dwell_time} seconds")
+            logging.info(f"  Dwell time: {dwell_ms} ms")
             logging.info(f"  Using switch: {use_switch}")
-            
-            # Initialize results storage
-            self.sweep_results = []
-            headers = self._create_sweep_headers(parameter, use_switch)
-            
-            for i, value in enumerate(sweep_values):
-                logging.info(f"  Step {i+1}/{num_steps}: {parameter} = {value:.3f}π")
-                
-                # Update the json for the target MZI
-                updated_json = self.update_mzi_in_json(base_json, target_mzi, parameter, str(value))
-                logging.info(updated_json)
-                
-                self.update()  # Allow Tkinter to process GUI updates
-                
-                self.custom_grid.import_paths_json(updated_json)
-                
-                # Apply the phase configuration
-                self.apply_phase_new()
-                
-                time.sleep(dwell_time)  # Dwell time for system to settle
-                
-                # Take measurements after dwell time
-                measurements = self._take_sweep_measurements(use_switch)
-                
-                # Store results
-                from datetime import datetime
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                result_row = [timestamp, i + 1, f"{value:.6f}"]
-                result_row.extend([f"{m:.6f}" for m in measurements])
-                self.sweep_results.append(result_row)
-                
-                # Print current measurements
-                self._print_sweep_measurements(measurements, use_switch)
-            
-            # Export results
-            if self.sweep_results:
-                self._export_results_to_csv(self.sweep_results, headers)
-            
-            # Reset UI
-            self.sweep_run_button.configure(state="normal")
-            logging.info("Sweep complete!")
+
+            self._sweep_experiment = experiment
+            self.executor.start(experiment)
+            self._show_sweep_running()
+            self.executor.pump(self, self._on_sweep_event)
+            self.executor.watch(self, self._lock_chip_controls)
             
         except ValueError as e:
             self._show_error(str(e))
-            self.sweep_run_button.configure(state="normal")
         except Exception as e:
             self._show_error(f"Sweep failed: {str(e)}")
-            self.sweep_run_button.configure(state="normal")
 
-    def _create_sweep_headers(self, parameter, use_switch):
-        """Create headers for sweep results based on measurement type"""
-        headers = ["timestamp", "step", f"{parameter}_pi_units"]
-        
-        if use_switch:
-            # Use the shared module to create headers
-            headers.extend(SwitchMeasurements.create_headers_with_switch(
-                self.switch_channels, self.selected_unit
-            ))
-        else:
-            # Headers for direct Thorlabs measurements
-            if self.thorlabs:
-                devices = self.thorlabs if isinstance(self.thorlabs, list) else [self.thorlabs]
-                headers.extend(SwitchMeasurements.create_headers_thorlabs(
-                    len(devices), self.selected_unit
-                ))
-        
-        return headers
+    def _show_sweep_running(self):
+        self.sweep_run_button.configure(text="Running...", state="disabled")
+        self.sweep_pause_button.configure(text="Resume" if self.executor.paused else "Pause", state="normal")
+        self.sweep_cancel_button.configure(state="normal")
 
-    def _take_sweep_measurements(self, use_switch):
-        """
-        Take measurements using either switch or direct Thorlabs readings
-        
-        Args:
-            use_switch (bool): Whether to use the optical switch
-            
-        Returns:
-            list: Power measurements
-        """
-        if use_switch:
-            return self._measure_with_switch()
+    def _toggle_sweep_pause(self):
+        if self.executor.paused:
+            self.executor.resume()
+            self.sweep_pause_button.configure(text="Pause")
         else:
-            return self._measure_thorlabs_direct()
-
-    def _measure_with_switch(self):
-        """Measure power using the optical switch for specified channels only"""
-        # Get the first Thorlabs device (connected to switch output)
-        thorlabs_device = self.thorlabs[0] if isinstance(self.thorlabs, list) else self.thorlabs
-        
-        return SwitchMeasurements.measure_with_switch(
-            self.switch_output, thorlabs_device, self.switch_channels, self.selected_unit
-    )
-
-    def _measure_thorlabs_direct(self):
-        """Measure power directly from Thorlabs devices (no switch)"""
-        return SwitchMeasurements.measure_thorlabs_direct(self.thorlabs, self.selected_unit)
-
-    def _print_sweep_measurements(self, measurements, use_switch):
+            self.executor.pause()
+            self.sweep_pause_button.configure(text="Resume")
+
+    def _on_sweep_event(self, kind, data):
+        """Show a sweep executor event (runs on the Tk thread)"""
+        if kind == "progress":
+            self.sweep_run_button.configure(text=f"Step {data['step']}/{data['total']}")
+            if data["step"] and self.sweep_grid_update_var.get():
+                self._show_sweep_value(data["step"])
+        elif kind == "measurement":
+            self._print_sweep_measurements(data["labels"], data["values"])
+        elif kind in ("done", "cancelled", "error"):
+            if kind == "done":
+                logging.info(f"Sweep complete! Results saved to {data['result']}")
+            elif kind == "cancelled":
+                logging.info("Sweep cancelled; the steps measured so far are saved.")
+            else:
+                self._show_error(f"Sweep failed: {data['error']}")
+            self.sweep_run_button.configure(text="Run Sweep", state="normal")
+            self.sweep_pause_button.configure(text="Pause", state="disabled")
+            self.sweep_cancel_button.configure(state="disabled")
+
+    def _show_sweep_value(self, step, min_interval=0.5):
+        """Redraw the grid with the value of `step`, at most every `min_interval` seconds"""
+        now = time.perf_counter()
+        if now - self._sweep_grid_drawn < min_interval:
+            return
+        self._sweep_grid_drawn = now
+        program = self._sweep_experiment.program
+        grid_json = self._sweep_base_json
+        for (label, parameter), value in zip(program.targets, program.phases[step - 1]):
+            grid_json = self.update_mzi_in_json(grid_json, label, parameter, str(value))
+        self.custom_grid.import_paths_json(grid_json)
+
+    def _print_sweep_measurements(self, labels, measurements):
         """Print measurements to console"""
-        if use_switch:
-            logging.info("    Switch measurements:")
-            for i, (ch, power) in enumerate(zip(self.switch_channels, measurements)):
-                logging.info(f"      Channel {ch}: {power:.3f} {self.selected_unit}")
-        else:
-            logging.info("    Thorlabs measurements:")
-            for i, power in enumerate(measurements):
-                logging.info(f"      Device {i}: {power:.3f} {self.selected_unit}")
+        logging.info("    Measurements:")
+        for label, power in zip(labels, measurements):
+            logging.info(f"      {label}: {power:.3f} {self.selected_unit}")
 
     def update_mzi_in_json(self, json_string, target_mzi, parameter, value):
         """
@@ -954,142 +992,137 @@ class Window1Content(ctk.CTkFrame):
 
     def run_path_sequence(self, path_list, delay=0.5):
         """
-        Run each path (JSON dict) in path_list with a delay between each.
-        Applies phase logic for each step.
-        Measures from 2 Thorlabs devices after each step and saves results to CSV at the end.
+        Run each path (JSON dict) in path_list on a worker thread, `delay` seconds per step.
+        Measures the Thorlabs after each step; rows are streamed to the chosen CSV as they are measured.
         """
-        create_label_mapping, apply_grid_mapping = get_mapping_functions(self.grid_size)
-        label_map = create_label_mapping(int(self.grid_size.split('x')[0]))
-
-        results = []
-        headers = ["timestamp", "step", "thorlabs1_uW", "thorlabs2_uW"]
-
-        def run_next(index):
-            if index >= len(path_list):
-                # Export results
-                if results:
-                    self._export_results_to_csv(results, headers)
-                    logging.info("\nPath sequence complete!")
-                    # Reset phases to zero
-                    zero_config = self._create_zero_config()
-                    apply_grid_mapping(self.qontrol, zero_config, self.grid_size)
-                    logging.info("All values reset to zero")
-                else:
-                    logging.info("\nNo measurements collected.")
-                return
-
-            # Update the global grid config
-            AppData.default_json_grid = path_list[index]
-            logging.info(f"Applying path {index+1}/{len(path_list)}: {AppData.default_json_grid}")
-
-            # Optionally update the grid UI
-            self.custom_grid.import_paths_json(json.dumps(AppData.default_json_grid))
-
-            # --- Use label_map to apply phase for each cross_label ---
-            grid_config = path_list[index]
-            phase_grid_config = copy.deepcopy(grid_config)
-            for cross_label, data in grid_config.items():
-                if cross_label not in label_map:
-                    continue
-                theta_ch, phi_ch = label_map[cross_label]
-                theta_val = data.get("theta", "0")
-                phi_val = data.get("phi", "0")
+        busy = self._experiment_busy()
+        if busy:
+            self._show_error(busy)
+            return
+        path = filedialog.asksaveasfilename(
+            title='Save Path Sequence Results',
+            defaultextension='.csv',
+            filetypes=[('CSV files', '*.csv')]
+        )
+        if not path:
+            return
+        try:
+            plan = ExperimentPlan({
+                "experiment": "path_sequence",
+                "grid_size": self.grid_size,
+                "paths": path_list,
+                "dwell_ms": delay * 1000.0,
+                "measurement": {"source": "thorlabs", "unit": self.selected_unit},
+                "output": path.replace("{", "{{").replace("}", "}}"),
+            })
+            thorlabs = self.thorlabs if isinstance(self.thorlabs, list) else [self.thorlabs] if self.thorlabs else []
+            experiment = PathSequence(plan, Instruments(self.qontrol, thorlabs, self.daq, self.switch_input, self.switch_output))
+        except Exception as e:
+            self._show_error(f"Path sequence failed: {e}")
+            return
 
-                # Process theta channel
-                if theta_ch is not None and theta_val:
-                    key = f"{cross_label}_theta"
-                    calibration = AppData.phase_calibration_data.get(key)
-                    if calibration:
-                        try:
-                            theta_float = float(theta_val)
-                            current_theta = self._calculate_current_for_phase_json(key, theta_float)
-                            if current_theta is not None:
-                                current_theta = round(current_theta, 5)
-                                phase_grid_config[cross_label]["theta"] = str(current_theta)
-                        except Exception as e:
-                            logging.info(f"{cross_label}:θ ({str(e)})")
+        self._path_list = path_list
+        self.executor.start(experiment)
+        self._show_path_running()
+        self.executor.pump(self, self._on_path_event)
+        self.executor.watch(self, self._lock_chip_controls)
+
+    def _show_path_running(self):
+        self.run_path_sequence_button.configure(text="Running...", state="disabled")
+        self.path_pause_button.configure(text="Resume" if self.executor.paused else "Pause", state="normal")
+        self.path_cancel_button.configure(state="normal")
+
+    def _toggle_path_pause(self):
+        if self.executor.paused:
+            self.executor.resume()
+            self.path_pause_button.configure(text="Pause")
+        else:
+            self.executor.pause()
+            self.path_pause_button.configure(text="Resume")
+
+    def _on_path_event(self, kind, data):
+        """Show a path sequence executor event (runs on the Tk thread)"""
+        if kind == "progress":
+            self.run_path_sequence_button.configure(text=f"Step {data['step']}/{data['total']}")
+            if data["step"]:
+                # Keep the global grid config and the grid UI on the last applied path
+                AppData.default_json_grid = self._path_list[data["step"] - 1]
+                AppData.default_mesh_config = None  # re-imported from the JSON grid on demand
+                self.custom_grid.import_paths_json(json.dumps(AppData.default_json_grid))
+        elif kind == "measurement":
+            logging.info(f"Step {data['step']} measurements:")
+            for label, power in zip(data["labels"], data["values"]):
+                logging.info(f"  {label}: {power:.3f} {self.selected_unit}")
+        elif kind in ("done", "cancelled", "error"):
+            if kind == "done":
+                logging.info(f"\nPath sequence complete! Results saved to {data['result']}")
+            elif kind == "cancelled":
+                logging.info("Path sequence cancelled; the steps measured so far are saved.")
+            else:
+                self._show_error(f"Path sequence failed: {data['error']}")
+            self.run_path_sequence_button.configure(text="Run Path Sequence", state="normal")
+            self.path_pause_button.configure(text="Pause", state="disabled")
+            self.path_cancel_button.configure(state="disabled")
+
+    def _experiment_busy(self):
+        """Why no experiment can start now (None if one can): the chip is driven by one job at a time."""
+        if self.executor.running:
+            return f"A {self.executor.kind} experiment is already running"
+        if getattr(self, "custom_grid", None) is not None and self.custom_grid.playing:
+            return "Auto-calibration is running"
+        return None
 
-                # Process phi channel
-                if phi_ch is not None and phi_val:
-                    key = f"{cross_label}_phi"
-                    calibration = AppData.phase_calibration_data.get(key)
-                    if calibration:
-                        try:
-                            phi_float = float(phi_val)
-                            current_phi = self._calculate_current_for_phase_json(key, phi_float)
-                            if current_phi is not None:
-                                current_phi = round(current_phi, 5)
-                                phase_grid_config[cross_label]["phi"] = str(current_phi)
-                        except Exception as e:
-                            logging.info(f"{cross_label}:φ ({str(e)})")
-
-            # Apply the calculated phase grid config to the device
+    def _lock_chip_controls(self, running):
+        """Disable the controls that write to the chip while a job (from any tab) runs."""
+        state = "disabled" if running else "normal"
+        buttons = list(self.chip_buttons)
+        play_btn = getattr(getattr(self, "custom_grid", None), "play_btn", None)
+        if play_btn is not None:
+            buttons.append(play_btn)
+        if self.executor.kind != "sweep":
+            buttons.append(self.sweep_run_button)
+        if self.executor.kind != "path_sequence":
+            buttons.append(self.run_path_sequence_button)
+        for btn in buttons:
             try:
-                config_json = json.dumps(phase_grid_config)
-                apply_grid_mapping(self.qontrol, config_json, self.grid_size)
-            except Exception as e:
-                logging.error(f"Device update failed: {str(e)}")
-
-            # Thorlabs measurements (use only the first two devices)
-            thorlabs_values = [0.0, 0.0]
-            if self.thorlabs:
-                devices = self.thorlabs if isinstance(self.thorlabs, list) else [self.thorlabs]
-                for i in range(2):
-                    try:
-                        thorlabs_values[i] = devices[i].read_power(unit=self.selected_unit)
-                    except Exception as e:
-                        logging.error(f"Error reading Thorlabs {str(i)}: {str(e)}")
-                        thorlabs_values[i] = 0.0
-
-            # Record results with timestamp
-            current_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            row = [current_timestamp, index+1, thorlabs_values[0], thorlabs_values[1]]
-            results.append(row)
-
-            # Print current values
-            logging.info(f"Step {index+1} measurements:")
-            logging.info(f"  Thorlabs 1: {thorlabs_values[0]:.3f} {self.selected_unit}")
-            logging.info(f"  Thorlabs 2: {thorlabs_values[1]:.3f} {self.selected_unit}")
+                btn.configure(state=state)
+            except Exception:
+                pass  # the grid was rebuilt meanwhile
 
-            # Schedule the next path after the delay
-            self.after(int(delay * 1000), lambda: run_next(index + 1))
+    def _attach_running_job(self):
+        """Follow the shared executor when the tab is (re)built during a run.
 
-        try:
-            run_next(0)
-        except Exception as e:
-            logging.error(f"Experiment failed: {e}")
-            import traceback
-            traceback.print_exc()
+        A sweep or path sequence started before the tab was rebuilt gets its
+        controls and events back; any running job locks the chip controls.
+        """
+        kind = self.executor.kind
+        if kind == "sweep":
+            self._sweep_experiment = self.executor.experiment
+            self._sweep_base_json = json.dumps(self._sweep_experiment.plan.get("sweep", {}).get("base", {}))
+            self._show_sweep_running()
+            self.executor.pump(self, self._on_sweep_event)
+        elif kind == "path_sequence":
+            self._path_list = self.executor.experiment.plan.get("paths", [])
+            self._show_path_running()
+            self.executor.pump(self, self._on_path_event)
+        self.executor.watch(self, self._lock_chip_controls)
 
 
     def _start_status_updates(self):
-        """Start periodic status updates (non-blocking)"""
-        self._update_system_status()
-        self.after(10000, self._start_status_updates)
-
-    def _update_system_status(self):
-        """Update both status and error displays in a background thread"""
-        def worker():
-            try:
-                # Capture outputs as strings (not updating UI here)
-                error_output = self._capture_output_str(self.qontrol.show_errors)
-                status_output = self._capture_output_str(self.qontrol.show_status)
-                # Schedule UI update in main thread
-                self.after(0, lambda: self._update_status_displays(error_output, status_output))
-            except Exception as e:
-                self.after(0, lambda: self._show_error(f"Status update failed: {str(e)}"))
-
-        threading.Thread(target=worker, daemon=True).start()
+        """Refresh the status/error displays from the Qontrol telemetry snapshot (non-blocking)"""
+        self._last_status_seq = None
+        self._refresh_status_displays()
 
-    def _capture_output_str(self, device_func):
-        """Capture output from device functions as a string (no UI update)"""
-        with io.StringIO() as buffer:
-            with redirect_stdout(buffer):
-                try:
-                    device_func()
-                except Exception as e:
-                    logging.error(f"Error: {str(e)}")
-            return buffer.getvalue()
+    def _refresh_status_displays(self):
+        """Show the latest telemetry snapshot; never touches the serial port"""
+        if not self.winfo_exists():
+            return
+        snapshot = TelemetryService.snapshot("qontrol")
+        seq = snapshot.seq if snapshot is not None else None
+        if seq != self._last_status_seq:
+            self._last_status_seq = seq
+            self._update_status_displays(format_qontrol_errors(snapshot), format_qontrol_status(snapshot))
+        self.after(1000, self._refresh_status_displays)
 
     def _update_status_displays(self, error_output, status_output):
         """Update the error and status displays in the main thread"""
@@ -1232,7 +1265,7 @@ class Window1Content(ctk.CTkFrame):
 
         try:
             channels = self.daq.list_ai_channels()  # e.g. ['ai0','ai1','ai2','ai3','ai4','ai5','ai6','ai7']
-            readings = self.daq.read_power(channels=channels, samples_per_channel=10, unit=self.selected_unit)
+            readings = self.daq.read_power(channels=channels, samples_per_channel=10, unit=self.selected_unit, fresh=False)
             
             # Time axis
             current_time = time.time() - self.start_time
@@ -1287,6 +1320,9 @@ class Window1Content(ctk.CTkFrame):
     def _start_live_graph(self):
         """Start live graph updates."""
         if not self.is_live_updating:
+            if self.daq:
+                # The graph reads from the shared continuous stream
+                self.daq.start_stream(self.daq.list_ai_channels())
             self.is_live_updating = True
             self.start_time = time.time()
             self.time_data = []
@@ -1350,20 +1386,18 @@ class Window1Content(ctk.CTkFrame):
             self.samples_entry.delete(0, "end")
             self.samples_entry.insert(0, str(num_samples))
 
-        readings = self.daq.read_power(channels=channels, samples_per_channel=num_samples, unit=self.selected_unit)
+        readings = self.daq.read_power(channels=channels, samples_per_channel=num_samples, unit=self.selected_unit,
+                                       return_std=True)
         if readings is None:
             lines.append("Failed to read from DAQ or DAQ not connected.")
             self._daq_last_result = "\n".join(lines)
             return
-
-        # Normalize to list for consistent processing
-        if isinstance(readings, float):
-            readings = [readings]  # wrap float in list if only one channel
+        means, stds = readings
 
         # Build text output
         lines = []
-        for ch_name, voltage in zip(channels, readings):
-            lines.append(f"{ch_name} -> {voltage} {self.selected_unit}")
+        for ch_name, power, std in zip(channels, means.tolist(), stds.tolist()):
+            lines.append(f"{ch_name} -> {power} ± {std:.3g} {self.selected_unit}")
 
         # Save this part to combine with Thorlabs 
         self._daq_last_result = "\n".join(lines)    
@@ -1535,7 +1569,7 @@ class Window1Content(ctk.CTkFrame):
 
             # Store the phase grid config for later use
             if hasattr(self, 'phase_grid_config'):
-                config_to_apply = json.dumps(self.phase_grid_config)
+                config_to_apply = self.phase_grid_config  # MeshConfig or grid dict
             else:
                 config_to_apply = config
 
@@ -2638,33 +2672,6 @@ class Window1Content(ctk.CTkFrame):
         self._current_measure_image = ctk_image
 
 
-    def _export_results_to_csv(self, results, headers):
-        """Export step data with custom headers (includes DAQ + Thorlabs)."""
-        if not results:
-            logging.info("No results to save.")
-            return
-
-        path = filedialog.asksaveasfilename(
-            title='Save AMF Results',
-            defaultextension='.csv',
-            filetypes=[('CSV files', '*.csv')]
-        )
-        if not path:
-            return
-
-        try:
-            with open(path, 'w', encoding='utf-8') as f:
-                # Write header
-                f.write(",".join(headers) + "\n")
-                # Write rows
-                for row in results:
-                    line_str = ",".join(str(x) for x in row)
-                    f.write(line_str + "\n")
-
-            logging.info(f"Results saved to {path}")
-        except Exception as e:
-            logging.error(f"Failed to save results: {e}")
-
     def _on_sweep_file_changed(self, selected_file):
         """Handler to reload sweep file for interpolation"""
         try:
@@ -2822,75 +2829,38 @@ class Window1Content(ctk.CTkFrame):
         Processes all theta and phi values in the current grid configuration.
         """
         try:
-            total_start = time.time()
-            t = time.time()
-            # Get current grid configuration
-            grid_config = json.loads(self.custom_grid.export_paths_json())
-            print(f"[TIMER] Loaded grid config in {time.time() - t:.3f}s")
-            if not grid_config:
+            # Get current grid configuration (the grid widget exports JSON)
+            n = int(self.grid_size.split('x')[0])
+            mesh = MeshConfig.from_json(self.custom_grid.export_paths_json(), n=n)
+            if len(mesh) == 0:
                 self._show_error("No grid configuration found")
                 return
 
             # Get label mapping for current grid size
-            t = time.time()
             create_label_mapping, apply_grid_mapping = get_mapping_functions(self.grid_size)
-            label_map = create_label_mapping(int(self.grid_size.split('x')[0]))
-            print(f"[TIMER] Label mapping prepared in {time.time() - t:.3f}s")
-
-            # Create new configuration and tracking lists
-            phase_grid_config = copy.deepcopy(grid_config)
-            applied_channels = []
-            failed_channels = []
+            label_map = create_label_mapping(n)
 
-            # Process each cross in the grid
-            for cross_label, data in grid_config.items():
-                # Skip if not in mapping
-                if cross_label not in label_map:
-                    continue
+            # Solved currents go into a copy
+            phase_mesh = mesh.copy()
+            slots = [slot for slot in np.flatnonzero(mesh.active) if mesh.labels[slot] in label_map]
 
-                # Process theta value
-                theta_val = self.interpolated_theta.get(cross_label) if self.interpolation_enabled else data.get("theta", "0")
-                if theta_val:
-                    try:
-                        theta_float = float(theta_val)
-                        calib_key = f"{cross_label}_theta"
-                        t0 = time.time()
-                        current_theta = self._calculate_current_for_phase_new_json(calib_key, theta_float)
-                        print(f"[TIMER] Calculated current for {calib_key} in {time.time() - t0:.3f}s")
-                        if current_theta is not None:
-                            current_theta = round(current_theta, 5)
-                            phase_grid_config[cross_label]["theta"] = str(current_theta)
-                            applied_channels.append(f"{cross_label}:θ = {current_theta:.5f} mA")
-                        else:
-                            failed_channels.append(f"{cross_label}:θ (no calibration)")
-                    except Exception as e:
-                        failed_channels.append(f"{cross_label}:θ ({str(e)})")
+            # Interpolated thetas replace the grid values; crosses without one are left as is
+            theta = None
+            if self.interpolation_enabled:
+                theta = np.array(
+                    [self.interpolated_theta.get(mesh.labels[slot], np.nan) for slot in slots], dtype=float
+                )
 
-                # Process phi value
-                phi_val = data.get("phi", "0")
-                if phi_val:
-                    try:
-                        phi_float = float(phi_val)
-                        channel = f"{cross_label}_phi"
-                        current_phi = self._calculate_current_for_phase_new_json(channel, phi_float)
-                        
-                        if current_phi is not None:
-                            current_phi = round(current_phi, 5)
-                            phase_grid_config[cross_label]["phi"] = str(current_phi)
-                            applied_channels.append(f"{cross_label}:φ = {current_phi:.5f} mA")
-                        else:
-                            failed_channels.append(f"{cross_label}:φ (no calibration)")
-                    except Exception as e:
-                        failed_channels.append(f"{cross_label}:φ ({str(e)})")
+            # Solve every mapped cross of the mesh in one vectorized call
+            applied_channels, failed_channels = solve_mesh_currents(phase_mesh, slots, theta=theta)
 
             # Store config and update displays
-            self.phase_grid_config = phase_grid_config
+            self.phase_grid_config = phase_mesh
             self._update_phase_results_display(applied_channels, failed_channels)
 
             # Apply configuration to device
             try:
-                config_json = json.dumps(phase_grid_config)
-                apply_grid_mapping(self.qontrol, config_json, self.grid_size)
+                apply_grid_mapping(self.qontrol, phase_mesh, self.grid_size)
                 self._capture_output(self.qontrol.show_status, self.status_display)
             except Exception as e:
                 self._show_error(f"Device update failed: {str(e)}")
@@ -2901,80 +2871,6 @@ class Window1Content(ctk.CTkFrame):
             return None
 
 
-    def _solve_current_with_brentq(self, P_mW, c_res, alpha_res):
-        def equation(I):
-            return I**2 * (1 + alpha_res * I**2) - (P_mW / c_res)
-        try:
-            # Choose safe bounds based on expected current range (e.g., 0.0001 to 10 mA)
-            return brentq(equation, a=1e-5, b=1.65, maxiter=100)
-        except ValueError as e:
-            logging.error(f"brentq failed to find a root: {e}")
-            return None
-
-    def _calculate_current_for_phase_new_json(self, calib_key, phase_value):
-        """
-        Calculate current for a phase value using the new calibration format.
-        Args:
-            calib_key: str, calibration key (e.g. "A1_theta")
-            phase_value: float, phase value in π units
-        Returns:
-            float: Current in mA or None if calculation fails
-        """
-        # Manually exclude known bad keys
-        SKIP_KEYS = {
-            "A1_phi", "A2_phi", "A3_phi", "A4_phi", "A5_phi", "A6_phi",
-            "B1_phi", "B2_phi", "B3_phi", "B4_phi", "B5_phi"
-        }
-        if calib_key in SKIP_KEYS:
-            logging.debug(f"Skipping calculation for excluded key: {calib_key}")
-            return None
-
-        t0 = time.time()
-        res_cal = AppData.resistance_calibration_data.get(calib_key)
-        phase_cal = AppData.phase_calibration_data.get(calib_key)
-
-        if res_cal is None or phase_cal is None:
-            logging.error(f"Missing calibration for {calib_key}")
-            return None
-
-        res_params = res_cal.get("resistance_params")
-        phase_params = phase_cal.get("phase_params")
-        if res_params is None or phase_params is None:
-            logging.error(f"Missing calibration params for {calib_key}")
-            return None
-
-        print(f"[TIMER] Loaded calibration data for {calib_key} in {time.time() - t0:.3f}s")
-
-        try:
-            c_res = res_params.get('c_res')
-            a_res = res_params.get('a_res')
-            alpha_res = res_params.get('alpha_res')
-            A = phase_params.get('amplitude')
-            b = phase_params.get('omega')
-            c = phase_params.get('phase')
-            d = phase_params.get('offset')
-            if None in (c_res, a_res, alpha_res, A, b, c, d):
-                logging.error(f"Missing parameter value for {calib_key}")
-                return None
-        except Exception as e:
-            logging.error(f"Failed to extract parameters for {calib_key}: {e}")
-            return None
-
-        if phase_value < c:
-            phase_value = phase_value + 2
-
-        P_mW = abs((phase_value - c) * np.pi / b)  # Power in mW
-
-        t0 = time.time()
-        current = self._solve_current_with_brentq(P_mW, c_res, alpha_res)
-        print(f"[TIMER] Solved equation for {calib_key} in {time.time() - t0:.3f}s")
-
-        if current:
-            return current
-        else:
-            logging.error(f"No positive solution for {calib_key}, fallback to linear model")
-            return None
-
     def _update_phase_results_display(self, applied_channels, failed_channels):
         """Helper to update the mapping display with phase application results"""
         self.mapping_display.configure(state="normal")
@@ -3150,21 +3046,16 @@ class Window1Content(ctk.CTkFrame):
         create_map, apply_map = get_mapping_functions(self.grid_size)
         raw_cfg = json.loads(self.custom_grid.export_paths_json())
 
-        calibrate_cfg = {}
-        for cross_label, data in raw_cfg.items():
-            arms     = data["arms"]
-            theta_pi = float(data.get("theta", "0"))
-            phi_pi   = float(data.get("phi",   "0"))
-
-            t_key = f"{cross_label}_theta"
-            p_key = f"{cross_label}_phi"
+        labels = list(raw_cfg.keys())
+        keys = [f"{label}_{kind}" for label in labels for kind in ("theta", "phi")]
+        phases = [float(raw_cfg[label].get(kind, "0")) for label in labels for kind in ("theta", "phi")]
+        currents = np.nan_to_num(solve_phase_currents(keys, phases), nan=0.0).reshape(-1, 2)
 
-            I_theta = self._calculate_current_for_phase_new_json(t_key, theta_pi) or 0.0
-            I_phi   = self._calculate_current_for_phase_new_json(p_key,   phi_pi) or 0.0
-
-            calibrate_cfg[cross_label] = {"arms": arms,
-                                        "theta": str(round(I_theta, 5)),
-                                        "phi":   str(round(I_phi,   5))}
+        calibrate_cfg = {}
+        for label, (I_theta, I_phi) in zip(labels, currents):
+            calibrate_cfg[label] = {"arms": raw_cfg[label]["arms"],
+                                    "theta": str(round(float(I_theta), 5)),
+                                    "phi":   str(round(float(I_phi),   5))}
 
         apply_map(self.qontrol, json.dumps(calibrate_cfg), self.grid_size)
 
@@ -8,7 +8,8 @@ from contextlib import redirect_stdout
 from app.devices.qontrol_device import QontrolDevice
 
 class Window2Content(ctk.CTkFrame):
-    def __init__(self, master, channel=0, fit="Linear", IOconfig="Config1", app=None, qontrol=None, **kwargs):
+    def __init__(self, master, channel=0, fit="Linear", IOconfig="Config1", app=None, qontrol=None, executor=None,
+                 **kwargs):
         super().__init__(master, **kwargs)
         
         # Validate and store device reference
@@ -64,6 +65,11 @@ class Window2Content(ctk.CTkFrame):
         self.after_id = None
         self._setup_input_monitoring()
 
+        # No manual writes while an experiment (started from any tab) drives the chip
+        if executor is not None:
+            executor.watch(self, lambda running: self.set_button.configure(
+                state="disabled" if running else "normal"))
+
     def _setup_input_monitoring(self):
         """Configure input tracking with debounced checks"""
         self.channel_var = tk.StringVar()
@@ -4,7 +4,6 @@ from app.imports import *
 import tkinter.filedialog as filedialog
 import copy
 import sympy as sp
-from scipy.optimize import brentq
 from app.utils.qontrol.qmapper8x8 import create_label_mapping, apply_grid_mapping
 from app.utils.qontrol.mapping_utils import get_mapping_functions
 from app.utils.appdata import AppData
@@ -13,13 +12,19 @@ from app.utils.decomposition import (
     decomposition, 
     decompose_clements,
     clements_to_chip,
-    get_json_interferometer,
-    get_json_pnn
+    get_mesh_interferometer,
+    get_mesh_pnn
 )
+from app.utils.mesh_config import MeshConfig
+from app.utils.calibrate.phase_solver import solve_mesh_currents
+from app.devices.hardware import Instruments
+from app.experiments import ExperimentPlan, JobExecutor, UnitaryCycle
+from app.experiments.unitaries import interpolate_special_nodes
 
 class Window3Content(ctk.CTkFrame):
     
-    def __init__(self, master, app, qontrol, thorlabs, daq, switch, switch_input, switch_output, grid_size = "12x12", **kwargs):
+    def __init__(self, master, app, qontrol, thorlabs, daq, switch, switch_input, switch_output, grid_size = "12x12",
+                 executor=None, **kwargs):
         super().__init__(master, **kwargs)
         self.app = app
         self.qontrol = qontrol
@@ -28,6 +33,8 @@ class Window3Content(ctk.CTkFrame):
         self.switch = switch #Backward compatibility (output switch)
         self.switch_input = switch_input
         self.switch_output = switch_output
+        # Runs the cycling off the Tk thread; shared with the other tabs (MainWindow)
+        self.executor = executor if executor is not None else JobExecutor()
         
         # NxN dimension
         self.n = int(grid_size.split('x')[0])
@@ -87,6 +94,20 @@ class Window3Content(ctk.CTkFrame):
             command=self.cycle_unitaries, width=140, height=32
         )
         self.cycle_unitaries_button.grid(row=1, column=0, padx=10, pady=4, sticky="w")
+
+        # pause / cancel of a running cycle
+        run_control_frame = ctk.CTkFrame(self.cycle_frame, fg_color="transparent")
+        run_control_frame.grid(row=1, column=1, padx=10, pady=4, sticky="w")
+        self.pause_button = ctk.CTkButton(
+            run_control_frame, text="Pause", command=self._toggle_pause,
+            width=70, height=32, state="disabled"
+        )
+        self.pause_button.pack(side="left", padx=(0, 4))
+        self.cancel_button = ctk.CTkButton(
+            run_control_frame, text="Cancel", command=self._cancel_cycle,
+            width=70, height=32, state="disabled"
+        )
+        self.cancel_button.pack(side="left")
         
         # Interpolation toggle 
         self.interpolation_var = ctk.BooleanVar(value=getattr(AppData, "interpolation_enabled", False))
@@ -315,6 +336,8 @@ class Window3Content(ctk.CTkFrame):
         # 从 AppData 中加载记忆的内容
         if getattr(AppData, "unitary_textbox_content", None):
             self.unitary_textbox.insert("1.0", AppData.unitary_textbox_content)
+
+        self._attach_running_job()
     
     # def _on_interpolation_toggle(self):
     #     AppData.interpolation_enabled = self.interpolation_var.get()
@@ -353,24 +376,14 @@ class Window3Content(ctk.CTkFrame):
                 # 如果已经插值过，直接返回
                 return
 
-            # 只对6个special nodes做插值
-            special_nodes = ["E1", "F1", "G1", "H1", "E2", "G2"]
-            from tests.interpolation.data import Reader_interpolation as reader
-            interpolated = {}
-            # 读取当前 AppData.default_json_grid
-            json_grid = AppData.default_json_grid
-            for node in special_nodes:
-                try:
-                    # 读取原始theta
-                    theta_val = float(json_grid[node]['theta'])
-                    reader.load_sweep_file(f"{node}_theta_200_steps.csv")
-                    interpolated_theta = reader.theta_trans(theta_val * np.pi, reader.theta, reader.theta_corrected) / np.pi
-                    interpolated[node] = interpolated_theta
-                    # 直接修改 AppData.default_json_grid 里的 theta
-                    json_grid[node]['theta'] = str(interpolated_theta)
-                except Exception as e:
-                    logging.error(f"Interpolation failed for {node}: {e}")
-            AppData.interpolated_theta = interpolated
+            # 读取当前 AppData.default_mesh_config
+            mesh = self._current_mesh_config()
+            if mesh is None:
+                return
+            # 只对6个special nodes做插值，直接修改 mesh 里的 theta
+            for node, e in self._interpolate_special_nodes(mesh):
+                logging.error(f"Interpolation failed for {node}: {e}")
+            self._set_default_mesh(mesh)
         else:
             # 如果禁用 Interpolation，重新基于 unitary_textbox 的矩阵分解更新 JSON
             try:
@@ -386,14 +399,14 @@ class Window3Content(ctk.CTkFrame):
                     #A_phi += np.pi
                     A_phi = A_phi % (2 * np.pi)
                     A_phi /= np.pi
-                    json_output = get_json_pnn(self.n, A_theta, A_phi)
+                    mesh = get_mesh_pnn(self.n, A_theta, A_phi)
                 elif package == "interferometer":
                     I = decomposition(matrix_u, global_phase=self.global_phase_var.get())
                     bs_list = I.BS_list
                     clements_to_chip(bs_list)
-                    json_output = get_json_interferometer(self.n, bs_list)
-                # 更新 AppData.default_json_grid
-                AppData.default_json_grid = json_output
+                    mesh = get_mesh_interferometer(self.n, bs_list)
+                # 更新 AppData.default_mesh_config
+                self._set_default_mesh(mesh)
             except Exception as e:
                 logging.error(f"Failed to reset JSON grid after disabling interpolation: {e}")
             AppData.interpolated_theta = {}
@@ -487,374 +500,202 @@ class Window3Content(ctk.CTkFrame):
     ### cycle funtion
     def cycle_unitaries(self):
         """
-        1) Ask for a folder with step_*.npy files.
-        2) For each file:
+        1) Ask for a folder with step_*.npy files and for the results CSV.
+        2) Run the UnitaryCycle experiment on a worker thread: for each file
             – decompose → apply phases
-            – wait/measure for <dwell> ms
+            – wait <dwell> ms
             – record power from the selected measurement source
-        3) Save a CSV with measurements from either switch channels or devices directly
+        3) Rows are written to the CSV as they are measured; the chip is reset at the end.
+
+        The window stays responsive: progress, measurements and log lines come
+        back through the JobExecutor and are shown by _on_cycle_event.
         """
+        if self.executor.running:
+            self.update_status(f"⚠️ A {self.executor.kind} experiment is already running", "warning")
+            return
         try:
-            # Clear previous status and reset progress
             self.clear_status()
             self.progress_label.configure(text="Progress: [░░░░░░░░░░] 0/0 (0%)")  # Reset progress
             self.measurement_label.configure(text="Latest Measurements: Starting...")
-            
-            # Change button to show it's running
-            self.cycle_unitaries_button.configure(text="Running...", state="disabled")
-            self.update()
-            
-            # Log start
+
             self.update_status("🚀 Starting Unitary Cycling Experiment", "header")
             self.update_status(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", "info")
-            
+
             # ───────────────────────────────────────────────────────
             # 0.  Read user-selected parameters
             # ───────────────────────────────────────────────────────
             dwell_ms = float(self.dwell_entry.get())
-            dwell_s  = dwell_ms / 1000.0
-            sample_rate = 1_000
-            samples_per_channel = int(dwell_s*sample_rate)
-
             use_source = self.measurement_source.get()
             use_global_phase = self.global_phase_var.get()
             use_switch = self.measure_switch_var.get() == "Yes"
-            
-            # Log configuration
+            package = self.decomposition_package_var.get()
+
             self.update_status(f"\n⚙️ Configuration:", "header")
             self.update_status(f"  • Dwell time: {dwell_ms} ms", "info")
             self.update_status(f"  • Measurement source: {use_source}", "info")
             self.update_status(f"  • Global phase: {'Enabled' if use_global_phase else 'Disabled'}", "info")
             self.update_status(f"  • Using switch: {'Yes' if use_switch else 'No'}", "info")
 
-            # Get switch channels if using switch
-            switch_channels = []
-            measurement_labels = []  # For display
-            
+            measurement = {"source": "daq" if use_source == "DAQ" else "thorlabs", "unit": "mW"}
             if use_switch:
-                if not self.switch:
-                    raise ValueError("Switch device not available but 'Measure using switch' is selected")
-                
-                channel_string = self.switch_channels_entry.get()
-                switch_channels = SwitchMeasurements.parse_switch_channels(channel_string)
-                
+                switch_channels = SwitchMeasurements.parse_switch_channels(self.switch_channels_entry.get())
                 if not switch_channels:
                     raise ValueError("No valid switch channels specified")
-                    
                 self.update_status(f"  • Switch channels: {switch_channels}", "info")
-                measurement_labels = [f"Ch{ch}" for ch in switch_channels]
-
-            # Prepare headers based on measurement configuration
-            headers = ["timestamp", "step"]
-            
-            if use_switch:
-                headers.extend(SwitchMeasurements.create_headers_with_switch(switch_channels, "mW"))
-                num_measurements = len(switch_channels)
-            else:
-                # Headers for direct device measurements
-                if use_source == "DAQ":
-                    if self.daq:
-                        daq_channels = self.daq.list_ai_channels()
-                        headers.extend([f"{ch}_mW" for ch in daq_channels])
-                        num_measurements = len(daq_channels)
-                        measurement_labels = daq_channels
-                    else:
-                        self.update_status("❌ No DAQ device available", "error")
-                        return
-                else:  # Thorlabs
-                    if self.thorlabs:
-                        if isinstance(self.thorlabs, list):
-                            num_devices = len(self.thorlabs)
-                        else:
-                            num_devices = 1
-                        headers.extend(SwitchMeasurements.create_headers_thorlabs(num_devices, "mW"))
-                        num_measurements = num_devices
-                        measurement_labels = [f"Thorlabs{i}" for i in range(num_devices)]
-                    else:
-                        self.update_status("❌ No Thorlabs device available", "error")
-                        return
+                measurement = {"source": "switch", "switch_channels": switch_channels, "unit": "mW"}
 
             # ───────────────────────────────────────────────────────
-            # 1.  Location for the .npy step files
+            # 1.  Step files and results location
             # ───────────────────────────────────────────────────────
             self.update_status("\n📁 Select folder with unitary files...", "info")
-            folder_path = filedialog.askdirectory(
-                title="Select Folder Containing Unitary Step Files"
-            )
+            folder_path = filedialog.askdirectory(title="Select Folder Containing Unitary Step Files")
             if not folder_path:
                 self.update_status("❌ No folder selected. Aborting.", "error")
-                self.cycle_unitaries_button.configure(text="Cycle Unitaries", state="normal")
+                return
+            output_path = self._ask_results_path()
+            if not output_path:
+                self.update_status("❌ No results file selected. Aborting.", "error")
                 return
 
-            # Use regex to extract numeric suffix from filenames
-            npy_files = sorted(
-                [f for f in os.listdir(folder_path) if f.endswith(".npy") and re.search(r"_(\d+)\.npy$", f)],
-                key=lambda x: int(re.search(r"_(\d+)\.npy$", x).group(1))
-            )
+            plan = ExperimentPlan({
+                "experiment": "cycle_unitaries",
+                "grid_size": self.grid_size,
+                "unitaries": {"folder": folder_path, "decomposition": package, "global_phase": use_global_phase},
+                "dwell_ms": dwell_ms,
+                "measurement": measurement,
+                "output": output_path.replace("{", "{{").replace("}", "}}"),
+            })
+            experiment = UnitaryCycle(plan, self._instruments())
+        except Exception as e:
+            self.update_status(f"\n❌ Experiment failed: {e}", "error")
+            return
 
-            if not npy_files:
-                self.update_status("❌ No unitary step files found in selected folder.", "error")
-                self.cycle_unitaries_button.configure(text="Cycle Unitaries", state="normal")
-                return
+        # ───────────────────────────────────────────────────────
+        # 2.  Run off the Tk thread
+        # ───────────────────────────────────────────────────────
+        self.executor.start(experiment)
+        self._show_cycle_running()
+        self.executor.pump(self, self._on_cycle_event)
 
-            self.update_status(f"✅ Found {len(npy_files)} unitary files", "success")
-            
-            results = []
-            total_steps = len(npy_files)
+    def _show_cycle_running(self):
+        self.cycle_unitaries_button.configure(text="Running...", state="disabled")
+        self.pause_button.configure(text="Resume" if self.executor.paused else "Pause", state="normal")
+        self.cancel_button.configure(state="normal")
 
-            # ───────────────────────────────────────────────────────
-            # 2.  Iterate through every step_*.npy
-            # ───────────────────────────────────────────────────────
-            self.update_status(f"\n🔄 Processing {total_steps} steps...", "header")
-            
-            for step_idx, npy_file in enumerate(npy_files, start=1):
-                file_path = os.path.join(folder_path, npy_file)
-
-                # Current step status
-                self.update_status(f"\n📍 Step {step_idx}/{total_steps}: {npy_file}", "info")
-
-                # Update button to show progress
-                self.cycle_unitaries_button.configure(text=f"Step {step_idx}/{total_steps}")
-                self.update()
-
-                try:
-                    self.update_status("  • Loading and decomposing unitary...", "info")
-                    U_step = np.load(file_path)
-                    
-                    # Embed U_step into a unitary matrix if it's smaller than the mesh size
-                    if U_step.shape[0] < self.n or U_step.shape[1] < self.n:
-                        embedded_U = np.eye(self.n, dtype=complex)
-                        rows, cols = U_step.shape
-                        embedded_U[:rows, :cols] = U_step
-                        U_step = embedded_U
-
-                    # 根据 Package 选项选择分解方法
-                    package = self.decomposition_package_var.get()
-                    if package == "pnn":
-                        #from pnn.methods import decompose_clements
-                        [A_phi, A_theta, *_] = decompose_clements(U_step, block='mzi')
-                        A_theta *= 2 / np.pi
-                        #A_phi += np.pi
-                        A_phi = A_phi % (2 * np.pi)
-                        A_phi /= np.pi
-                        json_output = get_json_pnn(self.n, A_theta, A_phi)
-                    elif package == "interferometer":
-                        I = decomposition(U_step, global_phase=use_global_phase)
-                        bs_list = I.BS_list
-                        clements_to_chip(bs_list)
-                        json_output = get_json_interferometer(self.n, bs_list)
-                    else:
-                        raise ValueError(f"Unknown package: {package}")
-
-                    # 更新 AppData.default_json_grid
-                    setattr(AppData, 'default_json_grid', json_output)
-                    self.update_status("  ✓ Decomposition complete", "success")
-
-                    # 如果 Interpolation 已启用，执行插值
-                    if AppData.interpolation_enabled:
-                        self.update_status("  • Performing interpolation...", "info")
-                        special_nodes = ["E1", "F1", "G1", "H1", "E2", "G2"]
-                        from tests.interpolation.data import Reader_interpolation as reader
-                        interpolated = {}
-                        for node in special_nodes:
-                            try:
-                                theta_val = float(json_output[node]['theta'])
-                                reader.load_sweep_file(f"{node}_theta_200_steps.csv")
-                                interpolated_theta = reader.theta_trans(theta_val * np.pi, reader.theta, reader.theta_corrected) / np.pi
-                                interpolated[node] = interpolated_theta
-                                json_output[node]['theta'] = str(interpolated_theta)
-                            except Exception as e:
-                                self.update_status(f"  ✖ Interpolation failed for {node}: {e}", "error")
-                        AppData.interpolated_theta = interpolated
-                        self.update_status("  ✓ Interpolation complete", "success")
-
-                except Exception as e:
-                    self.update_status(f"  ✖ Decomposition failed: {e}", "error")
-                    continue             
-
-                # b) push phases to the chip
-                self.update_status("  • Applying phases to chip...", "info")
-                self.apply_phase_new()
-                self.update_status("  ✓ Phases applied", "success")
-                self.update()
-
-                # Dwell time with status
-                self.update_status(f"  • Waiting {dwell_ms} ms...", "info")
-                num_updates = max(1, int(dwell_s * 10))
-                sleep_per_update = dwell_s / num_updates
-                for i in range(num_updates):
-                    time.sleep(sleep_per_update)
-                    self.update()
-
-                # c) measure power
-                self.update_status("  • Measuring power...", "info")
-
-                if use_switch:
-                    thorlabs_device = self.thorlabs[0] if isinstance(self.thorlabs, list) else self.thorlabs
-                    measurement_values = SwitchMeasurements.measure_with_switch(
-                        self.switch, thorlabs_device, switch_channels, "mW"
-                    )
-                else:
-                    if use_source == "DAQ":
-                        if self.daq:
-                            daq_channels = self.daq.list_ai_channels()
-                            try:
-                                readings = self.daq.read_power(
-                                    channels=daq_channels,
-                                    samples_per_channel=samples_per_channel,
-                                    sample_rate=sample_rate,
-                                    unit="mW",
-                                )
-                                if readings and isinstance(readings[0], list):
-                                    measurement_values = [sum(s)/len(s) for s in readings]
-                                else:
-                                    measurement_values = readings if readings else []
-                            except Exception as e:
-                                self.update_status(f"  ✖ DAQ read error: {e}", "error")
-                                measurement_values = [0.0] * num_measurements
-                            finally:
-                                try:
-                                    self.daq.clear_task()
-                                except:
-                                    pass
-                        else:
-                            measurement_values = [0.0] * num_measurements
-                    else:  # Thorlabs
-                        measurement_values = SwitchMeasurements.measure_thorlabs_direct(
-                            self.thorlabs, "mW"
-                        )
-
-                # Update measurement display (for the live view)
-                self.update_measurements(measurement_values, measurement_labels)
-                self.update_status("  ✓ Measurement complete", "success")
-
-                # Add measurements to the status log
-                if measurement_values and measurement_labels:
-                    # Format measurements inline
-                    formatted_measurements = []
-                    for label, value in zip(measurement_labels, measurement_values):
-                        formatted_measurements.append(f"{label}: {value:.3f} µW")
-                    
-                    # Display measurements in the log
-                    if len(formatted_measurements) <= 4:
-                        # Single line for up to 4 measurements
-                        self.update_status(f"  📊 {' | '.join(formatted_measurements)}", "info")
-                    else:
-                        # Multiple lines for more measurements
-                        self.update_status("  📊 Measurements:", "info")
-                        for i in range(0, len(formatted_measurements), 4):
-                            line_items = formatted_measurements[i:i+4]
-                            self.update_status(f"     {' | '.join(line_items)}", "info")
-
-                # d) collect results
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                row = [timestamp, step_idx] + measurement_values
-                results.append(row)
-
-                # e) update progress bar
-                self.update_progress(step_idx, total_steps)
-                self.update()
+    def _attach_running_job(self):
+        """Follow the shared executor when the tab is (re)built during a run.
 
-            # ───────────────────────────────────────────────────────
-            # 3.  Save CSV & reset chip
-            # ───────────────────────────────────────────────────────
-            if results:
-                self.update_status("\n💾 Saving results...", "header")
-                saved_path = self._export_results_to_csv(results, headers)
-                if saved_path: 
-                    self.update_status("✅ Results saved successfully!", "success")
-                    self.update_status(f"📁 Saved to: {saved_path}", "info")
-                else:
-                    self.update_status("\n⚠️ Results were not saved.", "warning")
-                self.update_status("\n🔄 Resetting chip to zero...", "info")
-                zero_cfg = self._create_zero_config()
-                apply_grid_mapping(self.qontrol, zero_cfg, self.grid_size)
-                self.update_status("✅ Chip reset complete", "success")
-                
-                self.update_status(f"\n🎉 Experiment complete! Processed {len(results)} steps.", "success")
+        A cycle started before the tab was rebuilt gets its controls and
+        events back; any other experiment locks the Cycle button until it ends.
+        """
+        if self.executor.kind == "cycle_unitaries":
+            self._show_cycle_running()
+            self.executor.pump(self, self._on_cycle_event)
+        elif self.executor.running:
+            self.executor.watch(self, lambda running: self.cycle_unitaries_button.configure(
+                state="disabled" if running else "normal"))
+
+    def _instruments(self):
+        """The devices of this tab, as the experiment runners expect them."""
+        thorlabs = self.thorlabs if isinstance(self.thorlabs, list) else [self.thorlabs] if self.thorlabs else []
+        return Instruments(self.qontrol, thorlabs, self.daq, self.switch_input, self.switch_output or self.switch)
+
+    def _toggle_pause(self):
+        if self.executor.paused:
+            self.executor.resume()
+            self.pause_button.configure(text="Pause")
+            self.update_status("▶️ Resumed", "info")
+        else:
+            self.executor.pause()
+            self.pause_button.configure(text="Resume")
+            self.update_status("⏸️ Pausing after the current step...", "warning")
+
+    def _cancel_cycle(self):
+        self.executor.cancel()
+        self.update_status("⏹️ Cancelling...", "warning")
+
+    def _on_cycle_event(self, kind, data):
+        """Show an executor event (runs on the Tk thread)."""
+        if kind == "log":
+            tag = {"warning": "warning", "error": "error"}.get(data["level"], "info")
+            self.update_status(f"  • {data['message']}", tag)
+        elif kind == "progress":
+            self.update_progress(data["step"], data["total"])
+            self.cycle_unitaries_button.configure(text=f"Step {data['step']}/{data['total']}")
+        elif kind == "measurement":
+            self.update_measurements(data["values"], data["labels"])
+        else:
+            if kind == "done":
+                self.update_status("✅ Results saved successfully!", "success")
+                self.update_status(f"📁 Saved to: {data['result']}", "info")
+                self.update_status("\n🎉 Experiment complete!", "success")
+            elif kind == "cancelled":
+                self.update_status("\n⚠️ Experiment cancelled; the steps measured so far are saved.", "warning")
             else:
-                self.update_status("\n⚠️ No results collected.", "warning")
-
-        except Exception as e:
-            self.update_status(f"\n❌ Experiment failed: {e}", "error")
-            import traceback
-            self.update_status(traceback.format_exc(), "error")
-        finally:
-            # Always restore button state
+                self.update_status(f"\n❌ Experiment failed: {data['error']}", "error")
+                self.update_status(data["traceback"], "error")
             self.cycle_unitaries_button.configure(text="Cycle Unitaries", state="normal")
+            self.pause_button.configure(text="Pause", state="disabled")
+            self.cancel_button.configure(state="disabled")
             self.update_status(f"\nFinished at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", "info")
 
-    # ──────────────────────────────────────────────────────────────
-    # helper: save the results table to a CSV file
-    # ──────────────────────────────────────────────────────────────
-    def _export_results_to_csv(self, rows: list[list], headers: list[str]) -> None:
+    def _interpolate_special_nodes(self, mesh):
         """
-        Ask the user where to save a CSV and write `headers` + `rows` to it.
-
-        Parameters
-        ----------
-        rows    : list of list
-            Each inner list is a row already in the desired order.
-        headers : list of str
-            Column names for the first row of the CSV.
+        Replace theta of the 6 special nodes by its interpolated value (in place).
+
+        Stores the interpolated values in AppData.interpolated_theta and returns
+        a list of (node, error) for the nodes that failed.
         """
-        if not rows:
-            logging.debug("Nothing to export – no rows provided.")
-            return None
+        interpolated, failed = interpolate_special_nodes(mesh)
+        AppData.interpolated_theta = interpolated
+        return failed
+
+    def _current_mesh_config(self):
+        """AppData.default_mesh_config, or the JSON grid imported into a MeshConfig."""
+        if AppData.default_mesh_config is not None:
+            return AppData.default_mesh_config
+        if AppData.default_json_grid:
+            return MeshConfig.from_json(AppData.default_json_grid, n=self.n)
+        return None
+
+    def _set_default_mesh(self, mesh):
+        """Store a mesh as the current configuration and export it for the grid view."""
+        AppData.default_mesh_config = mesh
+        AppData.default_json_grid = mesh.to_json()
 
+    # ──────────────────────────────────────────────────────────────
+    # helper: ask where the results CSV goes
+    # ──────────────────────────────────────────────────────────────
+    def _ask_results_path(self):
+        """Ask the user where to save the results CSV; None if cancelled."""
         # default file name: cycle_results_YYYYmmdd_HHMMSS.csv
         default_name = f"cycle_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-
         path = filedialog.asksaveasfilename(
             title="Save Results CSV",
             defaultextension=".csv",
             initialfile=default_name,
             filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
         )
-        if not path:        # user pressed Cancel
-            logging.debug("Export cancelled.")
-            return None
-
-        try:
-            import csv
-            with open(path, "w", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(headers)
-                writer.writerows(rows)
-            logging.info(f"Results successfully saved to: {path}")
-            return path
-        except Exception as e:
-            logging.error(f"Failed to write CSV: {e}")
-            return None
+        return path or None
 
     def _create_zero_config(self):
         """Create a configuration with all theta and phi values set to zero"""
-        n = int(self.grid_size.split('x')[0])
-        zero_config = {}
-        
-        # Generate all possible crosspoint labels (A1, A2, B1, etc.)
-        for row in range(n):
-            row_letter = chr(65 + row)  # A, B, C, etc.
-            for col in range(1, n+1):
-                cross_label = f"{row_letter}{col}"
-                zero_config[cross_label] = {
-                    "arms": ["TL", "TR", "BL", "BR"],  # Include all arms
-                    "theta": "0",
-                    "phi": "0"
-                }
-        
-        return json.dumps(zero_config)
+        mesh = MeshConfig.for_grid(self.n)
+        mesh.active[:] = True
+        return mesh
 
     def apply_phase_new(self):
         """
         Apply phase settings to the entire grid based on phase calibration data from AppData.
-        Processes all theta and phi values in the current grid configuration.
+        Processes all theta and phi values in the current mesh configuration.
+
+        Returns:
+            MeshConfig with the solved currents, or None on failure
         """
         try:
-            # Get current grid configuration
-            grid_config = AppData.default_json_grid
-            #logging.info(f"Current grid configuration: {grid_config}")
-            if not grid_config:
+            # Get current mesh configuration
+            mesh = self._current_mesh_config()
+            if mesh is None or len(mesh) == 0:
                 logging.warning("No grid configuration found")
                 return
                 
@@ -862,55 +703,15 @@ class Window3Content(ctk.CTkFrame):
             create_label_mapping, apply_grid_mapping = get_mapping_functions(self.grid_size)
             label_map = create_label_mapping(int(self.grid_size.split('x')[0]))
             
-            # Create a new configuration with current values
-            phase_grid_config = copy.deepcopy(grid_config)
-            
-            # Track successful and failed applications
-            applied_channels = []
-            failed_channels = []
+            # Solved currents go into a copy so the phases stay untouched
+            phase_mesh = mesh.copy()
             
-            # Process each cross in the grid
-            for cross_label, data in grid_config.items():
-                # Skip if this cross isn't in our mapping
-                if cross_label not in label_map:
-                    continue
-                    
-                # Process theta value
-                theta_val = data.get("theta", "0")
-                if theta_val:
-                    try:
-                        theta_float = float(theta_val)
-                        calib_key = f"{cross_label}_theta"
-                        current_theta = self._calculate_current_for_phase_new_json(calib_key, theta_float)
-                        
-                        if current_theta is not None:
-                            current_theta = round(current_theta, 5)
-                            phase_grid_config[cross_label]["theta"] = str(current_theta)
-                            applied_channels.append(f"{cross_label}:θ = {current_theta:.5f} mA")
-                        else:
-                            failed_channels.append(f"{cross_label}:θ (no calibration)")
-                    except Exception as e:
-                        failed_channels.append(f"{cross_label}:θ ({str(e)})")
-
-                # Process phi value
-                phi_val = data.get("phi", "0")
-                if phi_val:
-                    try:
-                        phi_float = float(phi_val)
-                        calib_key = f"{cross_label}_phi"
-                        current_phi = self._calculate_current_for_phase_new_json(calib_key, phi_float)
-                        
-                        if current_phi is not None:
-                            current_phi = round(current_phi, 5)
-                            phase_grid_config[cross_label]["phi"] = str(current_phi)
-                            applied_channels.append(f"{cross_label}:φ = {current_phi:.5f} mA")
-                        else:
-                            failed_channels.append(f"{cross_label}:φ (no calibration)")
-                    except Exception as e:
-                        failed_channels.append(f"{cross_label}:φ ({str(e)})")
-            
-            # Store the phase grid config for later use
-            self.phase_grid_config = phase_grid_config
+            # Solve every mapped cross of the mesh in one vectorized call
+            slots = [slot for slot in np.flatnonzero(mesh.active) if mesh.labels[slot] in label_map]
+            applied_channels, failed_channels = solve_mesh_currents(phase_mesh, slots)
+
+            # Store the phase mesh for later use
+            self.phase_grid_config = phase_mesh
             
             # Only show error message if there are failures
             if failed_channels:
@@ -922,12 +723,11 @@ class Window3Content(ctk.CTkFrame):
             #logging.info(f"Grid size: {self.grid_size}")
             
             try:
-                config_json = json.dumps(phase_grid_config)
-                apply_grid_mapping(self.qontrol, config_json, self.grid_size)
+                apply_grid_mapping(self.qontrol, phase_mesh, self.grid_size)
             except Exception as e:
                 logging.error(f"Device update failed: {str(e)}")
 
-            return phase_grid_config
+            return phase_mesh
             
         except Exception as e:
             logging.error(f"Failed to apply phases: {str(e)}")
@@ -935,81 +735,6 @@ class Window3Content(ctk.CTkFrame):
             traceback.print_exc()
             return None
 
-    def _solve_current_with_brentq(self, P_mW, c_res, alpha_res):
-        def equation(I):
-            return I**2 * (1 + alpha_res * I**2) - (P_mW / c_res)
-        try:
-            # Choose safe bounds based on expected current range (e.g., 0.0001 to 10 mA)
-            return brentq(equation, a=1e-5, b=1.65, maxiter=100)
-        except ValueError as e:
-            logging.error(f"brentq failed to find a root: {e}")
-            return None
-
-    def _calculate_current_for_phase_new_json(self, calib_key, phase_value):
-        """
-        Calculate current for a phase value using the new calibration format.
-        Args:
-            calib_key: str, calibration key (e.g. "A1_theta")
-            phase_value: float, phase value in π units
-        Returns:
-            float: Current in mA or None if calculation fails
-        """
-        # Manually exclude known bad keys
-        SKIP_KEYS = {
-            "A1_phi", "A2_phi", "A3_phi", "A4_phi", "A5_phi", "A6_phi",
-            "B1_phi", "B2_phi", "B3_phi", "B4_phi", "B5_phi"
-        }
-        if calib_key in SKIP_KEYS:
-            logging.debug(f"Skipping calculation for excluded key: {calib_key}")
-            return None
-
-        t0 = time.time()
-        res_cal = AppData.resistance_calibration_data.get(calib_key)
-        phase_cal = AppData.phase_calibration_data.get(calib_key)
-
-        if res_cal is None or phase_cal is None:
-            logging.error(f"Missing calibration for {calib_key}")
-            return None
-
-        res_params = res_cal.get("resistance_params")
-        phase_params = phase_cal.get("phase_params")
-        if res_params is None or phase_params is None:
-            logging.error(f"Missing calibration params for {calib_key}")
-            return None
-
-        print(f"[TIMER] Loaded calibration data for {calib_key} in {time.time() - t0:.3f}s")
-
-        try:
-            c_res = res_params.get('c_res')
-            a_res = res_params.get('a_res')
-            alpha_res = res_params.get('alpha_res')
-            A = phase_params.get('amplitude')
-            b = phase_params.get('omega')
-            c = phase_params.get('phase')
-            d = phase_params.get('offset')
-            if None in (c_res, a_res, alpha_res, A, b, c, d):
-                logging.error(f"Missing parameter value for {calib_key}")
-                return None
-        except Exception as e:
-            logging.error(f"Failed to extract parameters for {calib_key}: {e}")
-            return None
-
-        if phase_value < c:
-            phase_value = phase_value + 2
-
-        P_mW = abs((phase_value - c) * np.pi / b)  # Power in mW
-
-        t0 = time.time()
-        current = self._solve_current_with_brentq(P_mW, c_res, alpha_res)
-        print(f"[TIMER] Solved equation for {calib_key} in {time.time() - t0:.3f}s")
-
-        if current:
-            return current
-        else:
-            logging.error(f"No positive solution for {calib_key}, fallback to linear model")
-            return None
-
-
     def decompose_unitary(self):
         """
         Load a .npy file, decompose it, and display the matrix in text format with spacing.
@@ -1059,17 +784,17 @@ class Window3Content(ctk.CTkFrame):
                 #A_phi += np.pi
                 #A_phi = A_phi % (2*np.pi)
                 A_phi /= np.pi
-                json_output = get_json_pnn(self.n, A_theta, A_phi)
+                mesh = get_mesh_pnn(self.n, A_theta, A_phi)
             
             ### choose the interferometer package
             elif package == 'interferometer':
                 I = decomposition(matrix_u, global_phase=use_global_phase)
                 bs_list = I.BS_list
                 clements_to_chip(bs_list)
-                json_output = get_json_interferometer(self.n, bs_list)
+                mesh = get_mesh_interferometer(self.n, bs_list)
 
-            # Save the updated JSON to AppData
-            setattr(AppData, 'default_json_grid', json_output)
+            # Save the updated mesh (and its JSON export for the grid view) to AppData
+            self._set_default_mesh(mesh)
             #logging.info("Updated JSON grid saved to AppData.")
 
         except Exception as e:
@@ -1,4 +1,9 @@
 # app/imports.py
+#
+# Convenience namespace for the GUI and main.py. Core modules (decomposition,
+# calibration, mapping, device drivers) import what they need directly so that
+# they load without the GUI or the vendor SDKs; see app/utils/lazy_import.py.
+# The hardware SDKs and the heavy maths packages below are lazy as well.
 
 # Set matplotlib backend first
 import matplotlib
@@ -17,7 +22,6 @@ import traceback
 import ast
 import ctypes
 from datetime import datetime
-from scipy.linalg import expm
 import argparse
 from pathlib import Path
 import re
@@ -27,8 +31,8 @@ import logging
 # Third-Party Libraries
 import serial
 import serial.tools.list_ports
-import pyvisa
 import numpy as np
+from app.utils.lazy_import import lazy_import, lazy_attr
 
 # Matplotlib imports
 import matplotlib.pyplot as plt
@@ -42,19 +46,22 @@ from matplotlib.ticker import FuncFormatter
 
 # Other third-party
 from unittest.mock import MagicMock
-from PIL import Image, ImageTk
-import sympy as sp
-import interferometer as itf
+Image = lazy_import("PIL.Image")
+ImageTk = lazy_import("PIL.ImageTk")
+sp = lazy_import("sympy")
+itf = lazy_import("interferometer")
+expm = lazy_attr("scipy.linalg", "expm")
 
 # CustomTkinter GUI
 import customtkinter as ctk
 from tkinter import Tk, Label, filedialog, messagebox, ttk
 
-# Hardware Interfaces
-import qontrol
-from ThorlabsPM100 import ThorlabsPM100
-import nidaqmx
-from nidaqmx.system import System
+# Hardware Interfaces (imported on first use)
+pyvisa = lazy_import("pyvisa")
+qontrol = lazy_import("qontrol")
+ThorlabsPM100 = lazy_attr("ThorlabsPM100", "ThorlabsPM100")
+nidaqmx = lazy_import("nidaqmx")
+System = lazy_attr("nidaqmx.system", "System")
 
 # Import Custom Modules
 from app.devices.daq_device import DAQ
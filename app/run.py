@@ -0,0 +1,96 @@
+# app/run.py
+"""
+Headless experiment runner.
+
+    python -m app.run plan.json
+    python -m app.run plan.json --simulate          # against the simulated chip
+    python -m app.run plan.json --dry-run           # validate the plan only
+    python -m app.run plan.json --resume results.csv  # continue an interrupted run
+
+Runs one experiment plan (see app/experiments/plan.py) with no GUI: the
+instruments are connected as configured in config/settings.json (lab
+hardware, simulated chip or trace replay), the plan's calibration file is
+loaded, and the results are written to the plan's output path. Results are
+checkpointed while they are written (see app/experiments/results.py), so a
+run that was interrupted or crashed can be continued with --resume.
+
+Exit status: 0 on success, 2 for an invalid plan, 1 if the run failed.
+"""
+
+import argparse
+import logging
+import sys
+
+from app.devices.hardware import Instruments, SETTINGS_PATH, load_settings, start_trace
+from app.experiments import Experiment, ExperimentPlan, PlanError
+
+
+def load_calibration(path):
+    """Import a calibration JSON into AppData (as the Calibrate tab's import does)."""
+    from app.utils.calibrate.calibrate import CalibrationUtils
+
+    resistance, phase = CalibrationUtils().import_calibration(path)
+    if resistance is None:
+        raise RuntimeError(f"Could not load calibration {path}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m app.run",
+        description="Run an experiment plan without the GUI.",
+    )
+    parser.add_argument("plan", help="experiment plan (JSON)")
+    parser.add_argument("--settings", default=SETTINGS_PATH, help="settings.json to use")
+    parser.add_argument("--simulate", action="store_true", help="use the simulated chip instead of the lab")
+    parser.add_argument("--dry-run", action="store_true", help="validate the plan and exit")
+    parser.add_argument("--resume", metavar="RESULTS",
+                        help="continue the interrupted run that was writing RESULTS")
+    parser.add_argument("--log-level", default="INFO", help="DEBUG, INFO, WARNING, ...")
+    parser.add_argument("--log-file", help="also write the log to this file")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    handlers = [logging.StreamHandler()]
+    if args.log_file:
+        handlers.append(logging.FileHandler(args.log_file))
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO),
+                        format="%(asctime)s [%(levelname)s] %(message)s", handlers=handlers)
+
+    try:
+        plan = ExperimentPlan.from_file(args.plan)
+    except (OSError, PlanError) as e:
+        logging.error(f"[Run] {e}")
+        return 2
+    if args.dry_run:
+        logging.info(f"[Run] {plan} is valid; results would go to {plan.output_path()}")
+        return 0
+
+    config = load_settings(args.settings)
+    if args.simulate or plan.get("simulate"):
+        config.setdefault("simulation", {})["enabled"] = True
+
+    try:
+        if plan.get("calibration"):
+            load_calibration(plan.path(plan.get("calibration")))
+        elif plan.experiment != "auto_calibrate":
+            logging.warning("[Run] No 'calibration' in the plan: phases cannot be converted to currents")
+
+        with Instruments.connect(config, start_trace(config)) as instruments:
+            if args.resume:
+                Experiment.create(plan, instruments).run(resume=True, output_path=args.resume)
+            else:
+                Experiment.create(plan, instruments).run()
+    except KeyboardInterrupt:
+        logging.warning("[Run] Interrupted")
+        return 1
+    except Exception as e:
+        logging.exception(f"[Run] Experiment failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
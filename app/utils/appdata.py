@@ -1,5 +1,6 @@
 # app/utils/appdata.py
 from threading import Lock
+import hashlib
 import json
 
 class AppData:
@@ -12,6 +13,7 @@ class AppData:
     decomposition_package = "pnn"
     dwell_time = "500"
     default_json_grid = {}
+    default_mesh_config = None  # MeshConfig of the current decomposition (JSON grid is its export)
     _last_selection_lock = Lock()
     last_selected = {"cross": "", "arm": ""}  # Set default starting value
     io_config = {} 
@@ -33,13 +35,14 @@ class AppData:
     # Calibration storage
     resistance_calibration_data = {}  # e.g., {"A1_theta": {...}, ...}
     phase_calibration_data = {}       # e.g., {"A1_theta": {...}, ...}
+    _calibration_fingerprint = None   # memoized hash of the two dicts above
+    calibration_table = None          # CalibrationTable compiled from the two dicts above
 
     phase_shifter_selection = "Internal"  # Default phase shifter selection
 
     selected_label = set()
     current_calibration_step = 0  # Track the current calibration step
     selected_labels = {}
-    io_config = None
     last_selection = {"cross": None, "arm": None}  # Set default starting value
 
     calibration_json = None
@@ -230,11 +233,13 @@ class AppData:
     def update_resistance_calibration(cls, label, data):
         """Update resistance calibration data for a node."""
         cls.resistance_calibration_data[label] = data
+        cls.invalidate_calibration_fingerprint()
 
     @classmethod
     def update_phase_calibration(cls, label, data):
         """Update phase calibration data for a node."""
         cls.phase_calibration_data[label] = data
+        cls.invalidate_calibration_fingerprint()
 
     @classmethod
     def get_resistance_calibration(cls, label):
@@ -248,3 +253,31 @@ class AppData:
     def clear_calibration(cls):
         cls.resistance_calibration_data.clear()
         cls.phase_calibration_data.clear()
+        cls.invalidate_calibration_fingerprint()
+
+    @classmethod
+    def invalidate_calibration_fingerprint(cls):
+        """Call after mutating the calibration dicts directly."""
+        cls._calibration_fingerprint = None
+        cls.calibration_table = None
+
+    @classmethod
+    def get_calibration_table(cls):
+        """Compiled per-channel calibration (rebuilt after the dicts change)."""
+        if cls.calibration_table is None:
+            from app.utils.calibrate.calibration_table import CalibrationTable
+            cls.calibration_table = CalibrationTable.from_calibration(
+                cls.resistance_calibration_data, cls.phase_calibration_data
+            )
+        return cls.calibration_table
+
+    @classmethod
+    def calibration_fingerprint(cls):
+        """Hash of the loaded resistance/phase calibration (memoized until it changes)."""
+        if cls._calibration_fingerprint is None:
+            payload = json.dumps(
+                [cls.resistance_calibration_data, cls.phase_calibration_data],
+                sort_keys=True, default=str
+            )
+            cls._calibration_fingerprint = hashlib.sha256(payload.encode()).hexdigest()
+        return cls._calibration_fingerprint
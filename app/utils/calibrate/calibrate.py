@@ -1,15 +1,17 @@
 # app/utils/calibrate/calibrate.py
 
-from app.imports import *
+import logging
 from app.utils.appdata import AppData
 from app.utils.qontrol.mapping_utils import get_mapping_functions
+from app.utils.calibrate.calibration_table import CalibrationTable
+from app.utils.lazy_import import lazy_import
 import numpy as np
-from scipy import optimize
-import matplotlib.pyplot as plt
 from datetime import datetime
 import time
 import json
 
+optimize = lazy_import("scipy.optimize")  # only needed by the fits
+
 
 class CalibrationUtils:
     def characterize_resistance(self, qontrol, channel, delay=0.5):
@@ -45,7 +47,7 @@ class CalibrationUtils:
         for I in currents:
             qontrol.set_current(channel, float(I))
             time.sleep(delay)
-            voltages.append(float(qontrol.device.v[channel]))
+            voltages.append(qontrol.read_voltage(channel))
         
         # Reset current to zero
         qontrol.set_current(channel, 0.0)
@@ -491,6 +493,7 @@ class CalibrationUtils:
             # Clear existing calibration data in AppData
             AppData.resistance_calibration_data.clear()
             AppData.phase_calibration_data.clear()
+            AppData.invalidate_calibration_fingerprint()
             
             # Import resistance data directly to AppData
             for key, params in resistance_data.items():
@@ -500,8 +503,14 @@ class CalibrationUtils:
             for key, params in phase_data.items():
                 AppData.phase_calibration_data[key] = params
             
+            # Compile the per-channel table once, shared by the solvers
+            AppData.calibration_table = CalibrationTable.from_calibration(
+                AppData.resistance_calibration_data, AppData.phase_calibration_data
+            )
+            
             logging.info(f"Successfully imported calibration data from {filepath}")
             logging.info(f"Loaded {len(resistance_data)} resistance and {len(phase_data)} phase calibrations")
+            logging.info(f"Compiled {AppData.calibration_table}")
             
             # Return the data for backward compatibility
             return resistance_data, phase_data
@@ -0,0 +1,112 @@
+# app/utils/calibrate/calibration_table.py
+"""
+Struct-of-arrays view of the loaded calibration.
+
+AppData keeps the calibration as nested dicts keyed by "<label>_<theta|phi>",
+which is convenient for import/export and plotting but slow to query. A
+CalibrationTable compiles those dicts once into contiguous float arrays
+indexed by Qontrol channel (the entries' "pin"), plus a validity mask and
+the key <-> channel index, so solvers only do array indexing.
+"""
+
+import logging
+
+import numpy as np
+
+RESISTANCE_FIELDS = ("a_res", "c_res", "alpha_res")
+PHASE_FIELDS = ("amplitude", "omega", "phase", "offset")
+FIELDS = RESISTANCE_FIELDS + PHASE_FIELDS
+
+
+class CalibrationTable:
+    """Per-channel calibration coefficients.
+
+    Attributes:
+        a_res, c_res, alpha_res (np.ndarray): resistance fit, NaN if missing
+        amplitude, omega, phase, offset (np.ndarray): phase fit, NaN if missing
+        valid (np.ndarray): True where every coefficient of the channel is set
+        channel_of (dict): calibration key ("A1_theta") -> channel
+        key_of (list): channel -> calibration key (None if uncalibrated)
+    """
+
+    def __init__(self, n_channels):
+        self.n_channels = int(n_channels)
+        for name in FIELDS:
+            setattr(self, name, np.full(self.n_channels, np.nan))
+        self.valid = np.zeros(self.n_channels, dtype=bool)
+        self.channel_of = {}
+        self.key_of = [None] * self.n_channels
+        self._channel_cache = {}
+
+    @classmethod
+    def from_calibration(cls, resistance_data, phase_data):
+        """Compile AppData-style calibration dicts.
+
+        Args:
+            resistance_data (dict): {key: {"pin": ..., "resistance_params": {...}}}
+            phase_data (dict): {key: {"pin": ..., "phase_params": {...}}}
+
+        Returns:
+            CalibrationTable
+        """
+        pins = {}
+        for data in (phase_data, resistance_data):  # resistance pin wins on conflict
+            for key, entry in data.items():
+                try:
+                    pins[key] = int(entry["pin"])
+                except (KeyError, TypeError, ValueError):
+                    logging.warning(f"[CalibrationTable] No channel for {key}, skipped")
+
+        n_channels = max(pins.values(), default=-1) + 1
+        table = cls(n_channels)
+        for key, channel in pins.items():
+            previous = table.key_of[channel]
+            if previous is not None and previous != key:
+                logging.warning(f"[CalibrationTable] {key} and {previous} share channel {channel}")
+                del table.channel_of[previous]
+            table.channel_of[key] = channel
+            table.key_of[channel] = key
+
+        for data, section, fields in (
+            (resistance_data, "resistance_params", RESISTANCE_FIELDS),
+            (phase_data, "phase_params", PHASE_FIELDS),
+        ):
+            for key, entry in data.items():
+                channel = table.channel_of.get(key)
+                params = entry.get(section) if isinstance(entry, dict) else None
+                if channel is None or not params:
+                    continue
+                for name in fields:
+                    try:
+                        getattr(table, name)[channel] = float(params[name])
+                    except (KeyError, TypeError, ValueError):
+                        pass
+
+        table.valid = ~np.isnan(np.vstack([getattr(table, name) for name in FIELDS])).any(axis=0)
+        for name in FIELDS + ("valid",):
+            getattr(table, name).flags.writeable = False
+        return table
+
+    def channels(self, keys):
+        """Channel of every calibration key, -1 for unknown keys.
+
+        The result is memoized per key sequence, so repeated solves of the
+        same mesh do not touch the key index again.
+        """
+        keys = tuple(keys)
+        channels = self._channel_cache.get(keys)
+        if channels is None:
+            channels = np.fromiter((self.channel_of.get(key, -1) for key in keys), dtype=int, count=len(keys))
+            channels.flags.writeable = False
+            self._channel_cache[keys] = channels
+        return channels
+
+    def __contains__(self, key):
+        channel = self.channel_of.get(key)
+        return channel is not None and bool(self.valid[channel])
+
+    def __len__(self):
+        return int(self.valid.sum())
+
+    def __repr__(self):
+        return f"CalibrationTable({len(self)}/{self.n_channels} calibrated channels)"
@@ -0,0 +1,192 @@
+# app/utils/calibrate/phase_solver.py
+"""
+Vectorized phase-to-current solver.
+
+The heater model used by the calibration is
+
+    P = c_res * I^2 * (1 + alpha_res * I^2)        (P in mW, I in mA)
+
+and the phase fit gives the power needed for a target phase as
+P = |(phase - c) * pi / b|, with the phase wrapped by +2 (π units) when it
+lies below the fitted offset c. The heater model is a quadratic in I^2, so
+instead of root-finding channel by channel every current of the mesh is
+obtained in closed form with a single set of array operations. The
+coefficients come from the compiled CalibrationTable (AppData), so the hot
+path only indexes arrays.
+
+The result matches the previous brentq solve on [1e-5, 1.65] mA: channels
+without a root in that interval (no sign change), without calibration, or
+listed in SKIP_KEYS come back as NaN.
+"""
+
+import numpy as np
+
+from app.utils.appdata import AppData
+
+# Known bad heaters, never driven from a phase value
+SKIP_KEYS = frozenset({
+    "A1_phi", "A2_phi", "A3_phi", "A4_phi", "A5_phi", "A6_phi",
+    "B1_phi", "B2_phi", "B3_phi", "B4_phi", "B5_phi",
+})
+
+# Current interval (mA) in which a solution is accepted
+CURRENT_BOUNDS = (1e-5, 1.65)
+
+
+def phase_to_power(phase, b, c):
+    """Heater power (mW) needed for a target phase (π units).
+
+    Args:
+        phase (array_like): target phases in π units
+        b (array_like): fitted phase-vs-power slope ('omega')
+        c (array_like): fitted phase offset ('phase')
+
+    Returns:
+        np.ndarray: power in mW
+    """
+    phase = np.asarray(phase, dtype=float)
+    phase = np.where(phase < c, phase + 2, phase)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.abs((phase - c) * np.pi / b)
+
+
+def solve_heater_current(P_mW, c_res, alpha_res, bounds=CURRENT_BOUNDS):
+    """Solve c_res * I^2 * (1 + alpha_res * I^2) = P for I, elementwise.
+
+    Args:
+        P_mW (array_like): target power per channel (mW)
+        c_res (array_like): linear resistance coefficient per channel
+        alpha_res (array_like): nonlinearity coefficient per channel
+        bounds (tuple): (low, high) current interval in mA
+
+    Returns:
+        np.ndarray: current in mA, NaN where no root lies in `bounds`
+    """
+    P_mW, c_res, alpha_res = np.broadcast_arrays(
+        np.asarray(P_mW, dtype=float),
+        np.asarray(c_res, dtype=float),
+        np.asarray(alpha_res, dtype=float),
+    )
+    lo, hi = bounds
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        y = P_mW / c_res
+
+        # Same acceptance rule as brentq: f must change sign over the interval
+        f_lo = lo**2 * (1 + alpha_res * lo**2) - y
+        f_hi = hi**2 * (1 + alpha_res * hi**2) - y
+        bracketed = f_lo * f_hi <= 0
+
+        # alpha*x^2 + x - y = 0 with x = I^2. The first form is the
+        # cancellation-free small root (also valid for alpha == 0), the second
+        # is the other root of the quadratic when alpha != 0.
+        sqrt_disc = np.sqrt(1 + 4 * alpha_res * y)
+        x_small = 2 * y / (1 + sqrt_disc)
+        x_large = -(1 + sqrt_disc) / (2 * alpha_res)
+
+        x_lo, x_hi = lo**2, hi**2
+        in_small = (x_small >= x_lo) & (x_small <= x_hi)
+        in_large = (x_large >= x_lo) & (x_large <= x_hi)
+        x = np.where(in_small, x_small, np.where(in_large, x_large, np.nan))
+
+        current = np.sqrt(x)
+    current[~bracketed] = np.nan
+    return current
+
+
+def solve_channel_currents(channels, phases, table=None):
+    """Currents (mA) for a vector of target phases, one per Qontrol channel.
+
+    Args:
+        channels (array_like): channel indices into the calibration table
+            (-1 for keys without a channel)
+        phases (array_like): target phases in π units, aligned with `channels`
+        table (CalibrationTable, optional): defaults to the AppData table
+
+    Returns:
+        np.ndarray: currents in mA; NaN for uncalibrated channels, invalid
+            phases or phases without a solution
+    """
+    if table is None:
+        table = AppData.get_calibration_table()
+    channels = np.asarray(channels, dtype=int)
+    known = (channels >= 0) & (channels < table.n_channels)
+    idx = np.where(known, channels, 0)
+    usable = known & table.valid[idx] if table.n_channels else np.zeros(len(channels), dtype=bool)
+
+    if not usable.any():
+        return np.full(len(channels), np.nan)
+    P_mW = phase_to_power(phases, table.omega[idx], table.phase[idx])
+    current = solve_heater_current(P_mW, table.c_res[idx], table.alpha_res[idx])
+    current[~usable] = np.nan
+    return current
+
+
+def solve_phase_currents(keys, phases, table=None):
+    """Currents (mA) for a vector of target phases, one per calibration key.
+
+    Args:
+        keys (sequence[str]): calibration keys, e.g. ["A1_theta", "A1_phi"]
+        phases (array_like): target phases in π units, aligned with `keys`
+        table (CalibrationTable, optional): defaults to the AppData table
+
+    Returns:
+        np.ndarray: currents in mA; NaN for skipped keys, missing
+            calibration, invalid phases or phases without a solution
+    """
+    if table is None:
+        table = AppData.get_calibration_table()
+    channels = table.channels(keys)
+    skipped = [table.channel_of[key] for key in SKIP_KEYS if key in table.channel_of]
+    if skipped:
+        channels = np.where(np.isin(channels, skipped), -1, channels)
+    return solve_channel_currents(channels, phases, table)
+
+
+def solve_mesh_currents(mesh, slots, theta=None, decimals=5):
+    """Solve theta/phi currents of the given mesh slots in one call.
+
+    The currents are rounded to `decimals` and written into
+    mesh.theta_current / mesh.phi_current.
+
+    Args:
+        mesh (MeshConfig): configuration holding the target phases
+        slots (array_like): slot indices to solve
+        theta (array_like, optional): theta phases to use instead of
+            mesh.theta[slots] (e.g. interpolated values); NaN entries are
+            left unsolved without being reported
+        decimals (int): rounding applied to the solved currents
+
+    Returns:
+        tuple: (applied_channels, failed_channels) lists of display strings;
+        SKIP_KEYS channels are left unsolved on purpose and appear in neither
+    """
+    slots = np.asarray(slots, dtype=int)
+    labels = [mesh.labels[slot] for slot in slots]
+    theta_target = mesh.theta[slots] if theta is None else np.asarray(theta, dtype=float)
+    theta_given = np.ones(len(slots), dtype=bool) if theta is None else ~np.isnan(theta_target)
+
+    # Interleave theta/phi so the messages keep the per-cross order
+    keys = [f"{label}_{kind}" for label in labels for kind in ("theta", "phi")]
+    phases = np.column_stack((theta_target, mesh.phi[slots])).ravel()
+    currents = np.round(solve_phase_currents(keys, phases), decimals).reshape(-1, 2)
+    invalid = np.isnan(phases).reshape(-1, 2)
+
+    mesh.theta_current[slots] = currents[:, 0]
+    mesh.phi_current[slots] = currents[:, 1]
+
+    applied_channels = []
+    failed_channels = []
+    for label, given, row_invalid, row_current in zip(
+        labels, theta_given.tolist(), invalid.tolist(), currents.tolist()
+    ):
+        for j, (symbol, kind) in enumerate((("θ", "theta"), ("φ", "phi"))):
+            if (j == 0 and not given) or f"{label}_{kind}" in SKIP_KEYS:
+                continue
+            if row_invalid[j]:
+                failed_channels.append(f"{label}:{symbol} (invalid value)")
+            elif row_current[j] != row_current[j]:  # NaN
+                failed_channels.append(f"{label}:{symbol} (no calibration)")
+            else:
+                applied_channels.append(f"{label}:{symbol} = {row_current[j]:.5f} mA")
+    return applied_channels, failed_channels
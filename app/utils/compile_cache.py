@@ -0,0 +1,159 @@
+# app/utils/compile_cache.py
+"""
+Disk-backed cache of compiled unitaries.
+
+Compiling a unitary for the chip (decomposition → phase JSON → optional
+interpolation → current solve → channel mapping) only depends on the
+unitary itself, the mesh/decomposition settings and the loaded
+calibration. The result, a per-channel current vector and the mesh phases
+it was solved for, is stored on disk keyed by a hash of all of those
+inputs, so replaying a unitary folder skips the whole pipeline.
+
+The calibration fingerprint is part of the key, so importing or editing
+a calibration automatically makes old entries unreachable; they are
+dropped by the LRU eviction like any other stale entry.
+"""
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+from app.utils.appdata import AppData
+
+DEFAULT_CACHE_DIR = Path.home() / ".mzic" / "compile_cache"
+DEFAULT_MAX_ENTRIES = 4096
+_KEY_VERSION = b"compile-cache-v2"  # v2: entries also hold the mesh phases
+
+
+class CompileCache:
+    """Size-bounded LRU cache of {channel: current} vectors on disk.
+
+    Each entry is one .npz file holding `channels` and `currents` arrays,
+    and the compiled `phases` (π) when they were given to put().
+    Recency is tracked through the file modification time, which is
+    refreshed on every hit, so the LRU order survives restarts.
+
+    The number of entries is counted in memory (seeded by one directory
+    scan), so put() only scans the directory when the count passes
+    `max_entries`; eviction then trims down to `low_water` of the cap.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=DEFAULT_MAX_ENTRIES, low_water=0.9):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+        self.max_entries = int(max_entries)
+        self.low_water = float(low_water)
+        self.hits = 0
+        self.misses = 0
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._count = sum(1 for _ in self._entries())
+
+    @staticmethod
+    def make_key(unitary, grid_size, package, global_phase, interpolation=False, current_limit=None):
+        """Hash every input that influences the compiled current vector.
+
+        Args:
+            unitary (np.ndarray): the (embedded) unitary being applied
+            grid_size (str): mesh size, e.g. "12x12"
+            package (str): decomposition package ("pnn" / "interferometer")
+            global_phase (bool): global-phase flag of the interferometer package
+            interpolation (bool): whether theta interpolation is applied
+            current_limit (float): clamp used when mapping to channels
+
+        Returns:
+            str: hex digest
+        """
+        u = np.ascontiguousarray(unitary, dtype=np.complex128)
+        h = hashlib.sha256(_KEY_VERSION)
+        h.update(str(u.shape).encode())
+        h.update(u.tobytes())
+        h.update(f"|{grid_size}|{package}|{bool(global_phase)}|{bool(interpolation)}|{current_limit}|".encode())
+        h.update(AppData.calibration_fingerprint().encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.npz"
+
+    def get(self, key):
+        """Return the cached ({channel: current}, phases or None), or None on a miss."""
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                channel_values = dict(zip(data["channels"].tolist(), data["currents"].tolist()))
+                phases = data["phases"] if "phases" in data.files else None
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logging.warning(f"[CompileCache] Dropping unreadable entry {path.name}: {e}")
+            if self._remove(path):
+                self._count -= 1
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path, None)  # mark as most recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return channel_values, phases
+
+    def put(self, key, channel_values, phases=None):
+        """Store a {channel: current} dict (and the phases it was solved for) and evict old entries if needed."""
+        channels = np.fromiter(channel_values.keys(), dtype=np.int64, count=len(channel_values))
+        currents = np.fromiter(channel_values.values(), dtype=np.float64, count=len(channel_values))
+        arrays = {} if phases is None else {"phases": np.asarray(phases, dtype=np.float64)}
+        path = self._path(key)
+        tmp_path = path.with_name(path.stem + ".tmp.npz")
+        is_new = not path.exists()
+        try:
+            np.savez(tmp_path, channels=channels, currents=currents, **arrays)
+            os.replace(tmp_path, path)  # atomic, readers never see a partial file
+        except OSError as e:
+            logging.warning(f"[CompileCache] Could not write entry: {e}")
+            self._remove(tmp_path)
+            return
+        if is_new:
+            self._count += 1
+        if self._count > self.max_entries:
+            self._evict()
+
+    def clear(self):
+        """Remove every cached entry."""
+        for path in self._entries():
+            self._remove(path)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def _entries(self):
+        return self.cache_dir.glob("*.npz")
+
+    def _evict(self):
+        """Drop the least recently used entries down to the low-water mark."""
+        entries = []
+        for path in self._entries():
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        # Resync with the directory (other processes may share the cache)
+        self._count = len(entries)
+        excess = len(entries) - int(self.max_entries * self.low_water)
+        if self._count <= self.max_entries or excess <= 0:
+            return
+        entries.sort()
+        for _, path in entries[:excess]:
+            if self._remove(path):
+                self._count -= 1
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
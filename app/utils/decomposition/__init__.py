@@ -1,16 +1,29 @@
 # app/utils/decomposition/__init__.py
 from .interferometer import decomposition, Beamsplitter, Interferometer
-from .pnn import decompose_clements, reconstruct_clements
+from .pnn import decompose_clements, decompose_clements_batch, reconstruct_clements
+from .forward import mesh_transfer, fidelity
 from .mapping.mzi_convention import clements_to_chip
-from .mapping.mzi_lut import get_json_interferometer, get_json_pnn
+from .mapping.mzi_lut import (
+    get_json_interferometer,
+    get_json_pnn,
+    get_mesh_interferometer,
+    get_mesh_pnn,
+    get_mesh_labels
+)
 
 __all__ = [
     'decomposition',
     'Beamsplitter', 
     'Interferometer',
     'decompose_clements',
+    'decompose_clements_batch',
     'reconstruct_clements',
+    'mesh_transfer',
+    'fidelity',
     'clements_to_chip',
     'get_json_interferometer',
-    'get_json_pnn'
+    'get_json_pnn',
+    'get_mesh_interferometer',
+    'get_mesh_pnn',
+    'get_mesh_labels'
 ]
\ No newline at end of file
@@ -0,0 +1,104 @@
+# app/utils/decomposition/forward.py
+"""
+Forward model of a rectangular (Clements) MZI mesh.
+
+Evaluates the transfer matrix implemented by a set of phases with 2x2
+updates on neighbouring rows, one mesh column at a time. All inputs may
+carry a leading batch axis, so K candidate phase settings are evaluated
+in a single call:
+
+    phis, thetas: (rows, cols) or (K, rows, cols)
+    alphas:       (N,)         or (K, N)
+
+The slot ordering and block conventions are the same as
+`reconstruct_clements` in pnn.py.
+"""
+
+import numpy as np
+
+from .pnn import BS2x2, MZI2x2
+
+
+def _apply_column(mat, first, phis_col, thetas_col, U2block, Lp, Lc):
+    """Apply every block of one mesh column (modes first, first+2, ...) at once.
+
+    The blocks in a column act on disjoint pairs of rows, so they can be
+    applied together with fancy indexing.
+
+    Args:
+        mat (np.ndarray): (K, N, N) transfer matrix, modified in place
+        first (int): 0 for the even sub-column, 1 for the odd one
+        phis_col, thetas_col (np.ndarray): (K, nb) phases of the nb blocks
+        U2block: BS2x2 or MZI2x2
+        Lp, Lc (float): linear loss factors
+    """
+    idx_m = np.arange(first, mat.shape[-1] - 1, 2)
+    if idx_m.size == 0:
+        return
+    idx_n = idx_m + 1
+    block = U2block(phis_col, thetas_col, Lp=Lp, Lc=Lc)
+    row_m = mat[:, idx_m, :]
+    row_n = mat[:, idx_n, :]
+    mat[:, idx_m, :] = block[..., 0, 0, None] * row_m + block[..., 0, 1, None] * row_n
+    mat[:, idx_n, :] = block[..., 1, 0, None] * row_m + block[..., 1, 1, None] * row_n
+
+
+def mesh_transfer(phis, thetas, alphas, block='bs', Lp_dB=0, Lc_dB=0):
+    """Transfer matrix of a Clements mesh for one or many phase settings.
+
+    Args:
+        phis (np.ndarray): (rows, cols) or (K, rows, cols) external phases
+        thetas (np.ndarray): same shape as phis, internal phases
+        alphas (np.ndarray): (N,) or (K, N) output phases, N = rows + 1
+        block (str): 'bs' or 'mzi'
+        Lp_dB (float): loss on the bar path in dB (as in U2BS/U2MZI)
+        Lc_dB (float): loss on the cross path in dB
+
+    Returns:
+        complex array of shape (N, N), or (K, N, N) for batched input
+    """
+    assert isinstance(block, str) and block.strip().lower() in ['bs', 'mzi']
+    phis = np.asarray(phis, dtype=np.float64)
+    thetas = np.asarray(thetas, dtype=np.float64)
+    alphas = np.asarray(alphas, dtype=np.float64)
+    if phis.shape != thetas.shape:
+        raise ValueError("phis and thetas must have the same shape.")
+
+    batched = phis.ndim == 3
+    if not batched:
+        phis, thetas, alphas = phis[np.newaxis], thetas[np.newaxis], alphas[np.newaxis]
+
+    num, row, col = phis.shape
+    dim = row + 1
+    if alphas.shape != (num, dim):
+        raise ValueError(f"alphas should have shape ({num}, {dim}), got {alphas.shape}.")
+
+    U2block = BS2x2 if block == 'bs' else MZI2x2
+    Lp = 10 ** (Lp_dB / 10)
+    Lc = 10 ** (Lc_dB / 10)
+
+    mat = np.zeros((num, dim, dim), dtype=np.complex128)
+    mat[:, np.arange(dim), np.arange(dim)] = 1
+    for p in range(col):
+        _apply_column(mat, 0, phis[:, 0::2, p], thetas[:, 0::2, p], U2block, Lp, Lc)
+        if p >= col - 1 and dim % 2 == 1:
+            continue
+        _apply_column(mat, 1, phis[:, 1::2, p], thetas[:, 1::2, p], U2block, Lp, Lc)
+    mat *= np.exp(1j * alphas)[:, :, np.newaxis]
+
+    return mat if batched else mat[0]
+
+
+def fidelity(u_target, u):
+    """Normalised overlap |Tr(U_target^dagger U)|^2 / N^2, broadcast over batches.
+
+    Args:
+        u_target (np.ndarray): (N, N) or (K, N, N) target matrix
+        u (np.ndarray): (N, N) or (K, N, N) implemented matrix
+
+    Returns:
+        float, or (K,) array for batched input
+    """
+    dim = np.shape(u)[-1]
+    overlap = np.einsum('...ij,...ij->...', np.conj(u_target), u)
+    return np.abs(overlap) ** 2 / dim ** 2
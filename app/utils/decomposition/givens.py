@@ -0,0 +1,106 @@
+# app/utils/decomposition/givens.py
+"""
+In-place two-mode updates used by the mesh decompositions.
+
+A beam splitter / MZI only mixes two modes, so multiplying by its N x N
+embedding only changes two rows (left multiplication) or two columns
+(right multiplication) of the matrix. These helpers apply the 2x2 block
+directly to those rows/columns instead of building an N x N identity and
+calling np.matmul, which turns the Clements decomposition from O(N^5)
+into O(N^3).
+
+apply_left/apply_right accept a leading batch axis: `mat` may be
+(..., N, N) and `block` (..., 2, 2), which is what the batched
+decompositions use. For a single matrix, rotate_rows/rotate_cols take the
+four block entries as plain scalars instead: building a (2, 2) block array
+per MZI costs more than the update itself.
+"""
+
+import numpy as np
+
+
+def apply_left(mat, m, n, block):
+    """Replace rows m, n of `mat` with block @ mat[[m, n], :] (in place).
+
+    Equivalent to `mat = T @ mat` where T is the identity except for
+    T[m, m], T[m, n], T[n, m], T[n, n] = block.
+
+    Args:
+        mat (np.ndarray): complex matrix of shape (..., N, N), modified in place
+        m (int): first mode index (0-based)
+        n (int): second mode index (0-based)
+        block (np.ndarray): 2x2 block of shape (..., 2, 2)
+
+    Returns:
+        the updated `mat` (same object)
+    """
+    block = np.asarray(block)
+    row_m = mat[..., m, :]
+    row_n = mat[..., n, :]
+    new_m = block[..., 0, 0, None] * row_m + block[..., 0, 1, None] * row_n
+    new_n = block[..., 1, 0, None] * row_m + block[..., 1, 1, None] * row_n
+    mat[..., m, :] = new_m
+    mat[..., n, :] = new_n
+    return mat
+
+
+def apply_right(mat, m, n, block):
+    """Replace columns m, n of `mat` with mat[:, [m, n]] @ block (in place).
+
+    Equivalent to `mat = mat @ T` where T is the identity except for
+    T[m, m], T[m, n], T[n, m], T[n, n] = block.
+
+    Args:
+        mat (np.ndarray): complex matrix of shape (..., N, N), modified in place
+        m (int): first mode index (0-based)
+        n (int): second mode index (0-based)
+        block (np.ndarray): 2x2 block of shape (..., 2, 2)
+
+    Returns:
+        the updated `mat` (same object)
+    """
+    block = np.asarray(block)
+    col_m = mat[..., :, m]
+    col_n = mat[..., :, n]
+    new_m = col_m * block[..., 0, 0, None] + col_n * block[..., 1, 0, None]
+    new_n = col_m * block[..., 0, 1, None] + col_n * block[..., 1, 1, None]
+    mat[..., :, m] = new_m
+    mat[..., :, n] = new_n
+    return mat
+
+
+def rotate_rows(mat, m, n, t00, t01, t10, t11):
+    """apply_left for one (N, N) matrix with the block given as four scalars (in place)."""
+    row_m = mat[m]
+    row_n = mat[n]
+    new_m = t00 * row_m + t01 * row_n
+    mat[n] = t10 * row_m + t11 * row_n
+    mat[m] = new_m
+    return mat
+
+
+def rotate_cols(mat, m, n, t00, t01, t10, t11):
+    """apply_right for one (N, N) matrix with the block given as four scalars (in place)."""
+    col_m = mat[:, m]
+    col_n = mat[:, n]
+    new_m = col_m * t00 + col_n * t10
+    mat[:, n] = col_m * t01 + col_n * t11
+    mat[:, m] = new_m
+    return mat
+
+
+def block_from_entries(t00, t01, t10, t11):
+    """Stack four (broadcastable) entries into a (..., 2, 2) complex block (batched path)."""
+    t00, t01, t10, t11 = np.broadcast_arrays(
+        np.asarray(t00, dtype=np.complex128),
+        np.asarray(t01, dtype=np.complex128),
+        np.asarray(t10, dtype=np.complex128),
+        np.asarray(t11, dtype=np.complex128),
+    )
+    return np.stack([np.stack([t00, t01], axis=-1),
+                     np.stack([t10, t11], axis=-1)], axis=-2)
+
+
+def conj_transpose(block):
+    """Conjugate transpose of a (..., 2, 2) block."""
+    return np.conj(np.swapaxes(block, -1, -2))
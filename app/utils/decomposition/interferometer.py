@@ -1,5 +1,10 @@
+import cmath
+import math
+
 import numpy as np
 
+from .givens import rotate_cols, rotate_rows
+
 class Beamsplitter:
     """This class defines a beam splitter
 
@@ -104,22 +109,17 @@ class Interferometer:
         for BS in self.BS_list:
 
             if global_phase:
-                g = 1j*np.exp(1j * BS.theta)
+                g = 1j*cmath.exp(1j * BS.theta)
             else:
                 g = 1
 
-            T = np.eye(N, dtype=np.complex128)  # Use higher precision for the MZI matrix
-            T[BS.mode1 - 1, BS.mode1 - 1] = g * np.exp(1j * BS.phi) * np.sin(BS.theta)
-            T[BS.mode1 - 1, BS.mode2 - 1] = g * np.cos(BS.theta)
-            T[BS.mode2 - 1, BS.mode1 - 1] = g * np.exp(1j * BS.phi) * np.cos(BS.theta)
-            T[BS.mode2 - 1, BS.mode2 - 1] = g * (-1 * np.sin(BS.theta))
-            U = np.matmul(T, U)
+            # Only rows mode1, mode2 change, so apply the 2x2 block directly
+            rotate_rows(U, BS.mode1 - 1, BS.mode2 - 1, *_mzi_entries(BS.theta, BS.phi, g))
 
         while np.size(self.output_phases) < N:  # Autofill for users who don't want to bother with output phases
             self.output_phases.append(0)
 
-        D = np.diag(np.exp([1j * phase for phase in self.output_phases]))
-        U = np.matmul(D, U)
+        U *= np.exp(1j * np.asarray(self.output_phases[:N], dtype=np.float64))[:, np.newaxis]
         return U
 
     def draw(self, show_plot=True):  
@@ -223,6 +223,7 @@ def triangle_decomposition(U):
     """
     I = Interferometer()
     N = int(np.sqrt(U.size))
+    U = np.array(U, dtype=np.complex128)  # working copy, updated in place
     for ii in range(N-1):
         for jj in range(N-1-ii):
             modes = [N - jj - 1, N - jj]
@@ -230,14 +231,8 @@ def triangle_decomposition(U):
             phi = -custom_angle(-U[ii, N - 1 - jj], U[ii, N - 2 - jj])
             global_phase = np.angle(U[ii, N - 1 - jj])  # Extract global phase
 
-            # Define the MZI matrix
-            invT = np.eye(N, dtype=np.complex128)
-            invT[modes[0]-1, modes[0]-1] = np.exp(1j * global_phase) * (1j * np.exp(1j * phi) * np.sin(theta))
-            invT[modes[0]-1, modes[1]-1] = np.exp(1j * global_phase) * (1j * np.cos(theta))
-            invT[modes[1]-1, modes[0]-1] = np.exp(1j * global_phase) * (1j * np.exp(1j * phi) * np.cos(theta))
-            invT[modes[1]-1, modes[1]-1] = np.exp(1j * global_phase) * (-1j * np.sin(theta))
-
-            U = np.matmul(U, invT)
+            # Apply the 2x2 MZI block to the two affected columns
+            rotate_cols(U, modes[0]-1, modes[1]-1, *_mzi_entries(theta, phi, 1j * cmath.exp(1j * global_phase)))
             I.BS_list.append(Beamsplitter(modes[0], modes[1], theta, phi))
     phases = np.diag(U)
     phases = phases / np.abs(phases)  # Normalize to ensure unit magnitude
@@ -245,6 +240,18 @@ def triangle_decomposition(U):
     return I
 
 
+def _mzi_entries(theta, phi, g):
+    """Entries (t00, t01, t10, t11) of the MZI block, scaled by g."""
+    e, c, s = cmath.exp(1j * phi), math.cos(theta), math.sin(theta)
+    return g * e * s, g * c, g * e * c, -g * s
+
+
+def _inverse_mzi_entries(theta, phi, g):
+    """Entries (t00, t01, t10, t11) of the inverse MZI used while nulling elements of U."""
+    e, c, s = cmath.exp(-1j * phi), math.cos(theta), math.sin(theta)
+    return g * e * s, g * e * c, g * c, -g * s
+
+
 def decomposition(U, global_phase=None):
     """Returns a rectangular mesh of MZIs implementing matrix U
 
@@ -266,6 +273,7 @@ def decomposition(U, global_phase=None):
     I.global_phase = global_phase
 
     N = int(np.sqrt(U.size))
+    U = np.array(U, dtype=np.complex128)  # working copy, updated in place
     left_T = []
     for ii in range(N-1):
         if np.mod(ii, 2) == 0:
@@ -280,18 +288,12 @@ def decomposition(U, global_phase=None):
                 phi = custom_angle(-U[N-1-jj, ii-jj], U[N-1-jj, ii-jj+1])
 
                 if global_phase:
-                    g = -1j*np.exp(-1j * theta) 
+                    g = -1j*cmath.exp(-1j * theta)
                 else:
                     g = 1
 
-                # Define the MZI matrix
-                invT = np.eye(N, dtype=np.complex128)
-                invT[modes[0]-1, modes[0]-1] = g * np.exp(-1j * phi) * np.sin(theta)
-                invT[modes[0]-1, modes[1]-1] = g * np.exp(-1j * phi) * np.cos(theta)
-                invT[modes[1]-1, modes[0]-1] = g * np.cos(theta)
-                invT[modes[1]-1, modes[1]-1] = g * (-1*np.sin(theta))
-
-                U = np.matmul(U, invT)
+                # Apply the inverse MZI block; only columns modes[0], modes[1] change
+                rotate_cols(U, modes[0]-1, modes[1]-1, *_inverse_mzi_entries(theta, phi, g))
                 #print(modes[0], modes[1],U)
                 I.BS_list.append(Beamsplitter(modes[0], modes[1], theta, phi))
         else:
@@ -305,18 +307,12 @@ def decomposition(U, global_phase=None):
                 phi = custom_angle(U[N+jj-ii-1, jj], U[N+jj-ii-2, jj])
                 
                 if global_phase:
-                    g = 1j*np.exp(1j * theta) 
+                    g = 1j*cmath.exp(1j * theta)
                 else:
                     g = 1
 
-                # Define the MZI matrix
-                T = np.eye(N, dtype=np.complex128)  # Use higher precision for the MZI matrix
-                T[modes[0]-1, modes[0]-1] = g * np.exp(1j * phi) * np.sin(theta)
-                T[modes[0]-1, modes[1]-1] = g * np.cos(theta)
-                T[modes[1]-1, modes[0]-1] = g * np.exp(1j * phi) * np.cos(theta)
-                T[modes[1]-1, modes[1]-1] = g * (-1*np.sin(theta))
-
-                U = np.matmul(T, U)
+                # Apply the MZI block; only rows modes[0], modes[1] change
+                rotate_rows(U, modes[0]-1, modes[1]-1, *_mzi_entries(theta, phi, g))
                 #print(modes[0], modes[1],U)
                 left_T.append(Beamsplitter(modes[0], modes[1], theta, phi))
 
@@ -327,32 +323,21 @@ def decomposition(U, global_phase=None):
         modes = [int(BS.mode1), int(BS.mode2)]
         
         if global_phase:
-            g = -1j*np.exp(-1j * theta)
+            g = -1j*cmath.exp(-1j * theta)
         else:
             g = 1 
 
-        invT = np.eye(N, dtype=np.complex128)
-
-        invT[modes[0]-1, modes[0]-1] = g * np.exp(-1j * phi) * np.sin(theta)
-        invT[modes[0]-1, modes[1]-1] = g * np.exp(-1j * phi) * np.cos(theta)
-        invT[modes[1]-1, modes[0]-1] = g * np.cos(theta)
-        invT[modes[1]-1, modes[1]-1] = g * (-1*np.sin(theta))
-        U = np.matmul(invT, U)
+        rotate_rows(U, modes[0]-1, modes[1]-1, *_inverse_mzi_entries(theta, phi, g))
 
         theta = custom_arccot(U[modes[1]-1, modes[0]-1], U[modes[1]-1, modes[1]-1])
         phi = custom_angle(-U[modes[1]-1, modes[0]-1], U[modes[1]-1, modes[1]-1])
 
         if global_phase:
-            g = -1j*np.exp(-1j * theta)
+            g = -1j*cmath.exp(-1j * theta)
         else:
             g = 1 
 
-        invT[modes[0]-1, modes[0]-1] = g * np.exp(-1j * phi) * np.sin(theta)
-        invT[modes[0]-1, modes[1]-1] = g * np.exp(-1j * phi) * np.cos(theta)
-        invT[modes[1]-1, modes[0]-1] = g * np.cos(theta)
-        invT[modes[1]-1, modes[1]-1] = g * (-1*np.sin(theta))
-
-        U = np.matmul(U, invT) 
+        rotate_cols(U, modes[0]-1, modes[1]-1, *_inverse_mzi_entries(theta, phi, g))
         #print(modes[0], modes[1],U)
         I.BS_list.append(Beamsplitter(modes[0], modes[1], theta, phi))
 
@@ -363,6 +348,30 @@ def decomposition(U, global_phase=None):
     return I
 
 
+def random_unitaries(count, N, rng=None):
+    """Returns `count` Haar-random NxN unitary matrices
+
+    Same construction as random_unitary, vectorized: one batched QR of a
+    (count, N, N) complex Gaussian stack, with the phases of diag(R) moved
+    into Q so the distribution is Haar.
+
+    Args:
+        count (int): number of matrices
+        N (int): dimension of each NxN unitary matrix
+        rng (int | np.random.Generator, optional): seed or generator; the
+            global numpy random state is used when None
+
+    Returns:
+        complex-valued (count, N, N) numpy array
+    """
+    normal = np.random.standard_normal if rng is None else np.random.default_rng(rng).standard_normal
+    X = (normal((count, N, N)) + 1j * normal((count, N, N))) / np.sqrt(2)
+
+    q, r = np.linalg.qr(X)
+    d = np.diagonal(r, axis1=-2, axis2=-1)
+    return q * (d / np.abs(d))[:, np.newaxis, :]
+
+
 def random_unitary(N):
     """Returns a random NxN unitary matrix
 
@@ -375,16 +384,7 @@ def random_unitary(N):
     Returns:
         complex-valued 2D numpy array representing the interferometer
     """
-    X = np.zeros([N, N], dtype=np.complex128)
-    for ii in range(N):
-        for jj in range(N):
-            X[ii, jj] = (np.random.normal() + 1j * np.random.normal()) / np.sqrt(2)
-
-    q, r = np.linalg.qr(X)
-    r = np.diag(np.divide(np.diag(r), abs(np.diag(r))))
-    U = np.matmul(q, r)
-
-    return U
+    return random_unitaries(1, N)[0]
 
 def custom_arctan(x1, x2):
     """Stable arctangent calculation using arctan2."""
@@ -1,6 +1,5 @@
 # app/utils/mzi_convention.py
 import numpy as np
-from app.imports import *
 
 def clements_to_chip(clements_bs_list):
 
@@ -9,8 +8,8 @@ def clements_to_chip(clements_bs_list):
         
         if abs(bs.theta) < 1e-5:
             bs.theta = 0
-        bs.theta = format(bs.theta/np.pi,'.10f')
+        bs.theta = round(float(bs.theta/np.pi), 10)
      
         if abs(bs.phi) < 1e-5:
             bs.phi = 0
-        bs.phi = format(bs.phi/np.pi,'.10f')
\ No newline at end of file
+        bs.phi = round(float(bs.phi/np.pi), 10)
\ No newline at end of file
@@ -1,6 +1,7 @@
 # app/utils/mzi_lut.py
 
-from app.imports import *
+import numpy as np
+from app.utils.mesh_config import MeshConfig
 
 # Interferometer package mapping
 SEQUENCE_INTERFEROMETER_8x8 = [
@@ -55,6 +56,11 @@ SEQUENCE_PNN_12x12 = [
 # -----------------------------------
 # -----------------------------------
 
+def get_mesh_labels(n):
+    """All MZI labels of an n x n mesh (the interferometer sequence covers every MZI)."""
+    return [label for diagonal in get_sequence_interferometer(n) for label in diagonal]
+
+
 def get_sequence_interferometer(n):
     if n == 8:
         return SEQUENCE_INTERFEROMETER_8x8
@@ -82,57 +88,60 @@ def map_interferometer(n, bs_list):
     
     return mapping
 
+def get_mesh_interferometer(n, bs_list):
+    """
+    Map beam splitters (after clements_to_chip) onto a MeshConfig of the n x n mesh.
+    """
+    mapping = map_interferometer(n, bs_list)
+    mesh = MeshConfig.for_grid(n)
+    labels = list(mapping.keys())
+    values = np.array([mapping[label] for label in labels], dtype=np.float64).reshape(-1, 2)
+    mesh.set_slots(labels, values[:, 0], values[:, 1])
+    return mesh
+
 def get_json_interferometer(n, bs_list):
     """
     Generate JSON output with additional metadata and formatted theta/phi values.
     """
-    mapping = map_interferometer(n, bs_list)
-    output = {}
-        
-    for label, (theta, phi) in mapping.items():
+    output = get_mesh_interferometer(n, bs_list).to_json()
+
+    '''
+    # Route out leakage light
+    if label in ['B1', 'C2', 'D2', 'E3', 'E2', 'F3', 'G4', 'D1', 'F2', 'G3', 'H3']:
         output[label] = {
             "arms": ['TL', 'TR', 'BL', 'BR'],
-            "theta": str(theta),  
-            "phi": str(phi),     
+            "theta": '2',
+            "phi": '0',
+        }
+    
+    elif label == 'E1':
+        output[label] = {
+            "arms": ['TL', 'TR', 'BL', 'BR'],
+            "theta": str(theta),
+            "phi": '1.5',
         }
 
-        '''
-        # Route out leakage light
-        if label in ['B1', 'C2', 'D2', 'E3', 'E2', 'F3', 'G4', 'D1', 'F2', 'G3', 'H3']:
-            output[label] = {
-                "arms": ['TL', 'TR', 'BL', 'BR'],
-                "theta": '2',
-                "phi": '0',
-            }
-        
-        elif label == 'E1':
-            output[label] = {
-                "arms": ['TL', 'TR', 'BL', 'BR'],
-                "theta": str(theta),
-                "phi": '1.5',
-            }
-
-        elif label == 'E2':
-            output[label] = {
-                "arms": ['TL', 'TR', 'BL', 'BR'],
-                "theta": '2.0',
-                "phi": '1.5',
-            }
-        
-        elif label == 'F1':
-            output[label] = {
-                "arms": ['TL', 'TR', 'BL', 'BR'],
-                "theta": str(theta),
-                "phi": '0.5',
-            }
-        
-        elif label in ('G1', 'G2', 'H1'):
-            output[label] = {
-                "arms": ['TL', 'TR', 'BL', 'BR'],
-                "theta": str(theta),
-                "phi": '1.0',
-            }  
-        '''
+    elif label == 'E2':
+        output[label] = {
+            "arms": ['TL', 'TR', 'BL', 'BR'],
+            "theta": '2.0',
+            "phi": '1.5',
+        }
+    
+    elif label == 'F1':
+        output[label] = {
+            "arms": ['TL', 'TR', 'BL', 'BR'],
+            "theta": str(theta),
+            "phi": '0.5',
+        }
+    
+    elif label in ('G1', 'G2', 'H1'):
+        output[label] = {
+            "arms": ['TL', 'TR', 'BL', 'BR'],
+            "theta": str(theta),
+            "phi": '1.0',
+        }  
+    '''
     return output
 
 def get_sequence_pnn(n):
@@ -167,25 +176,31 @@ def map_pnn(n, A_theta, A_phi):
     
     return mapping
 
+def get_mesh_pnn(n, A_theta, A_phi):
+    """
+    采用PNN物理映射方式，直接用A_theta和A_phi生成MeshConfig
+    """
+    flat_labels = [label for diagonal in get_sequence_pnn(n) for label in diagonal]
+    A_theta = np.asarray(A_theta, dtype=np.float64).flatten()
+    A_phi = np.asarray(A_phi, dtype=np.float64).flatten()
+    count = min(len(A_theta), len(flat_labels))  # Prevent index errors for large N
+
+    mesh = MeshConfig.for_grid(n)
+    mesh.set_slots(flat_labels[:count], A_theta[:count], A_phi[:count])
+    return mesh
+
 def get_json_pnn(n, A_theta, A_phi):
     """
     采用PNN物理映射方式，直接用A_theta和A_phi生成JSON输出
     """
-    mapping = map_pnn(n, A_theta, A_phi)
-    output = {}
-    for label, (theta, phi) in mapping.items():
+    output = get_mesh_pnn(n, A_theta, A_phi).to_json()
+    '''
+    # Route out leakage light
+    if label in ['B1', 'C2', 'D2', 'E3', 'F3', 'G4', 'H4', 'I5', 'J5', 'K6']:
         output[label] = {
             "arms": ['TL', 'TR', 'BL', 'BR'],
-            "theta": str(theta),
-            "phi": str(phi),
+            "theta": '2.0',
+            "phi": '0',
         }
-        '''
-        # Route out leakage light
-        if label in ['B1', 'C2', 'D2', 'E3', 'F3', 'G4', 'H4', 'I5', 'J5', 'K6']:
-            output[label] = {
-                "arms": ['TL', 'TR', 'BL', 'BR'],
-                "theta": '2.0',
-                "phi": '0',
-            }
-        '''
+    '''
     return output
\ No newline at end of file
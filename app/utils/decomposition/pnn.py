@@ -1,7 +1,14 @@
 # app/utils/decomposition/pnn.py
 
+import cmath
+import math
+
 import numpy as np
-import sympy as sp
+from app.utils.lazy_import import lazy_import
+
+from .givens import apply_left, apply_right, block_from_entries, conj_transpose, rotate_cols, rotate_rows
+
+sp = lazy_import("sympy")  # symbolic matrices only; the numeric path never touches it
 
 # ============================================================================
 # Trigonometric utilities (from trigon.py)
@@ -78,63 +85,111 @@ def U2MZI(dim, m, n, phi, theta, use_sym=False, Lp=1, Lc=1):
         mat[n, n] = -np.sqrt(Lp) * 1j * np.sin(theta)
     return mat
 
+def BS2x2(phi, theta, Lp=1, Lc=1):
+    """2x2 block of U2BS on its two modes; broadcasts over array phi/theta."""
+    return block_from_entries(
+        np.sqrt(Lp) * np.exp(1j * phi) * np.cos(theta),
+        np.sqrt(Lc) * 1j * np.sin(theta),
+        np.sqrt(Lc) * 1j * np.exp(1j * phi) * np.sin(theta),
+        np.sqrt(Lp) * np.cos(theta),
+    )
+
+def MZI2x2(phi, theta, Lp=1, Lc=1):
+    """2x2 block of U2MZI on its two modes; broadcasts over array phi/theta."""
+    return block_from_entries(
+        np.sqrt(Lp) * 1j * np.exp(1j * phi) * np.sin(theta),
+        np.sqrt(Lc) * 1j * np.cos(theta),
+        np.sqrt(Lc) * 1j * np.exp(1j * phi) * np.cos(theta),
+        -np.sqrt(Lp) * 1j * np.sin(theta),
+    )
+
+def _bs_entries(phi, theta):
+    """Entries (t00, t01, t10, t11) of BS2x2 for scalar phi/theta (lossless)."""
+    e, c, s = cmath.exp(1j * phi), math.cos(theta), math.sin(theta)
+    return e * c, 1j * s, 1j * e * s, c
+
+def _mzi_entries(phi, theta):
+    """Entries (t00, t01, t10, t11) of MZI2x2 for scalar phi/theta (lossless)."""
+    e, c, s = cmath.exp(1j * phi), math.cos(theta), math.sin(theta)
+    return 1j * e * s, 1j * c, 1j * e * c, -1j * s
+
 # ============================================================================
 # Clements decomposition (from clements.py)
 # ============================================================================
 
-def decompose_clements(u, block='bs'):
-    assert isinstance(u, np.ndarray)
-    assert isinstance(block, str) and block.strip().lower() in ['bs', 'mzi']
-    if len(u.shape) != 2:
-        raise ValueError("U(N) should be 2-dimension matrix.")
-        
-    if u.shape[0] != u.shape[1]:
-        raise ValueError("U(N) should be a square matrix.")
-        
-    mat = u.copy().astype(np.complex128)
+def _atan2f_scalar(y, x, tolerance=1e-6):
+    """`atan2f` on Python floats (same tolerance rules)."""
+    zero_y = abs(y) <= tolerance
+    zero_x = abs(x) <= tolerance
+    if zero_x and zero_y:
+        return 0.0
+    if zero_x:
+        return math.pi/2 if y > tolerance else -math.pi/2
+    if zero_y:
+        return 0.0 if x > tolerance else math.pi
+    return math.atan2(y, x)
+
+def _angle_diff_scalar(comp_src, comp_dst, offset=0.0, tolerance=1e-6):
+    """`angle_diff` on Python complex numbers (same tolerance rules, wrapped)."""
+    ang_src = 0.0 if abs(comp_src) <= tolerance else cmath.phase(comp_src)
+    ang_dst = 0.0 if abs(comp_dst) <= tolerance else cmath.phase(comp_dst)
+    return (ang_dst - ang_src + offset) % (2 * math.pi)
+
+def _decompose_clements_single(mat, block):
+    """Clements decomposition of one (N, N) complex matrix, modified in place.
+
+    Same elimination order as _decompose_clements_stack, with the angles
+    computed on Python scalars and each 2x2 update applied to two rows or
+    columns through rotate_rows/rotate_cols.
+
+    Returns:
+        phis, thetas: arrays of shape (N-1, ceil(N/2))
+        alphas: array of shape (N,)
+    """
     dim = mat.shape[0]
-    
+    entries = _bs_entries if block == 'bs' else _mzi_entries
+
     row = dim - 1
     col = int(np.ceil(dim / 2))
-    
-    cnt_fore = np.zeros(row, dtype=int)
-    cnt_back = np.ones(row, dtype=int) * (col - 1)
+
+    cnt_fore = [0] * row
+    cnt_back = [col - 1] * row
     if dim % 2 == 1:
-        cnt_back[1::2] = col - 2
-    
+        for i in range(1, row, 2):
+            cnt_back[i] = col - 2
+
     phis = np.zeros((row, col))
     thetas = np.zeros((row, col))
-    alphas = np.zeros(dim)
-    
+
     for p in range(dim-1):
         for q in range(p+1):
             if p % 2 == 0:
                 x = dim - 1 - q
                 y = p - q
+                a, b = mat.item(x, y), mat.item(x, y+1)
                 if block == 'bs':
-                    theta = atan2f(np.abs(mat[x,y]), np.abs(mat[x,y+1]))
-                    phi = angle_diff(mat[x,y+1], mat[x,y], offset=-np.pi/2)
-                    U2block = U2BS
-                elif block == 'mzi':
-                    theta = np.pi/2 - atan2f(np.abs(mat[x,y]), np.abs(mat[x,y+1]))
-                    phi = angle_diff(mat[x,y+1], mat[x,y], offset=np.pi)
-                    U2block = U2MZI
-                mat = mat @ U2block(dim, y, y+1, phi, theta).conj().T
+                    theta = _atan2f_scalar(abs(a), abs(b))
+                    phi = _angle_diff_scalar(b, a, offset=-math.pi/2)
+                else:
+                    theta = math.pi/2 - _atan2f_scalar(abs(a), abs(b))
+                    phi = _angle_diff_scalar(b, a, offset=math.pi)
+                t00, t01, t10, t11 = entries(phi, theta)
+                # mat @ block^H
+                rotate_cols(mat, y, y+1, t00.conjugate(), t10.conjugate(), t01.conjugate(), t11.conjugate())
                 thetas[y, cnt_fore[y]] = theta
                 phis[y, cnt_fore[y]] = phi
                 cnt_fore[y] += 1
             else:
                 x = dim - 1 - p + q
                 y = q
+                a, b = mat.item(x, y), mat.item(x-1, y)
                 if block == 'bs':
-                    theta = atan2f(np.abs(mat[x,y]), np.abs(mat[x-1,y]))
-                    phi = angle_diff(mat[x-1,y], mat[x,y], offset=np.pi/2)
-                    U2block = U2BS
-                elif block == 'mzi':
-                    theta = np.pi/2 - atan2f(np.abs(mat[x,y]), np.abs(mat[x-1,y]))
-                    phi = angle_diff(mat[x-1,y], mat[x,y], offset=0)
-                    U2block = U2MZI
-                mat = U2block(dim, x-1, x, phi, theta) @ mat
+                    theta = _atan2f_scalar(abs(a), abs(b))
+                    phi = _angle_diff_scalar(b, a, offset=math.pi/2)
+                else:
+                    theta = math.pi/2 - _atan2f_scalar(abs(a), abs(b))
+                    phi = _angle_diff_scalar(b, a, offset=0.0)
+                rotate_rows(mat, x-1, x, *entries(phi, theta))
                 thetas[x-1, cnt_back[x-1]] = theta
                 phis[x-1, cnt_back[x-1]] = phi
                 cnt_back[x-1] -= 1
@@ -143,24 +198,156 @@ def decompose_clements(u, block='bs'):
             if p % 2 == 0:
                 continue
             x = dim - 1 - p + q
-            y = q
             cnt_back[x-1] += 1
-            theta = thetas[x-1, cnt_back[x-1]]
             phi = phis[x-1, cnt_back[x-1]]
-            eta1 = mat[x-1, x-1]
-            eta2 = mat[x, x]
+            eta1 = mat.item(x-1, x-1)
+            eta2 = mat.item(x, x)
             if block == 'bs':
-                phi_new = angle_diff(eta2, -eta1, offset=0)
-                mat[x-1, x-1] = eta1 * np.exp(-1j * (phi+phi_new))
-            elif block == 'mzi':
-                phi_new = angle_diff(eta2, eta1, offset=0)
-                mat[x-1, x-1] = -eta1 * np.exp(-1j * (phi+phi_new))
+                phi_new = _angle_diff_scalar(eta2, -eta1)
+                mat[x-1, x-1] = eta1 * cmath.exp(-1j * (phi+phi_new))
+            else:
+                phi_new = _angle_diff_scalar(eta2, eta1)
+                mat[x-1, x-1] = -eta1 * cmath.exp(-1j * (phi+phi_new))
                 mat[x, x] = -eta2
             phis[x-1, cnt_back[x-1]] = phi_new
-    for i in range(dim):
-        alphas[i] = np.angle(mat[i, i])
+    alphas = np.angle(np.diagonal(mat)).copy()
+    return phis, thetas, alphas
+
+def _atan2f_batch(y, x, tolerance=1e-6):
+    """Element-wise `atan2f` for arrays (same tolerance rules)."""
+    zero_y = np.abs(y) <= tolerance
+    zero_x = np.abs(x) <= tolerance
+    rad = np.arctan2(y, x)
+    rad = np.where(zero_x & ~zero_y, np.where(y > tolerance, np.pi/2, -np.pi/2), rad)
+    rad = np.where(~zero_x & zero_y, np.where(x > tolerance, 0.0, np.pi), rad)
+    rad = np.where(zero_x & zero_y, 0.0, rad)
+    return rad
+
+def _angle_diff_batch(comp_src, comp_dst, offset=0, tolerance=1e-6):
+    """Element-wise `angle_diff` for arrays (same tolerance rules, wrapped)."""
+    zero_src = np.abs(comp_src) <= tolerance
+    zero_dst = np.abs(comp_dst) <= tolerance
+    ang_src = np.where(zero_src, 0.0, np.angle(comp_src))
+    ang_dst = np.where(zero_dst, 0.0, np.angle(comp_dst))
+    rad = ang_dst - ang_src + offset
+    return np.mod(rad, 2 * np.pi)
+
+def _decompose_clements_stack(mat, block):
+    """Clements decomposition of a (K, N, N) complex stack, modified in place.
+
+    Runs the same elimination order as the single-matrix algorithm, with
+    every angle and 2x2 update vectorized over the leading batch axis.
+
+    Returns:
+        phis, thetas: arrays of shape (K, N-1, ceil(N/2))
+        alphas: array of shape (K, N)
+    """
+    num, dim = mat.shape[0], mat.shape[-1]
+
+    row = dim - 1
+    col = int(np.ceil(dim / 2))
+
+    cnt_fore = np.zeros(row, dtype=int)
+    cnt_back = np.ones(row, dtype=int) * (col - 1)
+    if dim % 2 == 1:
+        cnt_back[1::2] = col - 2
+
+    phis = np.zeros((num, row, col))
+    thetas = np.zeros((num, row, col))
+
+    for p in range(dim-1):
+        for q in range(p+1):
+            if p % 2 == 0:
+                x = dim - 1 - q
+                y = p - q
+                if block == 'bs':
+                    theta = _atan2f_batch(np.abs(mat[:, x, y]), np.abs(mat[:, x, y+1]))
+                    phi = _angle_diff_batch(mat[:, x, y+1], mat[:, x, y], offset=-np.pi/2)
+                    U2block = BS2x2
+                elif block == 'mzi':
+                    theta = np.pi/2 - _atan2f_batch(np.abs(mat[:, x, y]), np.abs(mat[:, x, y+1]))
+                    phi = _angle_diff_batch(mat[:, x, y+1], mat[:, x, y], offset=np.pi)
+                    U2block = MZI2x2
+                apply_right(mat, y, y+1, conj_transpose(U2block(phi, theta)))
+                thetas[:, y, cnt_fore[y]] = theta
+                phis[:, y, cnt_fore[y]] = phi
+                cnt_fore[y] += 1
+            else:
+                x = dim - 1 - p + q
+                y = q
+                if block == 'bs':
+                    theta = _atan2f_batch(np.abs(mat[:, x, y]), np.abs(mat[:, x-1, y]))
+                    phi = _angle_diff_batch(mat[:, x-1, y], mat[:, x, y], offset=np.pi/2)
+                    U2block = BS2x2
+                elif block == 'mzi':
+                    theta = np.pi/2 - _atan2f_batch(np.abs(mat[:, x, y]), np.abs(mat[:, x-1, y]))
+                    phi = _angle_diff_batch(mat[:, x-1, y], mat[:, x, y], offset=0)
+                    U2block = MZI2x2
+                apply_left(mat, x-1, x, U2block(phi, theta))
+                thetas[:, x-1, cnt_back[x-1]] = theta
+                phis[:, x-1, cnt_back[x-1]] = phi
+                cnt_back[x-1] -= 1
+    for p in range(dim-2, -1, -1):
+        for q in range(p, -1, -1):
+            if p % 2 == 0:
+                continue
+            x = dim - 1 - p + q
+            y = q
+            cnt_back[x-1] += 1
+            phi = phis[:, x-1, cnt_back[x-1]]
+            eta1 = mat[:, x-1, x-1].copy()
+            eta2 = mat[:, x, x].copy()
+            if block == 'bs':
+                phi_new = _angle_diff_batch(eta2, -eta1, offset=0)
+                mat[:, x-1, x-1] = eta1 * np.exp(-1j * (phi+phi_new))
+            elif block == 'mzi':
+                phi_new = _angle_diff_batch(eta2, eta1, offset=0)
+                mat[:, x-1, x-1] = -eta1 * np.exp(-1j * (phi+phi_new))
+                mat[:, x, x] = -eta2
+            phis[:, x-1, cnt_back[x-1]] = phi_new
+    alphas = np.angle(np.diagonal(mat, axis1=-2, axis2=-1)).copy()
     return phis, thetas, alphas
 
+def decompose_clements(u, block='bs'):
+    assert isinstance(u, np.ndarray)
+    assert isinstance(block, str) and block.strip().lower() in ['bs', 'mzi']
+    if len(u.shape) != 2:
+        raise ValueError("U(N) should be 2-dimension matrix.")
+        
+    if u.shape[0] != u.shape[1]:
+        raise ValueError("U(N) should be a square matrix.")
+        
+    mat = u.astype(np.complex128, copy=True)
+    return _decompose_clements_single(mat, block)
+
+def decompose_clements_batch(u, block='bs'):
+    """Clements decomposition of a stack of unitaries in one vectorized pass.
+
+    Args:
+        u (np.ndarray): complex array of shape (K, N, N)
+        block (str): 'bs' or 'mzi', as in `decompose_clements`
+
+    Returns:
+        phis (K, N-1, ceil(N/2)), thetas (K, N-1, ceil(N/2)), alphas (K, N)
+        and errors (K,): max |U_rec - U| per matrix, U_rec rebuilt in one
+        batched `mesh_transfer` call
+    """
+    assert isinstance(u, np.ndarray)
+    assert isinstance(block, str) and block.strip().lower() in ['bs', 'mzi']
+    if len(u.shape) != 3:
+        raise ValueError("U(N) stack should be a 3-dimension array (K, N, N).")
+
+    if u.shape[1] != u.shape[2]:
+        raise ValueError("U(N) should be a square matrix.")
+
+    mat = u.astype(np.complex128, copy=True)
+    phis, thetas, alphas = _decompose_clements_stack(mat, block)
+
+    from .forward import mesh_transfer  # forward.py imports the block builders from here
+    u_rec = mesh_transfer(phis, thetas, alphas, block=block)
+    errors = np.abs(u_rec - u).max(axis=(1, 2))
+    return phis, thetas, alphas, errors
+
 def reconstruct_clements(phis, thetas, alphas, block='bs', Lp_dB=0, Lc_dB=0):
     assert len(phis.squeeze().shape) == 2 or phis.size == 1
     assert len(thetas.squeeze().shape) == 2 or thetas.size == 1
@@ -168,32 +355,14 @@ def reconstruct_clements(phis, thetas, alphas, block='bs', Lp_dB=0, Lc_dB=0):
     assert phis.squeeze().shape == thetas.squeeze().shape
     assert isinstance(block, str) and block.strip().lower() in ['bs', 'mzi']
     
-    if block == 'bs':
-        U2block = U2BS
-    elif block == 'mzi':
-        U2block = U2MZI
-    
     if thetas.size == 1:
         row = 1
         col = 1
     else:
         row, col = thetas.squeeze().shape
     dim = row + 1
-    num = int(dim * (dim - 1) / 2) 
     assert alphas.squeeze().shape[0] == dim
     
-    Lp = 10 ** (Lp_dB / 10)
-    Lc = 10 ** (Lc_dB / 10)
-    
-    sft = np.diag(np.exp(1j * alphas))
-    mat = np.eye(dim)
-    for p in range(col):
-        for q in range(0, row, 2):
-            mat = U2block(dim, q, q+1, phis[q,p], thetas[q,p], Lp=Lp, Lc=Lc) @ mat
-        if p >= col - 1 and dim % 2 == 1:
-            continue
-        for q in range(1, row, 2):
-            mat = U2block(dim, q, q+1, phis[q,p], thetas[q,p], Lp=Lp, Lc=Lc) @ mat
-    mat = sft @ mat
-    return mat
-    
\ No newline at end of file
+    from .forward import mesh_transfer  # forward.py imports the block builders from here
+    return mesh_transfer(phis.reshape(row, col), thetas.reshape(row, col), alphas.reshape(dim),
+                         block=block, Lp_dB=Lp_dB, Lc_dB=Lc_dB)
@@ -0,0 +1,214 @@
+# app/utils/device_discovery.py
+"""
+Concurrent, cached discovery of the serial instruments.
+
+Every candidate serial port is probed in its own thread with a short
+timeout and identified by its protocol fingerprint:
+
+    qontrol  answers "id?" with its device ID, e.g. "Q8iv-0123"
+    switch   answers the channel query EF EF 03 FF 02 <cs> with a framed
+             reply (EF EF or ED FA header, valid checksum)
+
+A cold startup therefore takes about as long as the slowest single port.
+Identified devices are cached on disk keyed by the USB serial number of
+their adapter, so a warm startup maps them to their current (possibly
+renumbered) ports without opening anything. Stale entries are dropped by
+forget() when a cached port turns out not to answer.
+"""
+
+import concurrent.futures
+import json
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+
+import serial
+import serial.tools.list_ports
+
+DEFAULT_CACHE_PATH = Path.home() / ".mzic" / "device_cache.json"
+PROBE_TIMEOUT = 0.25  # s, per read
+BAUDRATE = 115200     # switches and Qontrol both run at 115200 baud
+
+# Same framing as app.devices.switch_device.Switch.get_channel
+_SWITCH_QUERY = bytes([0xEF, 0xEF, 0x03, 0xFF, 0x02])
+SWITCH_QUERY = _SWITCH_QUERY + bytes([sum(_SWITCH_QUERY) & 0xFF])
+SWITCH_HEADERS = (b"\xEF\xEF", b"\xED\xFA")
+QONTROL_ID = re.compile(r"(Q\w+)-([0-9a-fA-F\*]+)")
+
+# Port names worth probing when the adapter reports no USB IDs
+_PORT_PATTERNS = ("COM", "ttyUSB", "ttyACM", "tty.usbserial", "cu.usbserial")
+
+
+def probe_port(port, timeout=PROBE_TIMEOUT):
+    """Identify the device on one serial port.
+
+    Returns:
+        dict | None: {"kind": "switch", "channel": int} or
+        {"kind": "qontrol", "device_id": str}; None if nothing recognisable
+        answered (or the port could not be opened)
+    """
+    try:
+        ser = serial.Serial(port, baudrate=BAUDRATE, timeout=timeout)
+    except (serial.SerialException, OSError, ValueError) as e:
+        logging.debug(f"[Discovery] {port}: cannot open ({e})")
+        return None
+    try:
+        # ASCII first: a Qontrol would take the 0xEF bytes of the switch
+        # query for a binary-mode header, while switches skip anything
+        # that is not an EF EF frame
+        ser.reset_input_buffer()
+        ser.write(b"id?\n")
+        for _ in range(3):
+            line = ser.readline()
+            if not line:
+                break
+            match = QONTROL_ID.search(line.decode("ascii", errors="replace"))
+            if match:
+                return {"kind": "qontrol", "device_id": match.group(0)}
+
+        ser.reset_input_buffer()
+        ser.write(SWITCH_QUERY)
+        reply = ser.read(7)
+        if len(reply) == 7 and reply[:2] in SWITCH_HEADERS and sum(reply[:-1]) & 0xFF == reply[-1]:
+            return {"kind": "switch", "channel": reply[5]}
+        return None
+    except (serial.SerialException, OSError) as e:
+        logging.debug(f"[Discovery] {port}: probe failed ({e})")
+        return None
+    finally:
+        ser.close()
+
+
+class DeviceDiscovery:
+    """Port -> device map of the serial instruments, backed by a disk cache.
+
+    Args:
+        cache_path (str | Path, optional): JSON cache file
+        timeout (float): per-read probe timeout in seconds
+    """
+
+    _last = None  # most recent run, consulted by the drivers
+    _cache_lock = threading.Lock()
+
+    ROLE_ORDER = {"output": 0, "input": 1}
+
+    def __init__(self, cache_path=None, timeout=PROBE_TIMEOUT):
+        self.cache_path = Path(cache_path) if cache_path is not None else DEFAULT_CACHE_PATH
+        self.timeout = float(timeout)
+        self.devices = {}   # port -> {"kind", "serial_number", "cached", ...}
+        self.cache = self._load_cache()
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        with self._cache_lock:
+            try:
+                self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.cache_path, "w") as f:
+                    json.dump(self.cache, f, indent=2)
+            except OSError as e:
+                logging.warning(f"[Discovery] Could not write {self.cache_path}: {e}")
+
+    def remember_role(self, port, role):
+        """Store which role ("input"/"output") a switch plays, so warm starts keep it."""
+        serial_number = self.devices.get(port, {}).get("serial_number")
+        if serial_number in self.cache and self.cache[serial_number].get("role") != role:
+            self.cache[serial_number]["role"] = role
+            self._save_cache()
+        if port in self.devices:
+            self.devices[port]["role"] = role
+
+    def forget(self, port):
+        """Drop a port whose cached identity turned out to be wrong."""
+        info = self.devices.pop(port, None) or {}
+        if self.cache.pop(info.get("serial_number"), None) is not None:
+            self._save_cache()
+            logging.info(f"[Discovery] Forgot stale cache entry for {port}")
+
+    # ------------------------------------------------------------------
+    # Discovery
+    # ------------------------------------------------------------------
+    @staticmethod
+    def candidate_ports():
+        """Serial ports that may hold an instrument (USB adapters and COM ports)."""
+        return [p for p in serial.tools.list_ports.comports()
+                if p.vid is not None or any(pattern in p.device for pattern in _PORT_PATTERNS)]
+
+    def _satisfied(self, expected):
+        counts = {}
+        for info in self.devices.values():
+            counts[info["kind"]] = counts.get(info["kind"], 0) + 1
+        return all(counts.get(kind, 0) >= n for kind, n in expected.items())
+
+    def run(self, expected=None, use_cache=True, extra_ports=()):
+        """Identify the instruments on all candidate ports.
+
+        Args:
+            expected (dict, optional): {"switch": 2, "qontrol": 1}; when the
+                cache already accounts for these, nothing is probed
+            use_cache (bool): False probes every port (cold start)
+            extra_ports (iterable): additional port names to probe
+
+        Returns:
+            DeviceDiscovery: self, with `devices` filled in
+        """
+        t0 = time.perf_counter()
+        ports = self.candidate_ports()
+        serial_numbers = {p.device: p.serial_number for p in ports}
+        names = [p.device for p in ports] + [p for p in extra_ports if p not in serial_numbers]
+        self.devices = {}
+
+        if use_cache:
+            for port, serial_number in serial_numbers.items():
+                if serial_number and serial_number in self.cache:
+                    self.devices[port] = {**self.cache[serial_number], "serial_number": serial_number,
+                                          "port": port, "cached": True}
+
+        if expected is not None and self._satisfied(expected):
+            logging.info(f"[Discovery] {len(self.devices)} device(s) from cache, no probing")
+        else:
+            to_probe = [port for port in names if port not in self.devices]
+            if to_probe:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=len(to_probe)) as pool:
+                    results = dict(zip(to_probe, pool.map(lambda port: probe_port(port, self.timeout), to_probe)))
+                for port, info in results.items():
+                    if info is None:
+                        continue
+                    serial_number = serial_numbers.get(port)
+                    self.devices[port] = {**info, "serial_number": serial_number, "port": port, "cached": False}
+                    if serial_number:
+                        previous = self.cache.get(serial_number, {})
+                        self.cache[serial_number] = {**info, "port": port, "role": previous.get("role")}
+                self._save_cache()
+            logging.info(f"[Discovery] Probed {len(to_probe)} port(s) in {(time.perf_counter() - t0) * 1e3:.0f} ms")
+
+        for port, info in sorted(self.devices.items()):
+            logging.info(f"[Discovery] {port}: {info['kind']}"
+                         f"{' (cached)' if info.get('cached') else ''}")
+        DeviceDiscovery._last = self
+        return self
+
+    def ports(self, kind):
+        """Ports holding `kind`; switches in remembered role order (output first)."""
+        found = [(port, info) for port, info in self.devices.items() if info["kind"] == kind]
+        found.sort(key=lambda item: (self.ROLE_ORDER.get(item[1].get("role"), 2), item[0]))
+        return [port for port, _ in found]
+
+    @classmethod
+    def last(cls):
+        """Most recent DeviceDiscovery run, or None."""
+        return cls._last
+
+    @classmethod
+    def last_ports(cls, kind):
+        return cls._last.ports(kind) if cls._last is not None else []
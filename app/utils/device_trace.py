@@ -0,0 +1,540 @@
+# app/utils/device_trace.py
+"""
+Record and replay of instrument traffic.
+
+While recording, every transport a driver opens (the Qontrol controller,
+switch serial ports, Thorlabs VISA/USBTMC instruments, NI-DAQmx tasks and
+stream readers) is wrapped in a RecordingProxy. Each method call, attribute
+read and attribute write on it is appended to a compact binary trace with
+its perf_counter start time and duration. Replaying hands the drivers
+ReplayProxy objects instead, which answer from the trace without touching
+hardware, so the unmodified driver code above the transport runs exactly as
+in the recorded session.
+
+Drivers open transports through DeviceTrace.open(source, factory, port),
+which is a plain factory() call when no trace is active.
+
+File layout (little endian):
+
+    b"MZTRACE\\x01", f64 wall-clock start
+    records: u8 kind, u16 source id, f64 t (s since start), f64 duration (s),
+             u32 payload length, payload (pickle)
+
+Source names are defined once by a NAME record (payload: utf-8 name).
+
+    python -m app.utils.device_trace session.mztrace [other.mztrace]
+
+prints per-command latency, or the difference between two sessions.
+"""
+
+import argparse
+import builtins
+import collections
+import enum
+import logging
+import os
+import pickle
+import struct
+import threading
+import time
+
+import numpy as np
+
+MAGIC = b"MZTRACE\x01"
+_HEADER = struct.Struct("<d")
+_RECORD = struct.Struct("<BHddI")
+
+NAME, OPEN, CALL, GET, SET = range(5)
+KIND_NAMES = {OPEN: "open", CALL: "call", GET: "get", SET: "set"}
+
+# Stand-ins stored for values that are not data (driver objects)
+_OBJECT = ("__obj__",)
+_SEQ = "__seq__"
+
+TraceEvent = collections.namedtuple(
+    "TraceEvent", "kind source member t duration args kwargs result error outs"
+)
+
+
+class ReplayError(RuntimeError):
+    """The driver asked for something the trace does not contain."""
+
+
+def _is_plain(value):
+    """True for values stored as data rather than proxied."""
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes, bytearray,
+                                           np.generic, enum.Enum)):
+        return True
+    if isinstance(value, np.ndarray):
+        return value.dtype != object
+    if type(value) in (list, tuple, collections.deque):
+        return all(_is_plain(v) for v in value)
+    if type(value) is dict:
+        return all(_is_plain(k) and _is_plain(v) for k, v in value.items())
+    return False
+
+
+def _storable(value):
+    return value if _is_plain(value) else ("__repr__", repr(value))
+
+
+def _signature(args, kwargs):
+    """Comparable form of call arguments; arrays by shape, objects by kind only."""
+    def sig(value):
+        if isinstance(value, np.ndarray):
+            return ("ndarray", value.shape, value.dtype.str)
+        if isinstance(value, tuple) and len(value) == 2 and value[0] == "__repr__":
+            return "__repr__"
+        return value if _is_plain(value) else "__repr__"
+    return pickle.dumps((tuple(sig(a) for a in args), sorted((k, sig(v)) for k, v in kwargs.items())))
+
+
+def _is_marker(value, marker):
+    return isinstance(value, tuple) and len(value) >= 1 and isinstance(value[0], str) and value[0] == marker
+
+
+# ----------------------------------------------------------------------
+# File I/O
+# ----------------------------------------------------------------------
+class TraceWriter:
+    """Append-only binary trace, safe to use from several threads."""
+
+    FLUSH_INTERVAL = 1.0  # s
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "wb")
+        self._file.write(MAGIC + _HEADER.pack(time.time()))
+        self._t0 = time.perf_counter()
+        self._sources = {}
+        self._lock = threading.Lock()
+        self._last_flush = self._t0
+        self.n_records = 0
+
+    def now(self):
+        return time.perf_counter()
+
+    def _source_id(self, source):
+        sid = self._sources.get(source)
+        if sid is None:
+            sid = len(self._sources)
+            self._sources[source] = sid
+            name = source.encode("utf-8")
+            self._file.write(_RECORD.pack(NAME, sid, 0.0, 0.0, len(name)) + name)
+        return sid
+
+    def write(self, kind, source, member, t_start, t_end, args=(), kwargs=None, result=None,
+              error=None, outs=()):
+        payload = (member, tuple(_storable(a) for a in args),
+                   {k: _storable(v) for k, v in (kwargs or {}).items()},
+                   _storable(result), error, tuple(outs))
+        data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if self._file is None:
+                return
+            sid = self._source_id(source)
+            self._file.write(_RECORD.pack(kind, sid, t_start - self._t0, t_end - t_start, len(data)) + data)
+            self.n_records += 1
+            if t_end - self._last_flush > self.FLUSH_INTERVAL:
+                self._file.flush()
+                self._last_flush = t_end
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        logging.info(f"[Trace] Wrote {self.n_records} records to {self.path}")
+
+
+def read_trace(path):
+    """Load a trace file.
+
+    Returns:
+        (float, list[TraceEvent]): wall-clock start time and the events in
+        file order
+    """
+    events, sources = [], {}
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a device trace")
+        (started,) = _HEADER.unpack(f.read(_HEADER.size))
+        while True:
+            head = f.read(_RECORD.size)
+            if len(head) < _RECORD.size:
+                break  # end of file, or a record cut short by a crash
+            kind, sid, t, duration, length = _RECORD.unpack(head)
+            data = f.read(length)
+            if len(data) < length:
+                break
+            if kind == NAME:
+                sources[sid] = data.decode("utf-8")
+                continue
+            member, args, kwargs, result, error, outs = pickle.loads(data)
+            events.append(TraceEvent(kind, sources[sid], member, t, duration, args, kwargs, result, error, outs))
+    return started, events
+
+
+# ----------------------------------------------------------------------
+# Recording
+# ----------------------------------------------------------------------
+class RecordingProxy:
+    """Forward everything to `target` and record it.
+
+    Data-valued attributes and results are recorded as values; driver
+    objects they lead to (channel vectors, VISA sub-systems, NI-DAQmx
+    channel collections, ...) are wrapped in further proxies, named by the
+    path they were reached through ("sense.correction.wavelength",
+    "ai_channels.add_ai_voltage_chan", "devices[0].name").
+    """
+
+    def __init__(self, target, writer, source, prefix=""):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_writer", writer)
+        object.__setattr__(self, "_source", source)
+        object.__setattr__(self, "_prefix", prefix)
+
+    @property
+    def __wrapped__(self):
+        return self._target
+
+    def _wrap(self, value, prefix):
+        """(value to record, value to return) for a non-callable value."""
+        if _is_plain(value):
+            return value, value
+        if type(value) in (list, tuple):
+            items = [self._wrap(v, f"{prefix}[{i}].")[1] for i, v in enumerate(value)]
+            return (_SEQ, len(value)), type(value)(items)
+        return _OBJECT, RecordingProxy(value, self._writer, self._source, prefix)
+
+    def _call(self, member, fn, args, kwargs):
+        t0 = self._writer.now()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._writer.write(CALL, self._source, member, t0, self._writer.now(), args, kwargs,
+                               error=(type(e).__name__, str(e)))
+            raise
+        t1 = self._writer.now()
+        # Arrays the call filled in (e.g. read_many_sample's output block)
+        outs = [(i, a.copy()) for i, a in enumerate(args) if isinstance(a, np.ndarray)]
+        recorded, returned = self._wrap(result, f"{member}().")
+        self._writer.write(CALL, self._source, member, t0, t1, args, kwargs, recorded, outs=outs)
+        return returned
+
+    def __getattr__(self, name):
+        member = self._prefix + name
+        t0 = self._writer.now()
+        value = getattr(self._target, name)
+        t1 = self._writer.now()
+        if callable(value) and not isinstance(value, type) and not _is_plain(value):
+            return lambda *args, **kwargs: self._call(member, value, args, kwargs)
+        recorded, returned = self._wrap(value, member + ".")
+        if recorded is not _OBJECT:
+            self._writer.write(GET, self._source, member, t0, t1, result=recorded)
+        return returned
+
+    def __setattr__(self, name, value):
+        t0 = self._writer.now()
+        setattr(self._target, name, value)
+        self._writer.write(SET, self._source, self._prefix + name, t0, self._writer.now(), (value,))
+
+    def __getitem__(self, key):
+        return self._call(self._prefix + "__getitem__", self._target.__getitem__, (key,), {})
+
+    def __setitem__(self, key, value):
+        return self._call(self._prefix + "__setitem__", self._target.__setitem__, (key, value), {})
+
+    def __enter__(self):
+        self._target.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._call(self._prefix + "__exit__", self._target.__exit__, exc, {})
+
+    def __repr__(self):
+        return f"RecordingProxy({self._source}:{self._prefix or '.'} -> {self._target!r})"
+
+
+# ----------------------------------------------------------------------
+# Replay
+# ----------------------------------------------------------------------
+class ReplaySession:
+    """Recorded answers, served per (source, kind, member) in recorded order.
+
+    Calls on different members may interleave differently than in the
+    recording (e.g. GUI and telemetry threads); each member still gets its
+    own answers in order. A call past the end of its recording raises
+    ReplayError; attribute reads past the end repeat the last value.
+
+    Args:
+        events (list[TraceEvent]): from read_trace
+        realtime (bool): sleep the recorded duration of every call, so the
+            session's timing profile is reproduced
+        strict (bool): raise on arguments that differ from the recording
+            instead of logging them
+    """
+
+    def __init__(self, events, realtime=False, strict=False):
+        self.realtime = realtime
+        self.strict = strict
+        self.mismatches = 0
+        self._queues = collections.defaultdict(collections.deque)
+        self._last = {}
+        self._objects = set()
+        self.sources = []
+        self._claimed = set()
+        self._lock = threading.Lock()
+        for event in events:
+            if event.source not in self.sources:
+                self.sources.append(event.source)
+            self._queues[(event.source, event.kind, event.member)].append(event)
+            parts = event.member.split(".")
+            for i in range(1, len(parts)):
+                self._objects.add((event.source, ".".join(parts[:i]) + "."))
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        return cls(read_trace(path)[1], **kwargs)
+
+    def has(self, source, kind, member):
+        return (source, kind, member) in self._queues
+
+    def is_object(self, source, prefix):
+        return (source, prefix) in self._objects
+
+    def open(self, source):
+        """ReplayProxy for a recorded transport."""
+        with self._lock:
+            if source not in self.sources:
+                raise ReplayError(f"{source} was not opened in the recorded session")
+            self._claimed.add(source)
+        return ReplayProxy(self, source)
+
+    def unclaimed(self, prefix):
+        """Recorded sources starting with `prefix` not opened yet, in recorded order."""
+        return [s for s in self.sources if s.startswith(prefix) and s not in self._claimed]
+
+    def _next(self, source, kind, member):
+        with self._lock:
+            queue = self._queues.get((source, kind, member))
+            if queue:
+                event = queue.popleft()
+                self._last[(source, kind, member)] = event
+                return event
+            if kind == GET and (source, kind, member) in self._last:
+                return self._last[(source, kind, member)]
+        raise ReplayError(f"No more recorded {KIND_NAMES[kind]} of {source}:{member}")
+
+    def _check(self, event, args, kwargs):
+        if _signature(event.args, event.kwargs) == _signature(args, kwargs):
+            return
+        self.mismatches += 1
+        message = (f"[Trace] {event.source}:{event.member} called with {args} {kwargs}, "
+                   f"recorded {event.args} {event.kwargs}")
+        if self.strict:
+            raise ReplayError(message)
+        logging.debug(message)
+
+    def _value(self, source, value, prefix):
+        if _is_marker(value, _OBJECT[0]):
+            return ReplayProxy(self, source, prefix)
+        if _is_marker(value, _SEQ):
+            return [ReplayProxy(self, source, f"{prefix}[{i}].") for i in range(value[1])]
+        return value
+
+    def call(self, source, member, args, kwargs):
+        event = self._next(source, CALL, member)
+        self._check(event, args, kwargs)
+        if self.realtime and event.duration > 0:
+            time.sleep(event.duration)
+        for i, array in event.outs:
+            if i < len(args) and isinstance(args[i], np.ndarray):
+                args[i][...] = array
+        if event.error is not None:
+            # Builtin exceptions (IndexError ending an iteration, TimeoutError, ...)
+            # are raised as such, driver-specific ones as ReplayError
+            error_type = getattr(builtins, event.error[0], None)
+            if isinstance(error_type, type) and issubclass(error_type, Exception):
+                raise error_type(event.error[1])
+            raise ReplayError(f"{event.error[0]}: {event.error[1]}")
+        return self._value(source, event.result, f"{member}().")
+
+    def get(self, source, member):
+        return self._value(source, self._next(source, GET, member).result, member + ".")
+
+    def set(self, source, member, value):
+        if self.has(source, SET, member):
+            self._check(self._next(source, SET, member), (value,), {})
+
+
+class ReplayProxy:
+    """Stand-in for a recorded transport (see ReplaySession)."""
+
+    def __init__(self, session, source, prefix=""):
+        object.__setattr__(self, "_session", session)
+        object.__setattr__(self, "_source", source)
+        object.__setattr__(self, "_prefix", prefix)
+
+    def __getattr__(self, name):
+        member = self._prefix + name
+        session, source = self._session, self._source
+        if session.has(source, CALL, member):
+            return lambda *args, **kwargs: session.call(source, member, args, kwargs)
+        if session.has(source, GET, member):
+            return session.get(source, member)
+        if session.is_object(source, member + "."):
+            return ReplayProxy(session, source, member + ".")
+        raise AttributeError(f"{source}:{member} is not in the trace")
+
+    def __setattr__(self, name, value):
+        self._session.set(self._source, self._prefix + name, value)
+
+    def __getitem__(self, key):
+        return self._session.call(self._source, self._prefix + "__getitem__", (key,), {})
+
+    def __setitem__(self, key, value):
+        return self._session.call(self._source, self._prefix + "__setitem__", (key, value), {})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self._session.has(self._source, CALL, self._prefix + "__exit__"):
+            self._session.call(self._source, self._prefix + "__exit__", exc, {})
+        return False
+
+    def __repr__(self):
+        return f"ReplayProxy({self._source}:{self._prefix or '.'})"
+
+
+# ----------------------------------------------------------------------
+# Process-wide switch
+# ----------------------------------------------------------------------
+class DeviceTrace:
+    """Process-wide recording/replay state used by the drivers."""
+
+    _writer = None
+    _session = None
+
+    @classmethod
+    def record(cls, path):
+        cls.stop()
+        cls._writer = TraceWriter(path)
+        logging.info(f"[Trace] Recording device traffic to {path}")
+        return cls._writer
+
+    @classmethod
+    def replay(cls, path, realtime=False, strict=False):
+        cls.stop()
+        cls._session = ReplaySession.from_file(path, realtime=realtime, strict=strict)
+        logging.info(f"[Trace] Replaying {path} ({len(cls._session.sources)} sources)")
+        return cls._session
+
+    @classmethod
+    def stop(cls):
+        if cls._writer is not None:
+            cls._writer.close()
+        cls._writer = None
+        cls._session = None
+
+    @classmethod
+    def mode(cls):
+        return "record" if cls._writer else "replay" if cls._session else "off"
+
+    @classmethod
+    def open(cls, source, factory, port=None):
+        """Open a transport through the active trace.
+
+        Args:
+            source (str): device kind, e.g. "qontrol", "switch", "daq.task"
+            factory (callable): opens the real transport; not called on replay
+            port (str, optional): port/resource, appended to the source name
+        """
+        name = f"{source}:{port}" if port is not None else source
+        if cls._session is not None:
+            return cls._session.open(name)
+        if cls._writer is None:
+            return factory()
+        t0 = cls._writer.now()
+        target = factory()
+        cls._writer.write(OPEN, name, "", t0, cls._writer.now())
+        return RecordingProxy(target, cls._writer, name)
+
+    @classmethod
+    def replay_port(cls, source):
+        """Next recorded port of `source` not yet opened during replay, else None."""
+        if cls._session is None:
+            return None
+        unclaimed = cls._session.unclaimed(source + ":")
+        return unclaimed[0][len(source) + 1:] if unclaimed else None
+
+    @classmethod
+    def recorded(cls, source):
+        """True if `source` was opened in the trace being replayed."""
+        return cls._session is not None and source in cls._session.sources
+
+    @classmethod
+    def replay_sources(cls, source):
+        """Ports recorded for `source` (replay only)."""
+        if cls._session is None:
+            return []
+        return [s[len(source) + 1:] for s in cls._session.sources if s.startswith(source + ":")]
+
+
+# ----------------------------------------------------------------------
+# Latency profiles
+# ----------------------------------------------------------------------
+def latency_profile(events):
+    """Per-command latency statistics (ms) of the calls in a trace.
+
+    Returns:
+        dict: (source, member) -> {"n", "mean", "p50", "p95", "max", "total"}
+    """
+    durations = collections.defaultdict(list)
+    for event in events:
+        if event.kind == CALL:
+            durations[(event.source, event.member)].append(event.duration * 1e3)
+    profile = {}
+    for key, values in durations.items():
+        values = np.asarray(values)
+        profile[key] = {
+            "n": len(values),
+            "mean": float(values.mean()),
+            "p50": float(np.percentile(values, 50)),
+            "p95": float(np.percentile(values, 95)),
+            "max": float(values.max()),
+            "total": float(values.sum()),
+        }
+    return profile
+
+
+def format_profile(profile, baseline=None):
+    """Text table of a latency profile, with the change against `baseline`."""
+    lines = [f"{'source:command':<48} {'n':>6} {'mean':>9} {'p50':>9} {'p95':>9} {'max':>9}"
+             + (f" {'d mean':>9} {'d p95':>9}" if baseline is not None else "")]
+    for (source, member), stats in sorted(profile.items(), key=lambda kv: -kv[1]["total"]):
+        line = (f"{source + ':' + member:<48.48} {stats['n']:>6} {stats['mean']:>9.3f} {stats['p50']:>9.3f} "
+                f"{stats['p95']:>9.3f} {stats['max']:>9.3f}")
+        if baseline is not None:
+            base = baseline.get((source, member))
+            line += (f" {stats['mean'] - base['mean']:>+9.3f} {stats['p95'] - base['p95']:>+9.3f}"
+                     if base else f" {'new':>9} {'':>9}")
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-command latency of a device trace (ms).")
+    parser.add_argument("trace")
+    parser.add_argument("baseline", nargs="?", help="earlier trace to compare against")
+    args = parser.parse_args(argv)
+    profile = latency_profile(read_trace(args.trace)[1])
+    baseline = latency_profile(read_trace(args.baseline)[1]) if args.baseline else None
+    print(format_profile(profile, baseline))
+
+
+if __name__ == "__main__":
+    main()
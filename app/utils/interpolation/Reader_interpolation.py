@@ -4,12 +4,15 @@ Interpolation module for phase correction.
 Handles sweep file loading and angle transformation calculations.
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
-from scipy.optimize import curve_fit
 import os
 from typing import Tuple, List, Optional, Dict
+from app.utils.lazy_import import lazy_import, lazy_attr
+
+# Loaded on first use: pandas for reading sweep files, pyplot for create_plot
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
+curve_fit = lazy_attr("scipy.optimize", "curve_fit")
 
 class InterpolationManager:
     """Manages interpolation operations for phase correction"""
@@ -189,7 +192,7 @@ class InterpolationManager:
             
         return y, interpolated
     
-    def create_plot(self, angle_input_rad: float) -> plt.Figure:
+    def create_plot(self, angle_input_rad: float) -> "plt.Figure":
         """
         Create interpolation plots without showing them.
         
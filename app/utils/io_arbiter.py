@@ -0,0 +1,126 @@
+# app/utils/io_arbiter.py
+"""
+Prioritized command queue for a shared serial/VISA device.
+
+Every device driver owns one IOArbiter. All I/O on the link is submitted
+as a callable and executed by the arbiter's single owner thread, so
+commands from the Tk main loop, measurement workers and telemetry pollers
+never interleave on the wire. Pending commands run in priority order:
+
+    EXPERIMENT   writes that define the experiment state (currents, switch)
+    MEASUREMENT  reads taken as part of an experiment
+    HOUSEKEEPING status and telemetry polls
+
+A command that is already running is never interrupted, so the longest an
+experiment write waits is one in-flight command.
+"""
+
+import itertools
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+EXPERIMENT = 0
+MEASUREMENT = 1
+HOUSEKEEPING = 2
+
+PRIORITY_NAMES = {EXPERIMENT: "experiment", MEASUREMENT: "measurement", HOUSEKEEPING: "housekeeping"}
+
+
+class IOArbiter:
+    """Single owner thread executing device commands by priority.
+
+    Args:
+        name (str): device name, used for the thread name and logs
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()  # FIFO within one priority class
+        self._pending_keys = {}
+        self._keys_lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_thread(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"io-{self.name}", daemon=True)
+                self._thread.start()
+
+    @property
+    def in_owner_thread(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, fn, *args, priority=MEASUREMENT, key=None, **kwargs):
+        """Queue `fn(*args, **kwargs)` and return a Future for its result.
+
+        Args:
+            priority (int): EXPERIMENT, MEASUREMENT or HOUSEKEEPING
+            key (hashable): optional; while a command with the same key is
+                still queued, that command's future is returned instead of
+                queueing a duplicate (keeps slow polls from piling up)
+
+        Returns:
+            concurrent.futures.Future
+        """
+        if key is not None:
+            with self._keys_lock:
+                pending = self._pending_keys.get(key)
+                if pending is not None:
+                    return pending
+                future = Future()
+                self._pending_keys[key] = future
+        else:
+            future = Future()
+
+        if self.in_owner_thread:
+            # Nested call from a running command: run inline, queueing would deadlock
+            self._execute(fn, args, kwargs, future, key)
+            return future
+
+        self._ensure_thread()
+        self._queue.put((priority, next(self._order), fn, args, kwargs, future, key))
+        return future
+
+    def call(self, fn, *args, priority=MEASUREMENT, timeout=None, **kwargs):
+        """Submit and wait; returns the result or raises the command's exception."""
+        return self.submit(fn, *args, priority=priority, **kwargs).result(timeout=timeout)
+
+    def _execute(self, fn, args, kwargs, future, key):
+        if key is not None:
+            with self._keys_lock:
+                self._pending_keys.pop(key, None)
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    def _run(self):
+        while True:
+            priority, _, fn, args, kwargs, future, key = self._queue.get()
+            if fn is None:
+                break
+            try:
+                self._execute(fn, args, kwargs, future, key)
+            except Exception as e:  # never let the owner thread die
+                logging.error(f"[IOArbiter][{self.name}] {PRIORITY_NAMES.get(priority)} command failed: {e}")
+
+    @property
+    def pending(self):
+        """Number of queued commands."""
+        return self._queue.qsize()
+
+    def close(self, timeout=2.0):
+        """Finish queued commands and stop the owner thread."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put((HOUSEKEEPING + 1, next(self._order), None, (), {}, None, None))
+        if not self.in_owner_thread:
+            thread.join(timeout=timeout)
+        self._thread = None
@@ -0,0 +1,120 @@
+# app/utils/lazy_import.py
+"""
+Deferred imports for heavy and optional dependencies.
+
+    sp = lazy_import("sympy")                 # module, imported on first use
+    expm = lazy_attr("scipy.linalg", "expm")  # single name, imported on first use
+
+The core modules (decomposition, calibration, mapping, device drivers) use
+these for the GUI stack and the vendor SDKs (nidaqmx, qontrol, pyvisa,
+ThorlabsPM100), so they import on a headless machine without those packages
+and without paying their import time. A missing package surfaces as
+ImportError at first use instead of at import.
+
+A lazy_attr stand-in can be called and its attributes read, but it is not the
+real object: do not use it with isinstance() or in an `except` clause. Modules
+can be used that way (`except nidaqmx.errors.DaqError` loads nidaqmx when the
+clause is evaluated).
+"""
+
+import importlib
+import sys
+import threading
+import types
+
+_lock = threading.RLock()
+
+
+class LazyModule(types.ModuleType):
+    """Module stand-in that imports the real module on first attribute access."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_target"]
+        if module is None:
+            with _lock:
+                module = self.__dict__["_lazy_target"]
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__["_lazy_target"] = module
+        return module
+
+    @property
+    def is_loaded(self):
+        return self.__dict__["_lazy_target"] is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+class LazyAttr:
+    """Stand-in for `from module import name`, resolved on first call or attribute access."""
+
+    def __init__(self, module, name):
+        self._module = module
+        self._name = name
+        self._target = None
+
+    def _load(self):
+        if self._target is None:
+            with _lock:
+                if self._target is None:
+                    self._target = getattr(importlib.import_module(self._module), self._name)
+        return self._target
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        return f"<lazy {self._module}.{self._name}>"
+
+
+def lazy_import(name):
+    """Return module `name`, deferring the import until it is first used.
+
+    Args:
+        name (str): dotted module name, e.g. "nidaqmx" or "scipy.optimize"
+
+    Returns:
+        module: the module itself if it is already imported, else a LazyModule
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+
+
+def lazy_attr(module, name):
+    """Return `module.name`, deferring the import until it is first used.
+
+    Args:
+        module (str): dotted module name
+        name (str): attribute of that module (class or function)
+
+    Returns:
+        object: the attribute if the module is already imported, else a LazyAttr
+    """
+    loaded = sys.modules.get(module)
+    if loaded is not None and not isinstance(loaded, LazyModule) and hasattr(loaded, name):
+        return getattr(loaded, name)
+    return LazyAttr(module, name)
+
+
+def is_loaded(name):
+    """True if module `name` has really been imported (not just proxied)."""
+    return name in sys.modules
@@ -0,0 +1,161 @@
+# app/utils/mesh_config.py
+"""
+Array-backed configuration of an MZI mesh.
+
+A MeshConfig holds theta/phi phases (in π units) and the heater currents
+(mA) solved for them, one entry per MZI slot, in NumPy arrays. Slots are
+identified by their chip label ("A1", "B3", ...); `index` maps labels to
+slots. Only slots flagged in `active` are part of the configuration,
+mirroring the JSON grid where unselected MZIs are simply absent.
+
+JSON is only used at the import/export boundary (`from_json`/`to_json`),
+which keeps the format used by the grid widget and AppData.default_json_grid:
+
+    {"A1": {"arms": ["TL", "TR", "BL", "BR"], "theta": "0.5", "phi": "1.0"}, ...}
+"""
+
+import json
+
+import numpy as np
+
+DEFAULT_ARMS = ['TL', 'TR', 'BL', 'BR']
+
+
+class MeshConfig:
+    """Theta/phi phases and heater currents of every MZI slot in a mesh.
+
+    Args:
+        labels (list[str]): slot labels, in slot order
+    """
+
+    def __init__(self, labels):
+        self.labels = tuple(labels)
+        self.index = {label: slot for slot, label in enumerate(self.labels)}
+        n_slots = len(self.labels)
+        self.theta = np.zeros(n_slots)
+        self.phi = np.zeros(n_slots)
+        self.theta_current = np.full(n_slots, np.nan)  # NaN = not solved
+        self.phi_current = np.full(n_slots, np.nan)
+        self.active = np.zeros(n_slots, dtype=bool)
+        self.arms = {}  # label -> list of selected arms (GUI only)
+
+    @classmethod
+    def for_grid(cls, n):
+        """Empty configuration containing every MZI label of an n x n mesh."""
+        from app.utils.decomposition.mapping.mzi_lut import get_mesh_labels
+        return cls(get_mesh_labels(n))
+
+    # ------------------------------------------------------------------
+    # JSON boundary
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_json(cls, data, n=None):
+        """Build a MeshConfig from a JSON grid (str or already-parsed dict).
+
+        Args:
+            data (str | dict): {label: {"arms": [...], "theta": ..., "phi": ...}}
+            n (int, optional): mesh size; when given, slots follow the mesh
+                label order, otherwise the order of the JSON keys
+
+        Returns:
+            MeshConfig
+        """
+        if isinstance(data, str):
+            data = json.loads(data)
+        if n is not None:
+            mesh = cls.for_grid(n)
+            extra = [label for label in data if label not in mesh.index]
+            if extra:
+                mesh = cls(list(mesh.labels) + extra)
+        else:
+            mesh = cls(list(data.keys()))
+
+        for label, entry in data.items():
+            slot = mesh.index[label]
+            mesh.theta[slot] = _to_float(entry.get("theta", 0))
+            mesh.phi[slot] = _to_float(entry.get("phi", 0))
+            mesh.active[slot] = True
+            if "arms" in entry:
+                mesh.arms[label] = list(entry["arms"])
+        return mesh
+
+    def to_json(self, currents=False):
+        """Export active slots in the JSON grid format.
+
+        Args:
+            currents (bool): export the solved currents instead of the phases
+                (slots without a solved current keep their phase value)
+
+        Returns:
+            dict: {label: {"arms": [...], "theta": str, "phi": str}}
+        """
+        theta, phi = self.applied_values() if currents else (self.theta, self.phi)
+        output = {}
+        for slot in np.flatnonzero(self.active):
+            label = self.labels[slot]
+            output[label] = {
+                "arms": list(self.arms.get(label, DEFAULT_ARMS)),
+                "theta": str(theta[slot]),
+                "phi": str(phi[slot]),
+            }
+        return output
+
+    # ------------------------------------------------------------------
+    # Slot access
+    # ------------------------------------------------------------------
+    def set(self, label, theta=None, phi=None):
+        """Set the phases (π units) of one MZI and mark it active."""
+        slot = self.index[label]
+        if theta is not None:
+            self.theta[slot] = float(theta)
+        if phi is not None:
+            self.phi[slot] = float(phi)
+        self.active[slot] = True
+
+    def set_slots(self, labels, theta, phi):
+        """Vectorized `set` for a sequence of labels and matching value arrays."""
+        slots = np.fromiter((self.index[label] for label in labels), dtype=int, count=len(labels))
+        self.theta[slots] = theta
+        self.phi[slots] = phi
+        self.active[slots] = True
+
+    def applied_values(self):
+        """Values sent to the heaters: solved currents, else the raw phase value.
+
+        The fallback matches the JSON grid path, where a slot whose current
+        could not be solved kept its original theta/phi entry.
+        """
+        theta = np.where(np.isnan(self.theta_current), self.theta, self.theta_current)
+        phi = np.where(np.isnan(self.phi_current), self.phi, self.phi_current)
+        return theta, phi
+
+    def active_labels(self):
+        return [self.labels[slot] for slot in np.flatnonzero(self.active)]
+
+    def copy(self):
+        mesh = MeshConfig(self.labels)
+        mesh.theta = self.theta.copy()
+        mesh.phi = self.phi.copy()
+        mesh.theta_current = self.theta_current.copy()
+        mesh.phi_current = self.phi_current.copy()
+        mesh.active = self.active.copy()
+        mesh.arms = {label: list(arms) for label, arms in self.arms.items()}
+        return mesh
+
+    def __contains__(self, label):
+        slot = self.index.get(label)
+        return slot is not None and bool(self.active[slot])
+
+    def __len__(self):
+        return int(self.active.sum())
+
+    def __repr__(self):
+        return f"MeshConfig({len(self)}/{len(self.labels)} active slots)"
+
+
+def _to_float(value):
+    """Parse a JSON theta/phi entry; unparseable values become NaN."""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
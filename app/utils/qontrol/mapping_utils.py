@@ -1,3 +1,7 @@
+from functools import lru_cache
+
+import numpy as np
+
 from app.utils.appdata import AppData
 
 def get_mapping_functions(grid_size=None):
@@ -25,4 +29,57 @@ def get_mapping_functions(grid_size=None):
         return qmapper12x12.create_label_mapping, qmapper12x12.apply_grid_mapping
     else:
         from app.utils.qontrol import qmapper8x8
-        return qmapper8x8.create_label_mapping, qmapper8x8.apply_grid_mapping
\ No newline at end of file
+        return qmapper8x8.create_label_mapping, qmapper8x8.apply_grid_mapping
+
+
+def grid_to_channel_values(grid_data, grid_size, current_limit):
+    """
+    Map grid values to Qontrol channels without touching the device.
+
+    Uses the same label map and clamping as apply_grid_mapping, so the result
+    can be cached and later re-applied with apply_qontrol_mapping.
+
+    Args:
+        grid_data (MeshConfig | str | dict): mesh configuration, or a JSON grid
+            {label: {"theta": ..., "phi": ...}} holding the values to apply
+        grid_size (str): grid size in format "NxN"
+        current_limit (float): upper clamp for every channel
+
+    Returns:
+        dict: {channel: current}
+    """
+    from app.utils.mesh_config import MeshConfig
+
+    mesh = grid_data if isinstance(grid_data, MeshConfig) else MeshConfig.from_json(grid_data)
+    theta_ch, phi_ch = _slot_channels(str(grid_size), mesh.labels)
+    theta, phi = mesh.applied_values()
+
+    theta = clamp_currents(theta, current_limit)
+    phi = clamp_currents(phi, current_limit)
+
+    channel_values = {}
+    for slot in np.flatnonzero(mesh.active & (theta_ch >= 0)):
+        channel_values[int(theta_ch[slot])] = float(theta[slot])
+        channel_values[int(phi_ch[slot])] = float(phi[slot])
+    return channel_values
+
+
+def clamp_currents(currents, current_limit):
+    """Same rules as clamp_value, vectorized: clip to [0, limit], unparseable (NaN) -> 0."""
+    limit = np.nan if current_limit is None else float(current_limit)
+    return np.nan_to_num(np.maximum(np.minimum(currents, limit), 0.0), nan=0.0)
+
+
+@lru_cache(maxsize=16)
+def _slot_channels(grid_size, labels):
+    """Theta/phi channel of every slot in `labels` (-1 when the label is not mapped)."""
+    create_label_mapping, _ = get_mapping_functions(grid_size)
+    label_map = create_label_mapping(int(grid_size.split('x')[0]))
+    theta_ch = np.full(len(labels), -1, dtype=int)
+    phi_ch = np.full(len(labels), -1, dtype=int)
+    for slot, label in enumerate(labels):
+        if label in label_map:
+            theta_ch[slot], phi_ch[slot] = label_map[label]
+    theta_ch.flags.writeable = False
+    phi_ch.flags.writeable = False
+    return theta_ch, phi_ch
@@ -1,10 +1,16 @@
 # utils/qmapper8x8.py
-from app.imports import *
 import json
-from jsonschema import validate
+import logging
+import numpy as np
+from app.utils.lazy_import import lazy_attr
 from collections import defaultdict
+from app.utils.qontrol.mapping_utils import grid_to_channel_values
+from app.utils.appdata import AppData
+
+validate = lazy_attr("jsonschema", "validate")  # imported on first validation
 
 # JSON schema for validation
+
 MAPPING_SCHEMA = {
     "type": "object",
     "patternProperties": {
@@ -123,28 +129,12 @@ def print_mapping(label_map):
 def apply_grid_mapping(qontrol_device, grid_data, grid_size):
     """Main function to map grid values to Qontrol channels"""
     try:
-        n = int(grid_size.split('x')[0])
-        label_map = create_label_mapping(n)
-        
-        # Parse grid export data
-        export_data = json.loads(grid_data)
-        channel_values = {}
-        
         # Get current limit from device config
         current_limit = qontrol_device.config.get("globalcurrrentlimit")
-        
-        # Map values to channels
-        for label, data in export_data.items():
-            if label in label_map:
-                theta_ch, phi_ch = label_map[label]
-                
-                # Clamp values to safety limits
-                theta = clamp_value(data.get("theta", 0), current_limit)
-                phi = clamp_value(data.get("phi", 0), current_limit)
-                
-                channel_values[theta_ch] = theta
-                channel_values[phi_ch] = phi
-        
+
+        # Map values to channels (clamped to safety limits)
+        channel_values = grid_to_channel_values(grid_data, grid_size, current_limit)
+
         # Apply to Qontrol device
         apply_qontrol_mapping(qontrol_device, channel_values)
         
@@ -165,11 +155,20 @@ def apply_qontrol_mapping(qontrol_device, channel_map):
         logging.info("Qontrol device not connected")
         return
     
+    # One diffed bulk write; channels not in the map keep their current
+    currents = np.full(qontrol_device.device.n_chs, np.nan)
     for channel, current in channel_map.items():
         try:
-            qontrol_device.set_current(channel, current)
-        except Exception as e:
+            if int(channel) < 0:
+                raise IndexError(f"negative channel {channel}")
+            currents[int(channel)] = current
+        except (ValueError, TypeError, IndexError) as e:
             logging.error(f"Channel {channel} error: {str(e)}")
+    try:
+        written, elapsed = qontrol_device.set_currents(currents)
+        logging.debug(f"Applied {written} changed channel(s) in {elapsed * 1e3:.1f} ms")
+    except Exception as e:
+        logging.error(f"Bulk current write failed: {str(e)}")
 
 
 # Example usage:
@@ -0,0 +1,94 @@
+# app/utils/ring_buffer.py
+"""
+Fixed-size multi-channel sample buffer shared between an acquisition
+thread (writer) and any number of readers.
+
+Samples are stored column-wise in a preallocated (channels, capacity)
+array. Every sample has an absolute index (`total` counts all samples
+ever written), which lets a reader remember where "now" is and later ask
+for exactly the samples acquired after that point.
+"""
+
+import threading
+
+import numpy as np
+
+
+class RingBuffer:
+    """Thread-safe ring buffer of (channels, samples) blocks.
+
+    Args:
+        n_channels (int): number of channels (rows)
+        capacity (int): samples kept per channel
+        dtype: sample dtype
+    """
+
+    def __init__(self, n_channels, capacity, dtype=np.float64):
+        self.n_channels = int(n_channels)
+        self.capacity = int(capacity)
+        self._data = np.zeros((self.n_channels, self.capacity), dtype=dtype)
+        self._total = 0
+        self._cond = threading.Condition()
+
+    @property
+    def total(self):
+        """Number of samples written since creation."""
+        with self._cond:
+            return self._total
+
+    def __len__(self):
+        """Number of samples currently held (at most `capacity`)."""
+        with self._cond:
+            return min(self._total, self.capacity)
+
+    def write(self, block):
+        """Append a (channels, k) block; the oldest samples are overwritten."""
+        block = np.asarray(block, dtype=self._data.dtype).reshape(self.n_channels, -1)
+        k = block.shape[1]
+        if k > self.capacity:
+            block = block[:, -self.capacity:]
+        n = block.shape[1]
+        with self._cond:
+            start = (self._total + k - n) % self.capacity
+            first = min(n, self.capacity - start)
+            self._data[:, start:start + first] = block[:, :first]
+            self._data[:, :n - first] = block[:, first:]
+            self._total += k
+            self._cond.notify_all()
+
+    def _slice(self, start, stop):
+        """Copy of samples [start, stop) by absolute index (lock held)."""
+        i0, i1 = start % self.capacity, stop % self.capacity
+        if stop - start == 0:
+            return self._data[:, :0].copy()
+        if i0 < i1:
+            return self._data[:, i0:i1].copy()
+        return np.concatenate((self._data[:, i0:], self._data[:, :i1]), axis=1)
+
+    def latest(self, n):
+        """The most recent `n` samples (fewer if not yet available)."""
+        with self._cond:
+            n = min(int(n), self._total, self.capacity)
+            return self._slice(self._total - n, self._total)
+
+    def since(self, start, n=None):
+        """Samples from absolute index `start` on (at most `n` of them).
+
+        Raises:
+            IndexError: if part of the range was already overwritten
+        """
+        with self._cond:
+            stop = self._total if n is None else min(self._total, start + int(n))
+            if start < self._total - self.capacity:
+                raise IndexError("Requested samples were overwritten; increase the buffer size")
+            return self._slice(start, max(start, stop))
+
+    def wait_for(self, count, timeout=None):
+        """Block until `total` reaches `count`; returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._total >= count, timeout=timeout)
+
+    def clear(self):
+        with self._cond:
+            self._total = 0
+            self._cond.notify_all()
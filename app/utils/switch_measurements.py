@@ -1,6 +1,5 @@
 # app/utils/switch_measurements.py
 
-from app.imports import *
 import time
 from typing import List, Optional, Union
 import logging
@@ -0,0 +1,300 @@
+# app/utils/telemetry.py
+"""
+Background device telemetry.
+
+One long-lived TelemetryService per device polls it at a fixed rate from a
+worker thread, appends every reading to preallocated ring buffers and
+publishes an immutable TelemetrySnapshot. Publishing is a single reference
+swap, so readers (GUI, MQTT gateway, experiment runners) take the latest
+snapshot without locks and never wait on serial I/O.
+
+Services are kept in a class-level registry by name ("qontrol",
+"thorlabs", "thorlabs1", "daq", ...), so every window sees the same one.
+"""
+
+import logging
+import threading
+import time
+import types
+
+import numpy as np
+
+from app.utils.io_arbiter import HOUSEKEEPING
+from app.utils.ring_buffer import RingBuffer
+
+DEFAULT_RATES_HZ = {"qontrol": 1.0, "thorlabs": 5.0, "daq": 5.0}
+DEFAULT_HISTORY = 600  # readings kept per field
+
+
+class TelemetrySnapshot:
+    """Immutable result of one poll.
+
+    Attributes:
+        source (str): service name
+        seq (int): poll counter, increases with every published snapshot
+        timestamp (float): time.time() of the reading
+        values (Mapping[str, np.ndarray]): read-only array per field
+        meta (Mapping[str, Any]): other values returned by the reader
+        error (str | None): reader exception, values are NaN when set
+    """
+
+    __slots__ = ("source", "seq", "timestamp", "values", "meta", "error")
+
+    def __init__(self, source, seq, timestamp, values, meta=None, error=None):
+        frozen = {}
+        for name, array in values.items():
+            array = np.array(array, dtype=float)
+            array.flags.writeable = False
+            frozen[name] = array
+        object.__setattr__(self, "source", source)
+        object.__setattr__(self, "seq", seq)
+        object.__setattr__(self, "timestamp", timestamp)
+        object.__setattr__(self, "values", types.MappingProxyType(frozen))
+        object.__setattr__(self, "meta", types.MappingProxyType(dict(meta or {})))
+        object.__setattr__(self, "error", error)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TelemetrySnapshot is immutable")
+
+    @property
+    def age(self):
+        """Seconds since the reading was taken."""
+        return time.time() - self.timestamp
+
+    def __repr__(self):
+        return f"TelemetrySnapshot({self.source!r}, seq={self.seq}, fields={list(self.values)})"
+
+
+class TelemetryService:
+    """Poll one device into ring buffers and publish snapshots.
+
+    Args:
+        name (str): registry key and snapshot source
+        read_fn (callable): returns {field: values, ...}; fields listed in
+            `fields` are stored as arrays, any other key goes to `meta`.
+            Returning None skips the poll (nothing new to publish).
+        fields (dict): field name -> number of values per reading
+        rate_hz (float): polling rate
+        history (int): readings kept per field
+    """
+
+    _services = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, name, read_fn, fields, rate_hz=1.0, history=DEFAULT_HISTORY):
+        self.name = name
+        self.read_fn = read_fn
+        self.fields = {field: int(n) for field, n in fields.items()}
+        self.rate_hz = float(rate_hz)
+        self.buffers = {field: RingBuffer(n, history) for field, n in self.fields.items()}
+        self.timestamps = RingBuffer(1, history)
+        self._snapshot = None
+        self._seq = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Registry
+    # ------------------------------------------------------------------
+    @classmethod
+    def register(cls, service, start=True):
+        """Make `service` the one for its name, stopping any previous one."""
+        with cls._registry_lock:
+            previous = cls._services.get(service.name)
+            cls._services[service.name] = service
+        if previous is not None and previous is not service:
+            previous.stop()
+        if start:
+            service.start()
+        return service
+
+    @classmethod
+    def get(cls, name):
+        """Registered service, or None."""
+        return cls._services.get(name)
+
+    @classmethod
+    def snapshot(cls, name):
+        """Latest snapshot of a registered service, or None."""
+        service = cls._services.get(name)
+        return service.latest if service is not None else None
+
+    @classmethod
+    def stop_all(cls):
+        with cls._registry_lock:
+            services = list(cls._services.values())
+            cls._services.clear()
+        for service in services:
+            service.stop()
+
+    # ------------------------------------------------------------------
+    # Polling
+    # ------------------------------------------------------------------
+    @property
+    def latest(self):
+        """Most recent TelemetrySnapshot (None before the first poll)."""
+        return self._snapshot
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=f"telemetry-{self.name}", daemon=True)
+        self._thread.start()
+        logging.info(f"[Telemetry] {self.name} polling at {self.rate_hz:g} Hz")
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def poll_once(self):
+        """Read the device once and publish the result; returns the snapshot."""
+        timestamp = time.time()
+        error = None
+        try:
+            data = self.read_fn()
+        except Exception as e:
+            data, error = {}, str(e)
+            logging.debug(f"[Telemetry] {self.name} read failed: {e}")
+        if data is None:
+            return self._snapshot
+
+        values, meta = {}, {}
+        for key, value in data.items():
+            if key in self.fields:
+                values[key] = self._fit(value, self.fields[key])
+            else:
+                meta[key] = value
+        for field, n in self.fields.items():
+            values.setdefault(field, np.full(n, np.nan))
+            self.buffers[field].write(values[field][:, None])
+        self.timestamps.write([[timestamp]])
+
+        self._seq += 1
+        self._snapshot = TelemetrySnapshot(self.name, self._seq, timestamp, values, meta, error)
+        return self._snapshot
+
+    @staticmethod
+    def _fit(value, n):
+        """Coerce a reading to a float vector of length n (NaN padded)."""
+        array = np.full(n, np.nan)
+        if value is None:
+            return array
+        value = np.atleast_1d(np.asarray(value, dtype=float))[:n]
+        array[:len(value)] = value
+        return array
+
+    def _loop(self):
+        period = 1.0 / self.rate_hz
+        next_t = time.perf_counter()
+        while not self._stop.is_set():
+            self.poll_once()
+            next_t += period
+            now = time.perf_counter()
+            if next_t < now:  # fell behind (slow device); do not burst to catch up
+                next_t = now
+            self._stop.wait(next_t - now)
+
+    def history(self, field, n=None):
+        """(timestamps, values) of the last `n` readings of a field.
+
+        Returns:
+            tuple: (np.ndarray (k,), np.ndarray (channels, k))
+        """
+        buffer = self.buffers[field]
+        n = len(buffer) if n is None else n
+        return self.timestamps.latest(n)[0], buffer.latest(n)
+
+
+# ----------------------------------------------------------------------
+# Device services
+# ----------------------------------------------------------------------
+def qontrol_service(qontrol, rate_hz=DEFAULT_RATES_HZ["qontrol"], history=DEFAULT_HISTORY):
+    """Voltage/current of every Qontrol channel plus the device error log."""
+    n_chs = qontrol.device.n_chs
+    return TelemetryService("qontrol", qontrol.read_telemetry, {"voltage": n_chs, "current": n_chs},
+                            rate_hz=rate_hz, history=history)
+
+
+def thorlabs_service(thorlabs, name="thorlabs", rate_hz=DEFAULT_RATES_HZ["thorlabs"], history=DEFAULT_HISTORY):
+    """Power reading of one Thorlabs meter (uW)."""
+    return TelemetryService(name, lambda: {"power": thorlabs.read_power(unit="uW", priority=HOUSEKEEPING)}, {"power": 1},
+                            rate_hz=rate_hz, history=history)
+
+
+def daq_service(daq, channels, rate_hz=DEFAULT_RATES_HZ["daq"], history=DEFAULT_HISTORY, samples_per_channel=100):
+    """Mean power (uW) of DAQ channels, taken from the running stream only.
+
+    Finite acquisitions would compete with measurements for the device, so
+    polls are skipped while no stream covers `channels`.
+    """
+    channels = list(channels)
+
+    def read():
+        if not getattr(daq, "is_streaming", False) or not set(channels) <= set(daq.stream_channels):
+            return None
+        power = daq.read_power(channels, samples_per_channel=samples_per_channel, unit="uW", fresh=False)
+        return {"power": power, "channels": tuple(channels)}
+
+    return TelemetryService("daq", read, {"power": len(channels)}, rate_hz=rate_hz, history=history)
+
+
+def start_device_telemetry(qontrol=None, thorlabs=None, daq=None, config=None):
+    """(Re)start one service per connected device.
+
+    Rates are read from config["telemetry"] ({"qontrol_hz", "thorlabs_hz",
+    "daq_hz", "history"}), falling back to DEFAULT_RATES_HZ.
+    """
+    settings = (config or {}).get("telemetry", {})
+    history = int(settings.get("history", DEFAULT_HISTORY))
+
+    def rate(name):
+        return float(settings.get(f"{name}_hz", DEFAULT_RATES_HZ[name]))
+
+    if qontrol is not None and getattr(qontrol, "device", None) is not None:
+        TelemetryService.register(qontrol_service(qontrol, rate("qontrol"), history))
+
+    meters = thorlabs if isinstance(thorlabs, list) else [thorlabs] if thorlabs else []
+    for i, meter in enumerate(meters):
+        if getattr(meter, "device", None) is not None:
+            name = f"thorlabs{i}" if i > 0 else "thorlabs"
+            TelemetryService.register(thorlabs_service(meter, name, rate("thorlabs"), history))
+
+    if daq is not None and getattr(daq, "_is_connected", False):
+        channels = daq.list_ai_channels() or []
+        if channels:
+            TelemetryService.register(daq_service(daq, channels, rate("daq"), history))
+
+
+def format_qontrol_status(snapshot):
+    """Status text for a qontrol snapshot (same layout as QontrolDevice.show_status)."""
+    if snapshot is None:
+        return "[INFO][Qontrol] Waiting for telemetry..."
+    if snapshot.error:
+        return f"[INFO][Qontrol] Error retrieving channel status: {snapshot.error}"
+    voltages, currents = snapshot.values["voltage"], snapshot.values["current"]
+    lines = ["[INFO][Qontrol] Channel Status:"]
+    for i, (v, c) in enumerate(zip(voltages.tolist(), currents.tolist())):
+        v_str = "N/A" if np.isnan(v) else f"{v} V"
+        c_str = "N/A" if np.isnan(c) else f"{c} mA"
+        lines.append(f"  Channel {i}: Voltage = {v_str}, Current = {c_str}")
+    return "\n".join(lines)
+
+
+def format_qontrol_errors(snapshot):
+    """Error log text for a qontrol snapshot (same layout as QontrolDevice.show_errors)."""
+    if snapshot is None:
+        return ""
+    errors = snapshot.meta.get("errors", ())
+    if not errors:
+        return "[INFO][Qontrol] No errors reported."
+    lines = ["[ERROR][Qontrol] Log:"]
+    for timestamp, code, channel, desc in errors:
+        lines.append(f"  Time: {timestamp}, Code: {code}, Channel: {channel}, Description: {desc}")
+    return "\n".join(lines)
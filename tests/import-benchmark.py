@@ -0,0 +1,85 @@
+# tests/import-benchmark.py
+"""
+Import-time benchmark for the core modules.
+
+Each module is imported in a fresh interpreter (median of --repeat runs) and
+the heavy packages it pulled in are listed. app.imports is the reference: it
+is what every module used to load through `from app.imports import *`.
+
+    python tests/import-benchmark.py
+    python tests/import-benchmark.py --repeat 9 app.devices.qontrol_device
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORE_MODULES = [
+    "app.utils.decomposition",
+    "app.utils.decomposition.mapping.mzi_lut",
+    "app.utils.calibrate.calibrate",
+    "app.utils.calibrate.phase_solver",
+    "app.utils.qontrol.qmapper8x8",
+    "app.utils.qontrol.qmapper12x12",
+    "app.utils.interpolation",
+    "app.devices.qontrol_device",
+    "app.devices.switch_device",
+    "app.devices.thorlabs_device",
+    "app.devices.daq_device",
+    "app.devices.mock_devices",
+]
+REFERENCE = "app.imports"
+
+HEAVY = ["matplotlib", "tkinter", "customtkinter", "PIL", "sympy", "scipy", "pandas",
+         "pyvisa", "nidaqmx", "qontrol", "ThorlabsPM100", "interferometer", "jsonschema"]
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+dt = time.perf_counter() - t0
+heavy = sorted({{name.split(".")[0] for name in sys.modules}} & set({heavy!r}))
+print(json.dumps({{"seconds": dt, "heavy": heavy}}))
+"""
+
+
+def measure(module, repeat=5):
+    """Median import time (s) of `module` in fresh interpreters, and the heavy packages it loaded."""
+    times, heavy = [], []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY)],
+                              cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+            return None, error
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        times.append(result["seconds"])
+        heavy = result["heavy"]
+    return statistics.median(times), heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=CORE_MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-reference", action="store_true", help=f"skip timing {REFERENCE}")
+    args = parser.parse_args(argv)
+
+    modules = list(args.modules) + ([] if args.no_reference else [REFERENCE])
+    width = max(len(m) for m in modules)
+    print(f"{'module':<{width}}  {'import ms':>9}  heavy packages loaded")
+    for module in modules:
+        seconds, heavy = measure(module, args.repeat)
+        if seconds is None:
+            print(f"{module:<{width}}  {'error':>9}  {heavy}")
+        else:
+            print(f"{module:<{width}}  {seconds * 1e3:9.1f}  {', '.join(heavy) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# tests/simulated-chip-roundtrip.py
+"""
+Round trip through the simulated chip: compile Haar-random unitaries to
+heater currents (compile_mesh + mesh_channel_values, as a unitary cycle
+does), drive a SimulatedChip with them and compare |chip.unitary()|^2 with
+the compiled unitary. The SKIP_KEYS phis are never driven, so they are set
+to 0 in the reference; output phases are not driven either, hence |U|^2.
+
+    python tests/simulated-chip-roundtrip.py
+    python tests/simulated-chip-roundtrip.py --count 50 --seed 3
+
+Exits with status 1 if any unitary is off by more than --tolerance (the
+default covers the 5-decimal rounding of the currents).
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.devices.simulated_chip import SimulatedChip
+from app.experiments.unitaries import compile_mesh, mesh_channel_values
+from app.run import load_calibration
+from app.utils.calibrate.phase_solver import SKIP_KEYS
+from app.utils.decomposition.forward import mesh_transfer
+from app.utils.decomposition.interferometer import random_unitaries
+from app.utils.decomposition.mapping.mzi_lut import get_sequence_pnn
+
+CALIBRATION = os.path.join(ROOT, "config", "12_modechip_20250727_ref10k_1550nm.json")
+
+
+def reference_unitary(mesh, n):
+    """Transfer matrix of the compiled mesh phases, SKIP_KEYS phis at 0."""
+    sequence = get_sequence_pnn(n)
+    thetas = np.array([[mesh.theta[mesh.index[label]] for label in row] for row in sequence])
+    phis = np.array([[0.0 if f"{label}_phi" in SKIP_KEYS else mesh.phi[mesh.index[label]] for label in row]
+                     for row in sequence])
+    return mesh_transfer(phis * np.pi, thetas * np.pi / 2, np.zeros(n), block='mzi')
+
+
+def roundtrip(chip, U, grid_size, current_limit):
+    """Max |(|chip U|^2 - |U_ref|^2)| after driving `chip` with the currents compiled for U."""
+    n = chip.n_modes
+    mesh = compile_mesh(U, n, "pnn")
+    values, failed = mesh_channel_values(mesh, grid_size, current_limit)
+    currents = np.full(chip.n_channels, np.nan)
+    for channel, current in values.items():
+        currents[int(channel)] = current
+    chip.set_currents(currents)
+    error = np.abs(np.abs(chip.unitary()) ** 2 - np.abs(reference_unitary(mesh, n)) ** 2).max()
+    return error, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calibration", default=CALIBRATION)
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--current-limit", type=float, default=1.65)
+    parser.add_argument("--tolerance", type=float, default=1e-3)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    load_calibration(args.calibration)
+    chip = SimulatedChip.from_calibration_file(args.calibration, n_modes=12)
+
+    worst = 0.0
+    for k, U in enumerate(random_unitaries(args.count, 12, rng=np.random.default_rng(args.seed)), start=1):
+        error, failed = roundtrip(chip, U, "12x12", args.current_limit)
+        worst = max(worst, error)
+        print(f"{k:4d}  max ||U|^2 error| {error:.2e}" + (f"  unsolved: {failed}" if failed else ""))
+    print(f"worst {worst:.2e} (tolerance {args.tolerance:.0e})")
+    return 0 if worst <= args.tolerance else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())